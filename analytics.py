@@ -0,0 +1,106 @@
+"""
+Analytics query engine shared by /admin/analytics and /my-stores/analytics.
+
+All aggregation happens in the database: the engine only ever sees one
+(store, month) row per group, either from the precomputed `order_rollups`
+table or, when a date range is requested, from a GROUP BY over `orders`
+(plus `orders_archive` when the range reaches archived orders).  Rows for
+the same (store, month) from the two tables simply add up.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+import archive
+import models
+import rollups
+
+
+def grouped_orders_query(db, store_ids=None, start=None, end=None, table=models.Order):
+    """(store_id, store_name, month, revenue, order_count) straight from `orders` (or `table`)."""
+    O, S, St = table, models.Service, models.Store
+    month = rollups.month_expr(db, O.created_at)
+    query = (
+        db.query(O.store_id, St.name, month,
+                 func.sum(func.coalesce(O.price, S.price, 0) * func.coalesce(O.quantity, 1)),
+                 func.count(O.id))
+        .outerjoin(S, S.id == O.service_id)       # priced like the rollups: at order time
+        .join(St, St.id == O.store_id)
+        .filter(O.status.is_(None) | ~O.status.in_(rollups.EXCLUDED_STATUSES))
+    )
+    if store_ids is not None:
+        query = query.filter(O.store_id.in_(store_ids))
+    if start:
+        query = query.filter(O.created_at >= start)
+    if end:
+        query = query.filter(O.created_at < end)
+    return query.group_by(O.store_id, St.name, month)
+
+
+def _grouped_rollups(db, store_ids=None):
+    """Same rows as grouped_orders_query, read from the precomputed rollups."""
+    R, St = models.OrderRollup, models.Store
+    query = db.query(R.store_id, St.name, R.month, R.revenue, R.order_count) \
+              .join(St, St.id == R.store_id)
+    if store_ids is not None:
+        query = query.filter(R.store_id.in_(store_ids))
+    return query.all()
+
+
+def parse_range(start=None, end=None):
+    """Turn inclusive "YYYY-MM-DD" query params into a half-open datetime range."""
+    start = datetime.fromisoformat(start) if start else None
+    end = datetime.fromisoformat(end) + timedelta(days=1) if end else None
+    return start, end
+
+
+def _previous_month(now):
+    return datetime(now.year - 1, 12, 1) if now.month == 1 else datetime(now.year, now.month - 1, 1)
+
+
+def summarize(db, store_ids=None, start=None, end=None):
+    """
+    Build the analytics dashboard payload.
+
+    `store_ids` limits the result to those stores (None means all stores).
+    `start`/`end` restrict it to orders created in [start, end); without them
+    the answer comes from the rollups and costs a handful of rows per store.
+    """
+    if start or end:
+        rows = grouped_orders_query(db, store_ids, start, end).all()
+        if archive.reaches(db, start):
+            rows += grouped_orders_query(db, store_ids, start, end, models.ArchivedOrder).all()
+    else:
+        rows = _grouped_rollups(db, store_ids)
+
+    now = datetime.utcnow()
+    this_month = now.strftime("%Y-%m")
+    last_month = _previous_month(now).strftime("%Y-%m")
+
+    by_month = defaultdict(lambda: {"revenue": 0, "order_count": 0})
+    by_store = defaultdict(lambda: {"store_name": "", "revenue": 0, "order_count": 0})
+    for store_id, store_name, month, revenue, n in rows:
+        if not n:
+            continue
+        by_month[month]["revenue"] += revenue or 0
+        by_month[month]["order_count"] += n
+        by_store[store_id]["store_name"] = store_name
+        by_store[store_id]["revenue"] += revenue or 0
+        by_store[store_id]["order_count"] += n
+
+    empty = {"revenue": 0, "order_count": 0}
+    cur, prev = by_month.get(this_month, empty), by_month.get(last_month, empty)
+    month_list = sorted(by_month.keys(), reverse=True)[:12]
+    return {
+        "total_revenue": round(sum(m["revenue"] for m in by_month.values()), 2),
+        "revenue_this_month": round(cur["revenue"], 2),
+        "revenue_last_month": round(prev["revenue"], 2),
+        "orders_this_month": cur["order_count"],
+        "orders_last_month": prev["order_count"],
+        "total_orders": sum(m["order_count"] for m in by_month.values()),
+        "by_month": [{"month": m, "revenue": round(by_month[m]["revenue"], 2),
+                      "order_count": by_month[m]["order_count"]} for m in month_list],
+        "by_store": [{"store_id": sid, "store_name": s["store_name"], "revenue": round(s["revenue"], 2),
+                      "order_count": s["order_count"]} for sid, s in by_store.items()],
+    }
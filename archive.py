@@ -0,0 +1,166 @@
+"""
+Hot/cold order storage.
+
+The live endpoints (store dashboards, PUT /orders/{id}, the SSE feed) only
+care about recent, open orders, but `orders` keeps every order ever placed.
+The compactor moves orders that are finished (status in ARCHIVE_STATUSES)
+and older than ORDER_ARCHIVE_DAYS into `orders_archive`, a table with the
+same columns and indexes, so the hot table and its indexes stay the size of
+the working set.
+
+* each batch moves up to ORDER_ARCHIVE_BATCH orders with one INSERT ... SELECT
+  and one DELETE in its own short transaction, then pauses PAUSE_SECONDS so
+  request writers get the (SQLite) write lock in between;
+* batches walk `orders` oldest first by (created_at, id), so open orders
+  left behind are never rescanned; on PostgreSQL the candidate rows are
+  locked FOR UPDATE SKIP LOCKED, so concurrent compactors and status
+  updates never see an order half-moved.
+
+Readers see both tables:
+
+* GET /orders, /store-orders/{id} and /admin/orders page over both (see
+  pagination.page): the archive is only read once a page reaches back to
+  `horizon()`, the newest archived order, so first pages and polling stay
+  on the hot table;
+* date-range analytics and exports add the archive when the range starts at
+  or before the horizon (`reaches`);
+* rollups count archived orders like any other, so moving rows doesn't touch
+  them, and rollups.rebuild reads both tables;
+* archived orders are read-only: PUT /orders/{id} only finds hot ones.
+
+Each server process runs the compactor every ORDER_ARCHIVE_INTERVAL seconds
+(default 3600; 0 disables it).  To run it from cron instead:
+
+    python archive.py                 # one pass
+    python archive.py --dry-run       # count what would be moved
+    python archive.py --days 30 --batch 1000
+"""
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, func, insert, or_
+
+import models
+import statuses
+from database import SessionLocal
+
+ARCHIVE_STATUSES = statuses.FINAL
+ARCHIVE_AFTER_DAYS = int(os.getenv("ORDER_ARCHIVE_DAYS", "90"))
+BATCH_SIZE = int(os.getenv("ORDER_ARCHIVE_BATCH", "5000"))
+INTERVAL_SECONDS = int(os.getenv("ORDER_ARCHIVE_INTERVAL", "3600"))
+PAUSE_SECONDS = 0.05
+
+O, A = models.Order, models.ArchivedOrder
+COLUMNS = [c.name for c in A.__table__.columns]
+
+
+def horizon(db):
+    """created_at of the newest archived order; None while the archive is empty."""
+    return db.query(func.max(A.created_at)).scalar()
+
+
+def reaches(db, start):
+    """Whether a range starting at `start` (None: the beginning) includes archived orders."""
+    newest = horizon(db)
+    return newest is not None and (start is None or start <= newest)
+
+
+def _movable(cutoff):
+    return (O.status.in_(ARCHIVE_STATUSES)) & (O.created_at < cutoff)
+
+
+def pending(db, days=ARCHIVE_AFTER_DAYS):
+    """How many orders the next pass would move."""
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    return db.query(func.count(O.id)).filter(_movable(cutoff)).scalar()
+
+
+def _move_batch(db, cutoff, after, batch):
+    """Move one batch; returns (orders moved, key of the last row scanned or None at the end)."""
+    query = db.query(O.id, O.created_at, O.status).filter(O.created_at < cutoff)
+    if after is not None:
+        query = query.filter(or_(O.created_at > after[0],
+                                 and_(O.created_at == after[0], O.id > after[1])))
+    rows = (query.order_by(O.created_at, O.id).limit(batch)
+            .with_for_update(skip_locked=True).all())
+    if not rows:
+        db.rollback()
+        return 0, None
+    ids = [r.id for r in rows if r.status in ARCHIVE_STATUSES]
+    if ids:
+        db.execute(insert(A).from_select(
+            COLUMNS, db.query(*[O.__table__.c[c] for c in COLUMNS]).filter(O.id.in_(ids)).statement))
+        db.query(O).filter(O.id.in_(ids)).delete(synchronize_session=False)
+    db.commit()
+    return len(ids), (rows[-1].created_at, rows[-1].id)
+
+
+def compact(db, days=ARCHIVE_AFTER_DAYS, batch=BATCH_SIZE, stop=None, log=print):
+    """Archive every finished order older than `days`, `batch` at a time. Returns the count moved."""
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    moved, after = 0, None
+    while stop is None or not stop.is_set():
+        n, after = _move_batch(db, cutoff, after, batch)
+        moved += n
+        if after is None:
+            break
+        time.sleep(PAUSE_SECONDS)
+    if moved:
+        log(f"[archive] Moved {moved} orders created before {cutoff:%Y-%m-%d} to orders_archive")
+    return moved
+
+
+def forget_store(db, store_id):
+    db.query(A).filter(A.store_id == store_id).delete()
+
+
+class Compactor:
+    def __init__(self):
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None and INTERVAL_SECONDS > 0:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run, name="order-archive", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=10):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join(timeout)
+            self._thread = None
+
+    def run(self):
+        # first pass one interval after startup, so restarts don't all compact at once
+        while not self._stop.wait(INTERVAL_SECONDS):
+            db = SessionLocal()
+            try:
+                compact(db, stop=self._stop)
+            except Exception as exc:        # e.g. another worker holds the lock; retry next time
+                db.rollback()
+                print(f"[archive] Compaction error: {exc}")
+            finally:
+                db.close()
+
+
+compactor = Compactor()
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Move finished orders to orders_archive.")
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--batch", type=int, default=BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    db = SessionLocal()
+    try:
+        if args.dry_run:
+            print(f"{pending(db, args.days)} orders older than {args.days} days would be archived")
+        else:
+            print(f"Archived {compact(db, args.days, args.batch)} orders")
+    finally:
+        db.close()
@@ -1,8 +1,7 @@
 import os
 import secrets
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 from argon2 import PasswordHasher
 from datetime import datetime, timedelta
@@ -12,21 +11,58 @@ SECRET_KEY = "supersecretkey"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
-ph = PasswordHasher()
+# ── Password hashing ─────────────────────────────────────────────────────────
+# Every argon2 hash in flight holds ARGON2_MEMORY_COST KiB.  Hashes run on a
+# dedicated pool of HASH_CONCURRENCY threads, so hashing never uses more than
+# HASH_CONCURRENCY x ARGON2_MEMORY_COST however many logins arrive at once;
+# up to HASH_QUEUE more requests wait for a thread and the rest get
+# HashingBusy (answered with 429).  The defaults are the OWASP argon2id
+# baseline (19 MiB, 2 passes, 1 lane), sized for the Raspberry Pi 4;
+# `python auth.py --calibrate` suggests values for another host.  Hashes made
+# with older parameters are upgraded on the user's next login.
+ph = PasswordHasher(
+    time_cost=int(os.getenv("ARGON2_TIME_COST", "2")),
+    memory_cost=int(os.getenv("ARGON2_MEMORY_COST", "19456")),
+    parallelism=int(os.getenv("ARGON2_PARALLELISM", "1")),
+)
+HASH_CONCURRENCY = int(os.getenv("HASH_CONCURRENCY", "2"))
+HASH_QUEUE       = int(os.getenv("HASH_QUEUE", "16"))
+
+_hash_pool  = ThreadPoolExecutor(max_workers=HASH_CONCURRENCY, thread_name_prefix="argon2")
+_hash_slots = threading.BoundedSemaphore(HASH_CONCURRENCY + HASH_QUEUE)
+
+
+class HashingBusy(Exception):
+    """All hashing threads and queue places are taken; retry shortly."""
+
+
+def _hashing(fn, *args):
+    if not _hash_slots.acquire(blocking=False):
+        raise HashingBusy()
+    try:
+        return _hash_pool.submit(fn, *args).result()
+    finally:
+        _hash_slots.release()
 
 
 def hash_password(password: str):
-    return ph.hash(password)
+    return _hashing(ph.hash, password)
 
 
 def verify_password(plain: str, hashed: str):
     try:
-        ph.verify(hashed, plain)
-        return True
-    except:
+        return _hashing(ph.verify, hashed, plain)
+    except HashingBusy:
+        raise
+    except Exception:
         return False
 
 
+def needs_rehash(hashed: str) -> bool:
+    """True if `hashed` was made with different argon2 parameters than the current ones."""
+    return ph.check_needs_rehash(hashed)
+
+
 def create_access_token(user_id: str):
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     payload = {"sub": user_id, "exp": expire}
@@ -38,33 +74,14 @@ def generate_verification_token() -> str:
     return secrets.token_urlsafe(32)
 
 
-def send_verification_email(to_email: str, token: str, base_url: str) -> bool:
-    """
-    Send an email verification link to the user.
-
-    Reads SMTP settings from environment variables:
-        SMTP_HOST     – e.g. smtp.gmail.com        (default: localhost)
-        SMTP_PORT     – e.g. 587                   (default: 587)
-        SMTP_USER     – sender account / username
-        SMTP_PASSWORD – sender password / app-password
-        SMTP_FROM     – From address               (falls back to SMTP_USER)
-        SMTP_USE_TLS  – "true" / "false"           (default: true)
+def verification_email(token: str, base_url: str):
     """
-    smtp_host = os.getenv("SMTP_HOST", "localhost")
-    smtp_port = int(os.getenv("SMTP_PORT", "587"))
-    smtp_user = os.getenv("SMTP_USER", "")
-    smtp_pass = os.getenv("SMTP_PASSWORD", "")
-    smtp_from = os.getenv("SMTP_FROM", smtp_user)
-    use_tls   = os.getenv("SMTP_USE_TLS", "true").lower() == "true"
+    Build the email verification message for a new account.
 
+    Returns (subject, text_body, html_body), ready for mailer.enqueue().
+    """
     verify_url = f"{base_url}/verify-email?token={token}"
 
-    # ── Build the email ──────────────────────────────────────────────────────
-    msg = MIMEMultipart("alternative")
-    msg["Subject"] = "Verify your email address"
-    msg["From"]    = smtp_from
-    msg["To"]      = to_email
-
     text_body = f"""\
 Hi there!
 
@@ -104,24 +121,33 @@ If you did not create an account, you can safely ignore this email.
 </html>
 """
 
-    msg.attach(MIMEText(text_body, "plain"))
-    msg.attach(MIMEText(html_body, "html"))
-
-    # ── Send ─────────────────────────────────────────────────────────────────
-    try:
-        if use_tls:
-            server = smtplib.SMTP(smtp_host, smtp_port)
-            server.ehlo()
-            server.starttls()
-        else:
-            server = smtplib.SMTP_SSL(smtp_host, smtp_port)
-
-        if smtp_user and smtp_pass:
-            server.login(smtp_user, smtp_pass)
-
-        server.sendmail(smtp_from, to_email, msg.as_string())
-        server.quit()
-        return True
-    except Exception as exc:
-        print(f"[auth] Failed to send verification email to {to_email}: {exc}")
-        return False
\ No newline at end of file
+    return "Verify your email address", text_body, html_body
+
+
+def calibrate(target_ms=250, memory_cost=None, parallelism=None):
+    """Smallest time_cost whose hash takes at least `target_ms` on this host."""
+    import time
+    memory_cost = memory_cost or ph.memory_cost
+    parallelism = parallelism or ph.parallelism
+    for time_cost in range(1, 21):
+        hasher = PasswordHasher(time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism)
+        start = time.perf_counter()
+        for _ in range(3):
+            hasher.hash("calibration")
+        elapsed = (time.perf_counter() - start) / 3 * 1000
+        if elapsed >= target_ms:
+            break
+    return time_cost, elapsed
+
+
+if __name__ == "__main__":
+    import sys
+    args = [a for a in sys.argv[1:] if a != "--calibrate"]
+    target = float(args[0]) if args else 250
+    time_cost, elapsed = calibrate(target)
+    print(f"# {elapsed:.0f} ms per hash at {ph.memory_cost // 1024} MiB; "
+          f"peak hashing memory {HASH_CONCURRENCY * ph.memory_cost // 1024} MiB "
+          f"with HASH_CONCURRENCY={HASH_CONCURRENCY}")
+    print(f"ARGON2_TIME_COST={time_cost}")
+    print(f"ARGON2_MEMORY_COST={ph.memory_cost}")
+    print(f"ARGON2_PARALLELISM={ph.parallelism}")
@@ -0,0 +1,85 @@
+"""
+Compare the analytics engine against the old ORM-hydration loop.
+
+    python benchmarks/analytics_bench.py            # 10k, 100k and 1M orders
+    python benchmarks/analytics_bench.py 10000      # custom sizes
+
+Each size is seeded into a throwaway SQLite file; the timings are the best of
+three runs of each path over the same data.
+"""
+import os, random, sys, tempfile, time, uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker, joinedload
+
+import models
+import rollups
+import analytics
+
+
+def seed(db, n_orders, n_stores=20, n_services=15):
+    stores = [{"id": str(uuid.uuid4()), "name": f"Store {i}"} for i in range(n_stores)]
+    services = [{"id": str(uuid.uuid4()), "name": f"Item {j}", "price": random.randint(2, 30),
+                 "store_id": s["id"]} for s in stores for j in range(n_services)]
+    db.execute(insert(models.Store), stores)
+    db.execute(insert(models.Service), services)
+    now = datetime.utcnow()
+    for off in range(0, n_orders, 50_000):
+        batch = []
+        for _ in range(min(50_000, n_orders - off)):
+            svc = random.choice(services)
+            batch.append({"id": str(uuid.uuid4()), "service_id": svc["id"], "store_id": svc["store_id"],
+                          "status": "Completed", "quantity": random.randint(1, 3),
+                          "created_at": now - timedelta(minutes=random.randint(0, 60 * 24 * 730))})
+        db.execute(insert(models.Order), batch)
+    db.commit()
+    rollups.rebuild(db)
+
+
+def legacy(db):
+    """The pre-engine handler: hydrate every order and aggregate in Python."""
+    orders = db.query(models.Order).options(
+        joinedload(models.Order.service), joinedload(models.Order.store)).all()
+    by_month = defaultdict(lambda: {"revenue": 0, "order_count": 0})
+    by_store = defaultdict(lambda: {"store_name": "", "revenue": 0, "order_count": 0})
+    for o in orders:
+        rev = (o.service.price or 0) * (o.quantity or 1)
+        key = o.created_at.strftime("%Y-%m")
+        by_month[key]["revenue"] += rev
+        by_month[key]["order_count"] += 1
+        by_store[o.store_id]["store_name"] = o.store.name
+        by_store[o.store_id]["revenue"] += rev
+        by_store[o.store_id]["order_count"] += 1
+    return by_month, by_store
+
+
+def best_of(fn, runs=3):
+    best = float("inf")
+    for _ in range(runs):
+        t = time.perf_counter(); fn(); best = min(best, time.perf_counter() - t)
+    return best * 1000
+
+
+def main(sizes):
+    print(f"{'orders':>10} {'legacy ms':>12} {'sql group ms':>14} {'rollups ms':>12}")
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_engine(f"sqlite:///{tmp}/bench.db")
+            models.Base.metadata.create_all(bind=engine)
+            Session = sessionmaker(bind=engine)
+            db = Session()
+            seed(db, n)
+            epoch = datetime(2000, 1, 1)
+            t_legacy = best_of(lambda: (legacy(db), db.expunge_all()))
+            t_sql = best_of(lambda: analytics.summarize(db, start=epoch))
+            t_roll = best_of(lambda: analytics.summarize(db))
+            print(f"{n:>10} {t_legacy:>12.1f} {t_sql:>14.1f} {t_roll:>12.2f}")
+            db.close(); engine.dispose()
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [10_000, 100_000, 1_000_000])
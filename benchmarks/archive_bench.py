@@ -0,0 +1,130 @@
+"""
+Hot-table size and query time before and after archiving old orders.
+
+    python benchmarks/archive_bench.py                   # 200k orders over 2 years
+    python benchmarks/archive_bench.py --orders 1000000 --days 30
+
+Seeds a scratch SQLite database (benchmarks/seed.py), then runs archive.compact
+and compares, before and after:
+
+* rows in `orders` and `orders_archive`;
+* the live queries: the first page of GET /store-orders for the busiest
+  store, and its open (not Completed/Cancelled) orders, which has no status
+  index and scans the store's part of `orders`;
+* the history: every page of GET /store-orders, GET /orders for a customer,
+  /my-stores/analytics over the whole period and the CSV export.  These must
+  return exactly the same data; the script exits non-zero if they don't.
+"""
+import argparse, os, subprocess, sys, tempfile, time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def best(fn, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Order archival: hot-table size and query time.")
+    parser.add_argument("--orders", type=int, default=200_000)
+    parser.add_argument("--days", type=int, default=90, help="archive finished orders older than this")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="pyup-archive-")
+    db_path = os.path.join(workdir, "bench.db")
+    os.environ.update(DATABASE_URL=f"sqlite:///{db_path}", MAIL_DISPATCHER="0", ORDER_ARCHIVE_INTERVAL="0")
+    subprocess.run([sys.executable, os.path.join(ROOT, "benchmarks", "seed.py"), "--stores", "20",
+                    "--customers", "200", "--orders", str(args.orders)], check=True, stdout=subprocess.DEVNULL)
+
+    sys.path.insert(0, ROOT)
+    os.chdir(workdir)
+    os.makedirs("static")
+    from fastapi.testclient import TestClient
+    from sqlalchemy import func
+
+    import archive, main as app_main, models
+    from database import SessionLocal
+    from seed import PASSWORD
+
+    client = TestClient(app_main.app)
+    db = SessionLocal()
+    O = models.Order
+    store_id, owner_id = (db.query(O.store_id, models.Store.owner_id)
+                          .join(models.Store, models.Store.id == O.store_id)
+                          .group_by(O.store_id, models.Store.owner_id)
+                          .order_by(func.count().desc()).first())
+    owner = db.query(models.User.username).filter(models.User.id == owner_id).scalar()
+    customer = (db.query(models.User.username).join(O, O.user_id == models.User.id)
+                .group_by(models.User.username).order_by(func.count().desc()).first()[0])
+
+    def login(username):
+        token = client.post("/login", json={"username": username, "password": PASSWORD}).json()["access_token"]
+        return {"Authorization": f"Bearer {token}"}
+    owner_auth, customer_auth = login(owner), login(customer)
+
+    def all_pages(url, auth):
+        rows, cursor = [], None
+        while True:
+            response = client.get(url, headers=auth, params={"limit": 500, **({"cursor": cursor} if cursor else {})})
+            response.raise_for_status()
+            rows += response.json()
+            cursor = response.headers.get("x-next-cursor")
+            if not cursor:
+                return rows
+
+    def analytics():
+        result = client.get("/my-stores/analytics", headers=owner_auth,
+                            params={"start": "2000-01-01", "end": "2100-01-01"}).json()
+        result["by_store"].sort(key=lambda s: s["store_id"])      # row order isn't part of the answer
+        return result
+
+    def history():
+        return {
+            "store orders": all_pages(f"/store-orders/{store_id}", owner_auth),
+            "my orders": all_pages("/orders", customer_auth),
+            "analytics": analytics(),
+            "export": client.get(f"/store-orders/{store_id}/export", headers=owner_auth).text,
+        }
+
+    live = {
+        "dashboard first page": lambda: client.get(f"/store-orders/{store_id}", headers=owner_auth,
+                                                   params={"limit": 50}).raise_for_status(),
+        "open orders (no index)": lambda: db.query(func.count(O.id)).filter(
+            O.store_id == store_id, ~O.status.in_(archive.ARCHIVE_STATUSES)).scalar(),
+    }
+
+    def measure():
+        counts = (db.query(func.count(O.id)).scalar(),
+                  db.query(func.count(models.ArchivedOrder.id)).scalar())
+        db.rollback()
+        return counts, {name: best(fn) for name, fn in live.items()}
+
+    (hot_before, cold_before), before = measure()
+    expected = history()
+    start = time.perf_counter()
+    moved = archive.compact(db, days=args.days, log=lambda msg: None)
+    seconds = time.perf_counter() - start
+    (hot_after, cold_after), after = measure()
+    actual = history()
+    db.close()
+
+    print(f"archived {moved} orders in {seconds:.1f}s ({moved / max(seconds, 1e-9):.0f} orders/s)")
+    print(f"{'':>24} {'before':>10} {'after':>10}")
+    print(f"{'orders rows':>24} {hot_before:>10} {hot_after:>10}")
+    print(f"{'orders_archive rows':>24} {cold_before:>10} {cold_after:>10}")
+    for name in live:
+        print(f"{name + ' ms':>24} {before[name] * 1000:>10.2f} {after[name] * 1000:>10.2f}")
+
+    failed = [name for name in expected if expected[name] != actual[name]]
+    for name in expected:
+        print(f"{name:>24} {'same' if name not in failed else 'DIFFERENT'}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Async database routes vs the thread pool, at high connection counts.
+
+    python benchmarks/async_bench.py                          # 64, 256 and 512 connections
+    python benchmarks/async_bench.py --connections 100,1000 --duration 20 --db big.db
+
+Seeds one dataset with benchmarks/seed.py (--db keeps it between runs), then
+for each mode starts uvicorn on a fresh copy of it:
+
+    async    DB_ASYNC=1: the order, menu and analytics routes wait for the
+             database through aiosqlite on the event loop
+    threads  DB_ASYNC=0: the same routes run their database work in the
+             AnyIO thread pool (40 threads), like the `def` routes
+
+Each mode is driven by N concurrent keep-alive connections from an asyncio
+client with a mix of those routes: menu items (GET /stores/{id}/services),
+owner order lists (GET /store-orders/{id}?limit=50), guest orders
+(POST /orders) and owner analytics.  Reports requests per second, p50/p99
+latency, errors, and the server's peak RSS and thread count.  Errors under
+overload are mostly requests that waited longer than DB_POOL_TIMEOUT for a
+connection; in thread mode a saturated pool can also starve the thread pool
+itself, since sessions are closed on a pool thread too.
+"""
+import argparse, asyncio, os, random, shutil, statistics, tempfile, threading, time
+
+from load_test import Workload, free_port, peak_rss_mb, prepare, reset_peak, start_server
+
+MODES = {"async": "1", "threads": "0"}
+MIX = (("services", 40), ("store_orders", 25), ("order", 25), ("analytics", 10))
+
+
+def threads(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("Threads:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+
+
+async def drive(base_url, load, connections, seconds):
+    """`connections` workers issuing the MIX for `seconds`; returns (latencies, errors, wall)."""
+    import httpx
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+    latencies, errors = [], 0
+    names, weights = zip(*MIX)
+    owners = [s for s in load.stores if s["owner"] in load.owner_tokens]
+
+    async def worker(number, client, until):
+        nonlocal errors
+        rng = random.Random(f"{load.rng_seed}-{number}")
+        while time.perf_counter() < until:
+            kind = rng.choices(names, weights)[0]
+            store = load.pick(rng)
+            start = time.perf_counter()
+            try:
+                if kind == "services":
+                    r = await client.get(f"/stores/{store['id']}/services")
+                elif kind == "order":
+                    while not store["services"]:
+                        store = load.pick(rng)
+                    r = await client.post("/orders", json={"service_id": rng.choice(store["services"]),
+                                                           "order_type": "dine-in", "table_number": "1"})
+                else:
+                    store = rng.choice(owners)
+                    headers = load.owner_tokens[store["owner"]]
+                    if kind == "store_orders":
+                        r = await client.get(f"/store-orders/{store['id']}", params={"limit": 50},
+                                             headers=headers)
+                    else:
+                        r = await client.get("/my-stores/analytics", headers=headers)
+                failed = r.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            latencies.append(time.perf_counter() - start)
+            errors += failed
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        until = time.perf_counter() + 2                 # warm-up: open the connections
+        await asyncio.gather(*(worker(i, client, until) for i in range(connections)))
+        latencies.clear(); errors = 0
+        began = time.perf_counter()
+        await asyncio.gather(*(worker(i, client, began + seconds) for i in range(connections)))
+        return latencies, errors, time.perf_counter() - began
+
+
+def run_mode(mode, template_db, stores, args):
+    workdir = tempfile.mkdtemp(prefix=f"pyup-{mode}-")
+    db_path = os.path.join(workdir, "bench.db")
+    shutil.copyfile(template_db, db_path)
+    port = free_port()
+    server = start_server(workdir, db_path, port, DB_ASYNC=MODES[mode])
+    try:
+        load = Workload(f"http://127.0.0.1:{port}", stores, args.seed)
+        load.setup(["owner"], 20)
+        for connections in args.connections:
+            reset_peak(server.pid)
+            peak_threads, done = [threads(server.pid) or 0], threading.Event()
+
+            def sample():
+                while not done.wait(0.2):
+                    peak_threads[0] = max(peak_threads[0], threads(server.pid) or 0)
+            sampler = threading.Thread(target=sample)
+            sampler.start()
+            try:
+                latencies, errors, wall = asyncio.run(drive(load.base_url, load, connections, args.duration))
+            finally:
+                done.set()
+                sampler.join()
+            q = statistics.quantiles(latencies, n=100)
+            peak = peak_rss_mb(server.pid)
+            print(f"{mode:>8} {connections:>6} {len(latencies) / wall:>8.0f} {q[49] * 1000:>8.1f} "
+                  f"{q[98] * 1000:>9.1f} {errors:>7} {peak if peak is not None else '-':>8} {peak_threads[0]:>8}")
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare async database routes with the thread pool.")
+    parser.add_argument("--db", help="seeded SQLite template to reuse (seeded on first use)")
+    parser.add_argument("--stores", type=int, default=200)
+    parser.add_argument("--services", type=int, default=25)
+    parser.add_argument("--customers", type=int, default=500)
+    parser.add_argument("--orders", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--connections", default="64,256,512")
+    parser.add_argument("--duration", type=float, default=15, help="seconds per connection count")
+    args = parser.parse_args()
+    args.connections = [int(n) for n in args.connections.split(",")]
+
+    workdir = tempfile.mkdtemp(prefix="pyup-seed-")
+    try:
+        template, stores = prepare(workdir, args)
+        print(f"{'mode':>8} {'conns':>6} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>9} {'errors':>7} "
+              f"{'peak MB':>8} {'threads':>8}")
+        for mode in MODES:
+            run_mode(mode, template, stores, args)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
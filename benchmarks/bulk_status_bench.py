@@ -0,0 +1,92 @@
+"""
+One bulk status change vs a PUT per order.
+
+    python benchmarks/bulk_status_bench.py            # a table of 6, then 100 orders
+    python benchmarks/bulk_status_bench.py 6 20 500
+
+Runs the app against a scratch database.  For each size, seats that many
+Pending orders at one table and marks them Ready twice: with one
+PUT /orders/{id} each, and with a single POST /orders/bulk-status selecting
+the table.  Prints SQL statements and wall time for both, then checks that a
+Completed order can't be moved back and that an unknown store is a 404.
+Exits non-zero if the bulk statement count grows with the number of orders
+or either request isn't refused.
+"""
+import os, sys, tempfile, time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+os.environ.update(MAIL_DISPATCHER="0", ORDER_ARCHIVE_INTERVAL="0")
+os.chdir(tempfile.mkdtemp())
+os.makedirs("static")
+
+from fastapi.testclient import TestClient
+
+import migrations
+from database import SessionLocal, count_queries
+with SessionLocal() as _db:
+    migrations.migrate(_db, log=lambda msg: None)
+
+import main, models
+from auth import create_access_token
+
+client = TestClient(main.app)
+
+
+def seat(db, store, service, table, n):
+    orders = [models.Order(service_id=service.id, store_id=store.id, table_number=table, status="Pending")
+              for _ in range(n)]
+    db.add_all(orders); db.commit()
+    return [o.id for o in orders]
+
+
+def timed(fn):
+    with count_queries() as statements:
+        start = time.perf_counter()
+        fn()
+        seconds = time.perf_counter() - start
+    return len(statements), seconds
+
+
+def run(sizes):
+    db = SessionLocal()
+    owner = models.User(username="owner", email="o@example.com", role="user", is_verified=True)
+    db.add(owner); db.flush()
+    store = models.Store(name="Store", description="", owner_id=owner.id)
+    db.add(store); db.flush()
+    service = models.Service(name="Item", description="", price=5, store_id=store.id)
+    db.add(service); db.commit()
+    headers = {"Authorization": "Bearer " + create_access_token(owner.id)}
+    client.get("/my-stores", headers=headers)                 # warm the auth cache
+
+    def one_by_one(ids):
+        for order_id in ids:
+            assert client.put(f"/orders/{order_id}", json={"status": "Ready"}, headers=headers).status_code == 200
+
+    def bulk(table, n):
+        res = client.post("/orders/bulk-status", headers=headers,
+                          json={"status": "Ready", "store_id": store.id, "table_number": table})
+        assert res.status_code == 200 and len(res.json()["updated"]) == n, res.text
+
+    print(f"{'orders':>7} {'PUT each: SQL':>14} {'ms':>8} {'bulk: SQL':>10} {'ms':>8}")
+    bulk_counts = []
+    for n in sizes:
+        single_ids = seat(db, store, service, f"a{n}", n)
+        single = timed(lambda: one_by_one(single_ids))
+        table_ids = seat(db, store, service, f"b{n}", n)
+        many = timed(lambda: bulk(f"b{n}", n))
+        bulk_counts.append(many[0])
+        print(f"{n:>7} {single[0]:>14} {single[1] * 1000:>8.1f} {many[0]:>10} {many[1] * 1000:>8.1f}")
+
+    client.post("/orders/bulk-status", headers=headers, json={"status": "Completed", "order_ids": table_ids})
+    back = client.post("/orders/bulk-status", headers=headers, json={"status": "Pending", "order_ids": table_ids})
+    print(f"\nCompleted -> Pending: HTTP {back.status_code}")
+    unknown = client.post("/orders/bulk-status", headers=headers,
+                          json={"status": "Ready", "store_id": "missing", "table_number": "1"})
+    print(f"Unknown store: HTTP {unknown.status_code}")
+    db.close()
+    sys.exit(0 if len(set(bulk_counts)) == 1 and back.status_code == 409 and unknown.status_code == 404 else 1)
+
+
+if __name__ == "__main__":
+    run([int(n) for n in sys.argv[1:]] or [6, 100])
@@ -0,0 +1,83 @@
+"""
+Check that order exports stream in constant memory.
+
+    python benchmarks/export_memory.py                        # 1k and 1M orders, CSV
+    python benchmarks/export_memory.py --sizes 1000,10000000 --format ndjson --gzip
+
+For each size, seeds one store with that many orders (benchmarks/seed.py),
+starts the app under uvicorn, downloads GET /store-orders/{id}/export as the
+store's owner without keeping the body, and reads the server's peak RSS
+(VmHWM, reset just before the download).  Exits non-zero if the peak for
+the largest export exceeds the smallest by more than --limit-mb: memory must
+not grow with the number of orders.  Linux only.
+
+The server runs with SQLITE_MMAP_SIZE=0.  Memory-mapped database pages count
+toward RSS as they are read, so with the default 256 MB mmap the peak tracks
+the size of the database file, not what the export holds.
+"""
+import argparse, os, shutil, sqlite3, subprocess, sys, tempfile, time
+
+from load_test import ROOT, free_port, peak_rss_mb, reset_peak, start_server
+from seed import PASSWORD
+
+
+def export(size, args):
+    workdir = tempfile.mkdtemp(prefix="pyup-export-")
+    db_path = os.path.join(workdir, "bench.db")
+    server = None
+    try:
+        env = {**os.environ, "DATABASE_URL": f"sqlite:///{db_path}", "MAIL_DISPATCHER": "0"}
+        subprocess.run([sys.executable, os.path.join(ROOT, "benchmarks", "seed.py"), "--stores", "1",
+                        "--services", "20", "--customers", "0", "--orders", str(size)],
+                       env=env, check=True, stdout=subprocess.DEVNULL)
+        with sqlite3.connect(db_path) as con:
+            store_id, = con.execute("SELECT id FROM stores").fetchone()
+
+        import httpx
+        port = free_port()
+        server = start_server(workdir, db_path, port, SQLITE_MMAP_SIZE="0")
+        base = f"http://127.0.0.1:{port}"
+        token = httpx.post(f"{base}/login", json={"username": "owner0", "password": PASSWORD}).json()["access_token"]
+        params = {"format": args.format, "gzip": str(args.gzip).lower()}
+
+        reset_peak(server.pid)
+        start, received = time.perf_counter(), 0
+        with httpx.stream("GET", f"{base}/store-orders/{store_id}/export", params=params, timeout=None,
+                          headers={"Authorization": f"Bearer {token}"}) as response:
+            response.raise_for_status()
+            for chunk in response.iter_raw():
+                received += len(chunk)
+        return received, time.perf_counter() - start, peak_rss_mb(server.pid)
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=30)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak server memory while exporting orders.")
+    parser.add_argument("--sizes", default="1000,1000000", help="order counts to compare")
+    parser.add_argument("--format", default="csv", choices=("csv", "ndjson"))
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--limit-mb", type=float, default=25,
+                        help="allowed peak RSS growth from the smallest to the largest export")
+    args = parser.parse_args()
+    sizes = sorted(int(n) for n in args.sizes.split(","))
+
+    print(f"{'orders':>10} {'body MB':>9} {'seconds':>8} {'rows/s':>9} {'peak RSS MB':>12}")
+    peaks = []
+    for size in sizes:
+        received, seconds, peak = export(size, args)
+        if peak is None:
+            sys.exit("peak RSS needs /proc (Linux)")
+        peaks.append(peak)
+        print(f"{size:>10} {received / 2**20:>9.1f} {seconds:>8.2f} {size / seconds:>9.0f} {peak:>12.1f}")
+
+    growth = peaks[-1] - peaks[0]
+    print(f"\npeak RSS growth {growth:+.1f} MB from {sizes[0]} to {sizes[-1]} orders (limit {args.limit_mb} MB)")
+    sys.exit(1 if growth > args.limit_mb else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Cost of turning 10k rows into a JSON response body.
+
+    python benchmarks/json_bench.py           # 10k rows, best of 5
+    python benchmarks/json_bench.py 50000
+
+Encoding only, for store, menu item and order rows shaped like the API's:
+
+* jsonable_encoder  – what FastAPI does with a returned dict and no
+                      response model, then stdlib json (the old path);
+* response model    – pydantic validation + dump_json, FastAPI's path when a
+                      response model is declared and no response class is set;
+* orjson            – schemas.dumps, what the list endpoints do now.
+
+Then end to end for order rows in a scratch SQLite database: ORM objects
+turned into dicts and jsonable_encoder'd, vs column tuples (loading.columns)
+straight to orjson.
+"""
+import json, os, random, sys, tempfile, time, uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+import loading
+import models
+import schemas
+
+
+def best(fn, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def sample_rows(n):
+    rng = random.Random(1)
+    now = datetime(2025, 6, 1, 12, 0, 0)
+    stores = [{"id": str(uuid.uuid4()), "name": f"Store {i}", "description": "Fresh food, fast " * 3,
+               "owner_id": str(uuid.uuid4()), "owner_name": f"owner{i}", "category": "food",
+               "menu_style": "grid", "primary_color": "#667eea", "secondary_color": "#764ba2",
+               "accent_color": "#28a745", "theme": "modern", "banner_image_url": None,
+               "logo_url": f"/static/uploads/{i:032x}-200.jpg", "tagline": "Since 1999",
+               "welcome_message": None, "footer_text": None} for i in range(n)]
+    services = [{"id": str(uuid.uuid4()), "name": f"Item {i}", "description": "House special " * 4,
+                 "price": rng.randint(2, 40), "store_id": str(uuid.uuid4()),
+                 "image_url": f"/static/uploads/{i:032x}-800.jpg"} for i in range(n)]
+    orders = [{"id": str(uuid.uuid4()), "status": "Completed", "customer_name": f"Guest {i}",
+               "customer_phone": None, "service_name": f"Item {i % 50}", "price": rng.randint(2, 40),
+               "quantity": rng.randint(1, 3), "order_type": "dine-in", "table_number": str(i % 30),
+               "delivery_address": None, "notes": None,
+               "created_at": now - timedelta(minutes=i, microseconds=rng.randint(0, 999999))}
+              for i in range(n)]
+    return {"stores": (stores, schemas.Store), "menu items": (services, schemas.Service),
+            "orders": (orders, schemas.StoreOrder)}
+
+
+def encoders(model):
+    adapter = TypeAdapter(list[model])
+    return {
+        "jsonable_encoder": lambda rows: json.dumps(jsonable_encoder(rows)).encode(),
+        "response model": lambda rows: adapter.dump_json(adapter.validate_python(rows)),
+        "orjson": schemas.dumps,
+    }
+
+
+def end_to_end(n):
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(f"sqlite:///{path}")
+    models.Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    store = {"id": str(uuid.uuid4()), "name": "Store", "owner_id": None}
+    service = {"id": str(uuid.uuid4()), "name": "Item", "price": 7, "store_id": store["id"]}
+    db.execute(insert(models.Store), [store])
+    db.execute(insert(models.Service), [service])
+    now = datetime.utcnow()
+    db.execute(insert(models.Order), [
+        {"id": str(uuid.uuid4()), "service_id": service["id"], "store_id": store["id"], "status": "Pending",
+         "customer_name": f"Guest {i}", "quantity": 1, "order_type": "dine-in", "table_number": "4",
+         "created_at": now - timedelta(minutes=i)} for i in range(n)])
+    db.commit()
+
+    def orm():
+        db.expunge_all()
+        rows = [{"id": o.id, "status": o.status or "Pending",
+                 "customer_name": o.customer_name or (o.user.username if o.user else "Guest"),
+                 "customer_phone": o.customer_phone, "service_name": o.service.name,
+                 "price": o.service.price, "quantity": o.quantity, "order_type": o.order_type,
+                 "table_number": o.table_number, "delivery_address": o.delivery_address,
+                 "notes": o.notes, "created_at": o.created_at}
+                for o in db.query(models.Order).filter(models.Order.store_id == store["id"])]
+        return json.dumps(jsonable_encoder(rows)).encode()
+
+    def columns():
+        query = loading.columns(loading.orders(db), loading.STORE_ORDER_FIELDS)
+        return schemas.dumps(loading.dicts(query.filter(models.Order.store_id == store["id"])))
+
+    assert json.loads(orm()) == json.loads(columns())
+    result = {"ORM + jsonable_encoder": best(orm, 3), "columns + orjson": best(columns, 3)}
+    db.close()
+    engine.dispose()
+    return result
+
+
+def main(n):
+    print(f"Encoding {n} rows (best of 5), ms")
+    paths = list(encoders(schemas.Store))
+    print(f"{'rows':>12} " + " ".join(f"{p:>17}" for p in paths))
+    for name, (rows, model) in sample_rows(n).items():
+        timings = {p: best(lambda: fn(rows)) for p, fn in encoders(model).items()}
+        print(f"{name:>12} " + " ".join(f"{timings[p] * 1000:>17.1f}" for p in paths))
+
+    print(f"\nGET /store-orders body for {n} orders, query + encode (best of 3), ms")
+    for path, seconds in end_to_end(n).items():
+        print(f"{path:>24} {seconds * 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
@@ -0,0 +1,370 @@
+"""
+End-to-end load test: the real app under uvicorn, driven over HTTP.
+
+    python benchmarks/load_test.py                              # seed 200 stores / 200k orders, 20 s per scenario
+    python benchmarks/load_test.py --db big.db --orders 5000000 --stores 2000
+    python benchmarks/load_test.py --scenarios menu,checkout --duration 60 --concurrency 32
+    python benchmarks/load_test.py --compare benchmarks/results/20250101-120000-abc1234.json
+
+The dataset comes from benchmarks/seed.py.  `--db FILE` keeps it between
+runs: FILE is seeded on first use and afterwards copied into a scratch
+directory before each run, so the server writes to the copy and every run
+starts from the same rows.
+
+Scenarios, each run for --duration seconds by --concurrency client threads
+after a short warm-up.  Stores are picked with the same Zipf skew as the
+seeded orders:
+
+    menu       customer scanning a QR code: GET /stores?category=…, then
+               GET /stores/{id}/menu
+    checkout   customer ordering: GET /stores/{id}/menu, then POST /orders
+               (one item) or POST /orders/checkout (a 2-4 item cart)
+    owner      store owner's dashboard polling GET /store-orders/{id}?limit=50
+    analytics  GET /my-stores/analytics as an owner, GET /admin/analytics as admin
+
+For every scenario it reports requests per second, p50/p95/p99 latency,
+errors and the server's peak RSS during that scenario (Linux only: VmHWM,
+reset between scenarios through /proc/<pid>/clear_refs).  Results are
+written to benchmarks/results/<time>-<commit>.json and compared with the
+previous result for the same configuration, or with --compare FILE; a
+throughput drop or p95 rise above --threshold percent exits with status 1.
+
+The client threads share one Python process, so on small machines the
+client can saturate before the server does; compare runs from the same
+machine only.
+"""
+import argparse, json, os, platform, random, shutil, socket, statistics, subprocess, sys
+import tempfile, threading, time
+from datetime import datetime, timezone
+
+from seed import PASSWORD, zipf_weights
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+RESULTS = os.path.join(ROOT, "benchmarks", "results")
+SCENARIOS = ("menu", "checkout", "owner", "analytics")
+WARMUP_SECONDS = 2
+
+
+def git(*args):
+    try:
+        return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+# ── dataset ──────────────────────────────────────────────────────────────────
+def prepare(workdir, args):
+    """Seed (or copy) the database into `workdir`; return the store/owner layout."""
+    path = os.path.join(workdir, "bench.db")
+    template = os.path.abspath(args.db) if args.db else None
+    if not template or not os.path.exists(template):
+        env = {**os.environ, "DATABASE_URL": f"sqlite:///{template or path}", "MAIL_DISPATCHER": "0"}
+        subprocess.run([sys.executable, os.path.join(ROOT, "benchmarks", "seed.py"),
+                        "--stores", str(args.stores), "--orders", str(args.orders),
+                        "--services", str(args.services), "--customers", str(args.customers),
+                        "--seed", str(args.seed)], env=env, check=True)
+    if template:
+        shutil.copyfile(template, path)
+
+    import sqlite3
+    con = sqlite3.connect(path)
+    try:
+        # Hottest stores first, so Zipf ranks line up with the seeded traffic
+        stores = con.execute(
+            "SELECT s.id, s.category, u.username, coalesce(sum(r.order_count), 0) AS n "
+            "FROM stores s JOIN users u ON u.id = s.owner_id "
+            "LEFT JOIN order_rollups r ON r.store_id = s.id "
+            "GROUP BY s.id ORDER BY n DESC, s.id").fetchall()
+        menus = {}
+        for store_id, service_id in con.execute("SELECT store_id, id FROM services ORDER BY store_id, id"):
+            menus.setdefault(store_id, []).append(service_id)
+    finally:
+        con.close()
+    return path, [{"id": s[0], "category": s[1], "owner": s[2], "services": menus.get(s[0], [])}
+                  for s in stores]
+
+
+# ── server ───────────────────────────────────────────────────────────────────
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workdir, db_path, port, **env):
+    """uvicorn serving main:app from `workdir`; extra keyword arguments go into its environment."""
+    os.makedirs(os.path.join(workdir, "static"), exist_ok=True)
+    env = {**os.environ, "PYTHONPATH": ROOT, "DATABASE_URL": f"sqlite:///{db_path}",
+           "MAIL_DISPATCHER": "0", **env}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--no-access-log"], cwd=workdir, env=env)
+    import httpx
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if server.poll() is not None:
+            sys.exit(f"server exited with status {server.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/stores?limit=1", timeout=1).status_code == 200:
+                return server
+        except httpx.TransportError:
+            time.sleep(0.2)
+    server.kill()
+    sys.exit("server did not start within 60 s")
+
+
+def peak_rss_mb(pid):
+    """Peak resident set size since the last reset_peak(), or None off Linux."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak(pid):
+    try:
+        with open(f"/proc/{pid}/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+# ── scenarios ────────────────────────────────────────────────────────────────
+class Workload:
+    def __init__(self, base_url, stores, seed):
+        import httpx
+        self.base_url, self.stores = base_url, stores
+        self.cum = zipf_weights(len(stores))
+        self.rng_seed = seed
+        self.local = threading.local()
+        self.httpx = httpx
+        self.owner_tokens, self.admin_token = {}, None
+
+    def client(self, name, number):
+        if not hasattr(self.local, "client"):
+            self.local.client = self.httpx.Client(base_url=self.base_url, timeout=30)
+        # Seeded per scenario and thread number, so runs make the same choices
+        return self.local.client, random.Random(f"{self.rng_seed}-{name}-{number}")
+
+    def login(self, username):
+        r = self.httpx.post(f"{self.base_url}/login", json={"username": username, "password": PASSWORD},
+                            timeout=30)
+        r.raise_for_status()
+        return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    def setup(self, names, concurrency):
+        if {"owner", "analytics"} & set(names):
+            # Owners of the hottest stores: the busiest dashboards
+            for store in self.stores:
+                if len(self.owner_tokens) >= concurrency:
+                    break
+                if store["owner"] not in self.owner_tokens:
+                    self.owner_tokens[store["owner"]] = self.login(store["owner"])
+        if "analytics" in names:
+            self.admin_token = self.login("admin")
+
+    def pick(self, rng):
+        return self.stores[rng.choices(range(len(self.stores)), cum_weights=self.cum)[0]]
+
+    # Each step yields its responses; every response is one timed sample
+    def menu(self, client, rng):
+        store = self.pick(rng)
+        yield client.get("/stores", params={"category": store["category"]})
+        yield client.get(f"/stores/{store['id']}/menu")
+
+    def checkout(self, client, rng):
+        store = self.pick(rng)
+        while not store["services"]:
+            store = self.pick(rng)
+        yield client.get(f"/stores/{store['id']}/menu")
+        order = {"order_type": "dine-in", "table_number": str(rng.randint(1, 30)),
+                 "customer_name": f"Load {rng.randint(1, 9999)}"}
+        if rng.random() < 0.5:
+            yield client.post("/orders", json={**order, "service_id": rng.choice(store["services"]),
+                                               "quantity": rng.randint(1, 3)})
+        else:
+            cart = rng.sample(store["services"], min(len(store["services"]), rng.randint(2, 4)))
+            yield client.post("/orders/checkout", json={**order, "items": [
+                {"service_id": sid, "quantity": rng.randint(1, 2)} for sid in cart]})
+
+    def owner(self, client, rng):
+        store = self.pick(rng)
+        while store["owner"] not in self.owner_tokens:
+            store = self.pick(rng)
+        yield client.get(f"/store-orders/{store['id']}", params={"limit": 50},
+                         headers=self.owner_tokens[store["owner"]])
+
+    def analytics(self, client, rng):
+        if rng.random() < 0.2:
+            yield client.get("/admin/analytics", headers=self.admin_token)
+        else:
+            yield client.get("/my-stores/analytics", headers=rng.choice(list(self.owner_tokens.values())))
+
+    def run(self, name, seconds, concurrency):
+        """Drive scenario `name` for `seconds`; return (latencies, errors, wall seconds)."""
+        step = getattr(self, name)
+        latencies, errors, lock = [], [0], threading.Lock()
+
+        def worker(number, until, record):
+            client, rng = self.client(name, number)
+            while time.perf_counter() < until:
+                start = time.perf_counter()
+                responses = step(client, rng)
+                while True:
+                    try:
+                        response = next(responses)
+                    except StopIteration:
+                        break
+                    except self.httpx.HTTPError:
+                        response = None
+                    now = time.perf_counter()
+                    if record:
+                        with lock:
+                            latencies.append(now - start)
+                            if response is None or response.status_code >= 400:
+                                errors[0] += 1
+                    start = now
+
+        for until_after, record in ((WARMUP_SECONDS, False), (seconds, True)):
+            until = time.perf_counter() + until_after
+            began = time.perf_counter()
+            threads = [threading.Thread(target=worker, args=(i, until, record)) for i in range(concurrency)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            wall = time.perf_counter() - began
+        return latencies, errors[0], wall
+
+
+def summarize(latencies, errors, wall, peak):
+    if len(latencies) < 2:
+        return {"requests": len(latencies), "errors": errors, "rps": 0, "peak_rss_mb": peak}
+    q = statistics.quantiles(latencies, n=100)
+    return {"requests": len(latencies), "errors": errors, "rps": round(len(latencies) / wall, 1),
+            "p50_ms": round(q[49] * 1000, 2), "p95_ms": round(q[94] * 1000, 2),
+            "p99_ms": round(q[98] * 1000, 2), "max_ms": round(max(latencies) * 1000, 2),
+            "peak_rss_mb": peak}
+
+
+# ── results ──────────────────────────────────────────────────────────────────
+def previous_result(config, exclude):
+    """The newest saved result with the same configuration, if any."""
+    if not os.path.isdir(RESULTS):
+        return None
+    for name in sorted(os.listdir(RESULTS), reverse=True):
+        path = os.path.join(RESULTS, name)
+        if not name.endswith(".json") or path == exclude:
+            continue
+        with open(path) as f:
+            result = json.load(f)
+        if result.get("meta", {}).get("config") == config:
+            return path
+    return None
+
+
+def compare(current, baseline_path, threshold):
+    """Print per-scenario deltas against a saved result; return the regressed scenarios."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nvs {os.path.relpath(baseline_path)} (commit {baseline['meta'].get('commit') or '?'})")
+    print(f"{'scenario':>10} {'rps':>16} {'p95 ms':>18} {'peak MB':>16}")
+    regressed = []
+    for name, now in current["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if not before or "p95_ms" not in before or "p95_ms" not in now:
+            continue
+        rps = (now["rps"] - before["rps"]) / before["rps"] * 100 if before["rps"] else 0
+        p95 = (now["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100 if before["p95_ms"] else 0
+        flag = ""
+        if rps < -threshold or p95 > threshold:
+            regressed.append(name)
+            flag = "  REGRESSION"
+        mem = (f"{before['peak_rss_mb']}->{now['peak_rss_mb']}"
+               if now.get("peak_rss_mb") is not None and before.get("peak_rss_mb") is not None else "-")
+        print(f"{name:>10} {now['rps']:>8.0f} ({rps:+5.1f}%) {now['p95_ms']:>9.1f} ({p95:+5.1f}%) "
+              f"{mem:>16}{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the app over HTTP against a seeded dataset.")
+    parser.add_argument("--db", help="seeded SQLite template to reuse (seeded on first use)")
+    parser.add_argument("--stores", type=int, default=200)
+    parser.add_argument("--services", type=int, default=25)
+    parser.add_argument("--customers", type=int, default=500)
+    parser.add_argument("--orders", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--duration", type=float, default=20, help="seconds per scenario")
+    parser.add_argument("--concurrency", type=int, default=16, help="client threads")
+    parser.add_argument("--compare", help="result JSON to compare against (default: previous run)")
+    parser.add_argument("--threshold", type=float, default=25,
+                        help="percent drop in rps or rise in p95 that counts as a regression")
+    parser.add_argument("--no-save", action="store_true", help="don't write a result file")
+    args = parser.parse_args()
+    names = [n.strip() for n in args.scenarios.split(",") if n.strip()]
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    workdir = tempfile.mkdtemp(prefix="pyup-load-")
+    server = None
+    try:
+        start = time.perf_counter()
+        db_path, stores = prepare(workdir, args)
+        print(f"dataset ready in {time.perf_counter() - start:.1f}s: {len(stores)} stores")
+        port = free_port()
+        server = start_server(workdir, db_path, port)
+        load = Workload(f"http://127.0.0.1:{port}", stores, args.seed)
+        load.setup(names, args.concurrency)
+
+        config = {"stores": args.stores, "services": args.services, "customers": args.customers,
+                  "orders": args.orders, "seed": args.seed, "db": os.path.basename(args.db or ""),
+                  "duration": args.duration, "concurrency": args.concurrency}
+        result = {"meta": {"commit": git("rev-parse", "--short", "HEAD"),
+                           "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+                           "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                           "python": platform.python_version(), "platform": platform.platform(),
+                           "cpus": os.cpu_count(), "config": config},
+                  "scenarios": {}}
+
+        print(f"{'scenario':>10} {'requests':>9} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+              f"{'errors':>7} {'peak MB':>8}")
+        for name in names:
+            reset_peak(server.pid)
+            latencies, errors, wall = load.run(name, args.duration, args.concurrency)
+            s = summarize(latencies, errors, wall, peak_rss_mb(server.pid))
+            result["scenarios"][name] = s
+            print(f"{name:>10} {s['requests']:>9} {s['rps']:>8.0f} {s.get('p50_ms', 0):>8.1f} "
+                  f"{s.get('p95_ms', 0):>8.1f} {s.get('p99_ms', 0):>8.1f} {s['errors']:>7} "
+                  f"{s['peak_rss_mb'] if s['peak_rss_mb'] is not None else '-':>8}")
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=30)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    path = None
+    if not args.no_save:
+        os.makedirs(RESULTS, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(RESULTS, f"{stamp}-{result['meta']['commit'] or 'nogit'}.json")
+        with open(path, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nwrote {os.path.relpath(path)}")
+
+    baseline = args.compare or previous_result(config, exclude=path)
+    if baseline and compare(result, baseline, args.threshold):
+        sys.exit(1)
+    if any(s["errors"] for s in result["scenarios"].values()):
+        sys.exit("some requests failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Login burst: latency, rejections and peak memory for the password hashing pool.
+
+    python benchmarks/login_bench.py                 # 200 logins from 32 concurrent clients
+    python benchmarks/login_bench.py 400 64
+
+Each configuration runs in a fresh process (so its peak RSS is its own)
+against a scratch SQLite database with one verified user:
+
+* unbounded – argon2-cffi defaults (64 MiB, t=3, p=4) and a hashing pool as
+              wide as the client count, i.e. how login behaved before;
+* default   – the shipped settings (19 MiB, t=2, p=1, 2 hashing threads,
+              16 queued);
+* tight     – 1 hashing thread and a queue of 4, to show 429 backpressure.
+
+Latencies are for successful logins only; 429s are counted separately.
+"""
+import json, os, statistics, subprocess, sys, tempfile, time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+CONFIGS = {
+    "unbounded": {"ARGON2_TIME_COST": "3", "ARGON2_MEMORY_COST": "65536", "ARGON2_PARALLELISM": "4",
+                  "HASH_CONCURRENCY": "{clients}", "HASH_QUEUE": "0"},
+    "default":   {},
+    "tight":     {"HASH_CONCURRENCY": "1", "HASH_QUEUE": "4"},
+}
+
+
+def worker(total, clients):
+    """Runs inside the child process; prints one JSON line of results."""
+    import resource
+    from concurrent.futures import ThreadPoolExecutor
+    sys.path.insert(0, ROOT)
+    os.chdir(tempfile.mkdtemp())
+    os.makedirs("static")
+    os.environ["DATABASE_URL"] = "sqlite:///./bench.db"
+    os.environ["MAIL_DISPATCHER"] = "0"
+
+    from fastapi.testclient import TestClient
+    import migrations
+    from database import SessionLocal
+    with SessionLocal() as db:
+        migrations.migrate(db, log=lambda msg: None)
+    import main, models
+    from auth import hash_password
+    with SessionLocal() as db:
+        db.add(models.User(username="bench", email="bench@example.com", role="user",
+                           hashed_password=hash_password("correct horse"), is_verified=True))
+        db.commit()
+
+    def login(_):
+        start = time.perf_counter()
+        res = client.post("/login", json={"username": "bench", "password": "correct horse"})
+        return res.status_code, time.perf_counter() - start
+
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    with TestClient(main.app) as client, ThreadPoolExecutor(clients) as pool:
+        start = time.perf_counter()
+        results = list(pool.map(login, range(total)))
+        wall = time.perf_counter() - start
+    ok = sorted(t for code, t in results if code == 200)
+    print(json.dumps({
+        "ok": len(ok),
+        "rejected": sum(code == 429 for code, _ in results),
+        "p50": statistics.median(ok) * 1000 if ok else None,
+        "p99": ok[max(int(len(ok) * 0.99) - 1, 0)] * 1000 if ok else None,
+        "wall": wall,
+        "rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "rss_growth_mib": (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline) / 1024,
+    }))
+
+
+def main_bench(total, clients):
+    print(f"{total} logins from {clients} concurrent clients")
+    print(f"{'config':>10} {'ok':>5} {'429':>5} {'p50 ms':>8} {'p99 ms':>8} {'wall s':>7} "
+          f"{'peak RSS MiB':>13} {'growth MiB':>11}")
+    for name, env in CONFIGS.items():
+        child_env = {**os.environ, **{k: v.format(clients=clients) for k, v in env.items()}}
+        out = subprocess.run([sys.executable, __file__, "--worker", str(total), str(clients)],
+                             env=child_env, capture_output=True, text=True, check=True).stdout
+        r = json.loads(out.strip().splitlines()[-1])
+        fmt = lambda v: f"{v:.0f}" if v is not None else "-"
+        print(f"{name:>10} {r['ok']:>5} {r['rejected']:>5} {fmt(r['p50']):>8} {fmt(r['p99']):>8} "
+              f"{r['wall']:>7.1f} {r['rss_mib']:>13.0f} {r['rss_growth_mib']:>11.0f}")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--worker"]:
+        worker(int(sys.argv[2]), int(sys.argv[3]))
+    else:
+        args = [int(a) for a in sys.argv[1:]]
+        main_bench(args[0] if args else 200, args[1] if len(args) > 1 else 32)
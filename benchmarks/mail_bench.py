@@ -0,0 +1,116 @@
+"""
+Show that /register latency no longer depends on the SMTP server.
+
+    python benchmarks/mail_bench.py            # 20 registrations, 0.05s and 0.3s SMTP latency
+    python benchmarks/mail_bench.py 50 0.5
+
+Starts a local stand-in SMTP server that waits `latency` seconds before
+every reply (aiosmtpd works too; this one only needs the standard library),
+then registers users two ways against a scratch SQLite database:
+
+* inline  – each request also opens its own SMTP session and sends, the way
+            register used to;
+* outbox  – the request only queues the mail; mailer's dispatcher delivers
+            it in the background over a reused session.
+"""
+import os, socketserver, statistics, sys, tempfile, threading, time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+os.chdir(tempfile.mkdtemp())
+os.makedirs("static")
+os.environ["DATABASE_URL"] = "sqlite:///./bench.db"
+os.environ["MAIL_DISPATCHER"] = "1"
+
+import smtplib
+from fastapi.testclient import TestClient
+
+import migrations
+from database import SessionLocal
+with SessionLocal() as _db:
+    migrations.migrate(_db, log=lambda msg: None)
+
+import main, mailer, models
+
+
+class StandInSMTP(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib, answering every command after `latency` seconds."""
+    latency = 0.0
+    sessions = 0
+    messages = 0
+
+    def reply(self, line):
+        time.sleep(self.latency)
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        StandInSMTP.sessions += 1
+        self.reply("220 stand-in ESMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            verb = line[:4].upper()
+            if verb == b"DATA":
+                self.reply("354 go ahead")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                StandInSMTP.messages += 1
+                self.reply("250 queued")
+            elif verb == b"QUIT":
+                self.reply("221 bye")
+                return
+            else:
+                self.reply("250 ok")
+
+
+def register_all(client, prefix, n, inline_port=None):
+    times = []
+    for i in range(n):
+        start = time.perf_counter()
+        res = client.post("/register", json={"username": f"{prefix}{i}",
+                                             "email": f"{prefix}{i}@example.com", "password": "pw"})
+        assert res.status_code == 200, res.text
+        if inline_port:
+            with smtplib.SMTP("127.0.0.1", inline_port) as smtp:
+                smtp.sendmail("shop@example.com", f"{prefix}{i}@example.com", "Subject: verify\r\n\r\nhi")
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def main_bench(n, latencies):
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), StandInSMTP)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    os.environ.update(SMTP_HOST="127.0.0.1", SMTP_PORT=str(port), SMTP_USE_TLS="none",
+                      SMTP_FROM="shop@example.com", SMTP_USER="", SMTP_PASSWORD="")
+    client = TestClient(main.app)
+
+    print(f"{'SMTP latency':>12} {'mode':>7} {'register p50 ms':>16} {'p95 ms':>8} "
+          f"{'all delivered s':>16} {'SMTP sessions':>14}")
+    for latency in latencies:
+        StandInSMTP.latency = latency
+        for mode in ("inline", "outbox"):
+            StandInSMTP.sessions = StandInSMTP.messages = 0
+            if mode == "outbox":
+                mailer.dispatcher.start()
+            start = time.perf_counter()
+            times = register_all(client, f"{mode}{latency}_", n, port if mode == "inline" else None)
+            while StandInSMTP.messages < n:
+                time.sleep(0.01)
+            delivered = time.perf_counter() - start
+            p95 = sorted(times)[int(len(times) * 0.95) - 1]
+            print(f"{latency:>11.2f}s {mode:>7} {statistics.median(times) * 1000:>16.1f} "
+                  f"{p95 * 1000:>8.1f} {delivered:>16.2f} {StandInSMTP.sessions:>14}")
+            if mode == "outbox":
+                mailer.dispatcher.stop()
+            else:
+                with SessionLocal() as db:      # inline already sent these
+                    db.query(models.EmailOutbox).delete(); db.commit()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main_bench(int(args[0]) if args else 20, [float(a) for a in args[1:]] or [0.05, 0.3])
@@ -0,0 +1,95 @@
+"""
+Cost of opening a store page: two calls vs the cached menu snapshot.
+
+    python benchmarks/menu_bench.py            # 2000 page views of a 60-item menu, 16 clients
+    python benchmarks/menu_bench.py 5000 32 120
+
+Against a scratch SQLite database, each page view is one of:
+
+* two calls    – GET /stores/{id} then GET /stores/{id}/services, as the
+                 store page used to load;
+* snapshot     – GET /stores/{id}/menu served from the in-process cache;
+* revalidated  – the same with If-None-Match, answered 304 with no body.
+
+Reports page views per second, the p50 page view and SQL statements per view.
+"""
+import os, statistics, sys, tempfile, threading, time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+os.chdir(tempfile.mkdtemp())
+os.makedirs("static")
+os.environ["DATABASE_URL"] = "sqlite:///./bench.db"
+os.environ["MAIL_DISPATCHER"] = "0"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+import migrations
+from database import SessionLocal, engine
+with SessionLocal() as _db:
+    migrations.migrate(_db, log=lambda msg: None)
+
+import main, models
+
+statements = 0
+_lock = threading.Lock()
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count(*args):
+    global statements
+    with _lock:
+        statements += 1
+
+
+def seed(items):
+    with SessionLocal() as db:
+        owner = models.User(username="owner", email="o@example.com", role="user", is_verified=True)
+        db.add(owner); db.flush()
+        store = models.Store(name="Corner Cafe", description="Coffee", owner_id=owner.id, category="food")
+        db.add(store); db.flush()
+        for i in range(items):
+            db.add(models.Service(name=f"Item {i}", description="Freshly made " * 4, price=3 + i % 7,
+                                  store_id=store.id, image_url=f"/static/uploads/{i:032x}-800.jpg"))
+        db.commit()
+        return store.id
+
+
+def main_bench(views, clients, items):
+    global statements
+    store_id = seed(items)
+    client = TestClient(main.app)
+    etag = client.get(f"/stores/{store_id}/menu").headers["etag"]
+
+    def two_calls():
+        assert client.get(f"/stores/{store_id}").status_code == 200
+        assert client.get(f"/stores/{store_id}/services").status_code == 200
+
+    def snapshot():
+        assert client.get(f"/stores/{store_id}/menu").status_code == 200
+
+    def revalidated():
+        assert client.get(f"/stores/{store_id}/menu", headers={"If-None-Match": etag}).status_code == 304
+
+    print(f"{views} page views of a {items}-item menu from {clients} clients")
+    print(f"{'mode':>12} {'views/s':>9} {'p50 ms':>8} {'SQL per view':>13}")
+    for name, view in [("two calls", two_calls), ("snapshot", snapshot), ("revalidated", revalidated)]:
+        def timed(_):
+            start = time.perf_counter()
+            view()
+            return time.perf_counter() - start
+        statements = 0
+        start = time.perf_counter()
+        with ThreadPoolExecutor(clients) as pool:
+            times = list(pool.map(timed, range(views)))
+        wall = time.perf_counter() - start
+        print(f"{name:>12} {views / wall:>9.0f} {statistics.median(times) * 1000:>8.2f} "
+              f"{statements / views:>13.2f}")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main_bench(args[0] if args else 2000, args[1] if len(args) > 1 else 16,
+               args[2] if len(args) > 2 else 60)
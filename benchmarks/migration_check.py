@@ -0,0 +1,70 @@
+"""
+Upgrade the repository's app.db to the latest schema.
+
+    python benchmarks/migration_check.py
+    python benchmarks/migration_check.py old.db      # another pre-migration SQLite file
+
+Copies the database to a scratch directory (the original is never touched),
+runs every migration, then checks that:
+
+* the schema is at migrations.HEAD and main.py's startup check accepts it;
+* every column in models.py exists in the upgraded tables;
+* every order has a unit price, and the rollups match a rebuild from scratch;
+* running the migrations again is a no-op.
+
+Exits non-zero on the first failure.
+"""
+import os, shutil, sys, tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+source = os.path.abspath(sys.argv[1] if len(sys.argv) > 1 else os.path.join(ROOT, "app.db"))
+sys.path.insert(0, ROOT)
+os.chdir(tempfile.mkdtemp())
+shutil.copy(source, "check.db")
+os.environ.update(DATABASE_URL="sqlite:///./check.db", MAIL_DISPATCHER="0", ORDER_ARCHIVE_INTERVAL="0")
+
+from sqlalchemy import inspect as sa_inspect
+
+import migrations, models, rollups
+from database import SessionLocal, engine
+
+
+def check(condition, message):
+    if not condition:
+        print(f"FAIL {message}")
+        sys.exit(1)
+    print(f"ok   {message}")
+
+
+def rollup_rows(db):
+    return sorted((r.store_id, r.month, r.revenue, r.order_count) for r in db.query(models.OrderRollup))
+
+
+def run():
+    with SessionLocal() as db:
+        before = migrations.current_version(db)
+        print(f"{source}: schema version {before}")
+        check(migrations.migrate(db) == migrations.HEAD, f"migrated to version {migrations.HEAD}")
+        check(migrations.check(db) == migrations.HEAD, "startup check passes")
+
+        insp = sa_inspect(engine)
+        for table in models.Base.metadata.sorted_tables:
+            missing = {c.name for c in table.columns} - {c["name"] for c in insp.get_columns(table.name)}
+            check(not missing, f"{table.name} has every model column" + (f" (missing {missing})" if missing else ""))
+
+        for O in (models.Order, models.ArchivedOrder):
+            unpriced = (db.query(O.id).join(models.Service, models.Service.id == O.service_id)
+                        .filter(O.price.is_(None)).count())
+            check(unpriced == 0, f"{O.__tablename__}: every order with a menu item has a price")
+
+        migrated = rollup_rows(db)
+        rollups.rebuild(db)
+        check(rollup_rows(db) == migrated, f"{len(migrated)} rollup rows match a rebuild")
+
+        reran = []
+        migrations.migrate(db, log=reran.append)
+        check(not reran, "second run is a no-op" + (f" (re-ran {reran})" if reran else ""))
+
+
+if __name__ == "__main__":
+    run()
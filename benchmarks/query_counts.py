@@ -0,0 +1,81 @@
+"""
+Check that list endpoints issue a constant number of SQL statements.
+
+    python benchmarks/query_counts.py
+
+Runs the app against a scratch database in a temporary directory, calls
+every list endpoint with a small and a ten times larger dataset, and exits
+non-zero if any endpoint's statement count grows with the number of rows
+(the signature of an N+1 lazy load).
+"""
+import os, sys, tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+os.chdir(tempfile.mkdtemp())
+os.makedirs("static")
+
+from fastapi.testclient import TestClient
+
+import migrations
+from database import SessionLocal, count_queries
+with SessionLocal() as _db:
+    migrations.migrate(_db, log=lambda msg: None)
+
+import main, models
+from auth import create_access_token
+
+client = TestClient(main.app)
+
+
+def seed(db, owner, admin, n):
+    for i in range(n):
+        store = models.Store(name=f"Store {i}", description="", owner_id=owner.id)
+        db.add(store); db.flush()
+        svc = models.Service(name=f"Item {i}", description="", price=5, store_id=store.id)
+        db.add(svc); db.flush()
+        db.add(models.Order(service_id=svc.id, store_id=store.id, user_id=admin.id))
+    db.commit()
+    return store.id
+
+
+def counts(endpoints, headers):
+    result = {}
+    for path in endpoints:
+        client.get(path, headers=headers)       # warm the auth cache
+        with count_queries() as statements:
+            res = client.get(path, headers=headers)
+        assert res.status_code == 200, (path, res.status_code, res.text)
+        result[path] = len(statements)
+    return result
+
+
+def run():
+    db = SessionLocal()
+    owner = models.User(username="owner", email="o@example.com", role="user", is_verified=True)
+    admin = models.User(username="admin", email="a@example.com", role="admin", is_verified=True)
+    db.add_all([owner, admin]); db.commit()
+    headers = {"Authorization": "Bearer " + create_access_token(admin.id)}
+    owner_headers = {"Authorization": "Bearer " + create_access_token(owner.id)}
+
+    store_id = seed(db, owner, admin, 3)
+    endpoints = ["/stores", "/services", "/orders", "/admin/orders", "/admin/analytics",
+                 f"/stores/{store_id}", f"/stores/{store_id}/services", f"/stores/{store_id}/menu",
+                 f"/store-orders/{store_id}"]
+    owner_endpoints = ["/my-stores", "/my-stores/analytics"]
+    small = {**counts(endpoints, headers), **counts(owner_endpoints, owner_headers)}
+    seed(db, owner, admin, 30)
+    large = {**counts(endpoints, headers), **counts(owner_endpoints, owner_headers)}
+    db.close()
+
+    failed = False
+    print(f"{'endpoint':<60} {'3 rows':>7} {'33 rows':>8}")
+    for path in small:
+        flag = "" if small[path] == large[path] else "  <-- grows with rows"
+        failed |= bool(flag)
+        print(f"{path:<60} {small[path]:>7} {large[path]:>8}{flag}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,71 @@
+"""
+Compare FTS5 search against the old LIKE '%q%' store filter.
+
+    python benchmarks/search_bench.py              # 1k, 10k and 100k stores
+    python benchmarks/search_bench.py 5000
+
+Each size is seeded into a throwaway SQLite file with ten menu items per
+store, using a few thousand made-up words so that, as with real menus, a
+typed word matches a handful of rows rather than a fixed share of the
+table.  Timings are the median of 50 prefix queries drawn from those words,
+run the way GET /stores?q= runs them (newest first, one page).
+"""
+import os, random, statistics, sys, tempfile, time, uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+import models
+import search
+
+random.seed(1)
+SYLLABLES = "ba ki lo ma ne po ru sa te vi zo ga de fi hu".split()
+WORDS = sorted({"".join(random.choices(SYLLABLES, k=random.randint(2, 4))) for _ in range(5000)})
+
+
+def sentence(n):
+    return " ".join(random.choices(WORDS, k=n))
+
+
+def seed(db, n_stores):
+    stores = [{"id": str(uuid.uuid4()), "name": sentence(2), "description": sentence(12)}
+              for _ in range(n_stores)]
+    services = [{"id": str(uuid.uuid4()), "store_id": s["id"], "name": sentence(2),
+                 "description": sentence(8), "price": 5} for s in stores for _ in range(10)]
+    db.execute(insert(models.Store), stores)
+    db.execute(insert(models.Service), services)
+    db.commit()
+    search.create(db)
+
+
+def median_ms(fn, queries):
+    times = []
+    for q in queries:
+        t = time.perf_counter(); fn(q); times.append(time.perf_counter() - t)
+    return statistics.median(times) * 1000
+
+
+def main(sizes):
+    print(f"{'stores':>8} {'LIKE stores ms':>15} {'FTS stores ms':>14} {'FTS stores+menu ms':>19}")
+    queries = [w[:max(4, len(w) - 1)] for w in random.sample(WORDS, 50)]
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_engine(f"sqlite:///{tmp}/bench.db")
+            models.Base.metadata.create_all(bind=engine)
+            db = sessionmaker(bind=engine)()
+            seed(db, n)
+            St = models.Store
+            newest = lambda query: query.order_by(St.created_at.desc(), St.id.desc()).limit(50).all()
+            like = lambda q: newest(db.query(St.id).filter(
+                St.name.ilike(f"%{q}%") | St.description.ilike(f"%{q}%")))
+            fts = lambda q: newest(db.query(St.id).filter(St.id.in_(search.store_ids(q))))
+            full = lambda q: search.search(db, q, 50)
+            print(f"{n:>8} {median_ms(like, queries):>15.2f} {median_ms(fts, queries):>14.2f} "
+                  f"{median_ms(full, queries):>19.2f}")
+            db.close(); engine.dispose()
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [1_000, 10_000, 100_000])
@@ -0,0 +1,127 @@
+"""
+Synthetic dataset generator for benchmarks and load tests.
+
+    DATABASE_URL=sqlite:///./big.db python benchmarks/seed.py                # defaults below
+    DATABASE_URL=sqlite:///./big.db python benchmarks/seed.py --orders 5000000 --stores 2000
+
+Migrates the database at DATABASE_URL, then bulk-inserts:
+
+* an admin ("admin"), one owner per OWNER_STORES stores ("owner0", "owner1", …)
+  and `--customers` customers ("customer0", …), all with the password
+  PASSWORD and already verified;
+* `--stores` stores spread round-robin over models.STORE_CATEGORIES and
+  MENU_STYLES, each with `--services` menu items;
+* `--orders` orders over the last two years.  Store popularity follows a
+  Zipf curve, so a few stores are hot and most are quiet, like real traffic.
+  Most are guest orders, statuses are mostly Completed.
+
+Everything comes from one seeded random.Random, so the same arguments give
+the same ids and rows every time.  Rollups and the search index are rebuilt
+at the end, the same way `python migrations.py` would for an existing db.
+"""
+import argparse, os, random, sys, time, uuid
+from datetime import datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+PASSWORD = "bench-pass"
+OWNER_STORES = 3            # stores per owner
+BATCH = 50_000
+STATUSES = (["Completed"] * 80 + ["Pending"] * 8 + ["Preparing"] * 4 + ["Ready"] * 3
+            + ["Cancelled"] * 5)
+DISHES = ("Margherita", "Carbonara", "Ramen", "Burrito", "Falafel", "Pho", "Croissant", "Tiramisu",
+          "Lassi", "Espresso", "Haircut", "Manicure", "Phone repair", "Dog walk", "Yoga class")
+
+
+def zipf_weights(n, s=1.0):
+    """Cumulative Zipf weights for rank 1..n, for random.choices(cum_weights=...)."""
+    total, cum = 0.0, []
+    for rank in range(1, n + 1):
+        total += 1 / rank ** s
+        cum.append(total)
+    return cum
+
+
+def seed(db, stores=200, services=25, customers=500, orders=200_000, rng_seed=42, log=print):
+    import models, rollups, search
+    from auth import hash_password
+    from sqlalchemy import insert
+
+    rng = random.Random(rng_seed)
+    new_id = lambda: str(uuid.UUID(int=rng.getrandbits(128), version=4))
+    now = datetime.utcnow().replace(microsecond=0)
+    hashed = hash_password(PASSWORD)        # one hash for everybody: seeding stays fast
+    start = time.perf_counter()
+
+    n_owners = max(1, -(-stores // OWNER_STORES))
+    users = [{"id": new_id(), "username": "admin", "email": "admin@bench.test", "role": "admin",
+              "hashed_password": hashed, "is_verified": True}]
+    users += [{"id": new_id(), "username": f"owner{i}", "email": f"owner{i}@bench.test", "role": "user",
+               "hashed_password": hashed, "is_verified": True} for i in range(n_owners)]
+    users += [{"id": new_id(), "username": f"customer{i}", "email": f"customer{i}@bench.test",
+               "role": "user", "hashed_password": hashed, "is_verified": True} for i in range(customers)]
+    db.execute(insert(models.User), users)
+    owners, customer_ids = users[1:1 + n_owners], [u["id"] for u in users[1 + n_owners:]]
+
+    store_rows = []
+    for i in range(stores):
+        category = models.STORE_CATEGORIES[i % len(models.STORE_CATEGORIES)]
+        store_rows.append({
+            "id": new_id(), "name": f"{rng.choice(DISHES)} {category.title()} {i}",
+            "description": f"Synthetic {category} store number {i}", "category": category,
+            "menu_style": models.MENU_STYLES[i % len(models.MENU_STYLES)],
+            "owner_id": owners[i // OWNER_STORES]["id"],
+            "created_at": now - timedelta(days=rng.randint(30, 730), seconds=i)})
+    db.execute(insert(models.Store), store_rows)
+
+    service_rows = [{"id": new_id(), "name": f"{rng.choice(DISHES)} {j}",
+                     "description": f"House {rng.choice(DISHES).lower()} with a twist",
+                     "price": rng.randint(2, 40), "store_id": s["id"]}
+                    for s in store_rows for j in range(services)]
+    db.execute(insert(models.Service), service_rows)
+    db.commit()
+    log(f"[seed] {len(users)} users, {stores} stores, {len(service_rows)} menu items")
+
+    cum = zipf_weights(stores)
+    by_store = [service_rows[i * services:(i + 1) * services] for i in range(stores)]
+    minutes = 60 * 24 * 730
+    for offset in range(0, orders, BATCH):
+        batch = []
+        for _ in range(min(BATCH, orders - offset)):
+            svc = rng.choice(by_store[rng.choices(range(stores), cum_weights=cum)[0]])
+            dine_in = rng.random() < 0.7
+            batch.append({
+                "id": new_id(), "service_id": svc["id"], "store_id": svc["store_id"], "price": svc["price"],
+                "user_id": rng.choice(customer_ids) if customer_ids and rng.random() < 0.2 else None,
+                "status": rng.choice(STATUSES), "quantity": rng.randint(1, 3),
+                "order_type": "dine-in" if dine_in else "delivery",
+                "table_number": str(rng.randint(1, 30)) if dine_in else None,
+                "delivery_address": None if dine_in else f"{rng.randint(1, 200)} Bench Street",
+                "customer_name": f"Guest {rng.randint(1, 9999)}",
+                "created_at": now - timedelta(minutes=rng.randint(0, minutes), seconds=rng.randint(0, 59))})
+        db.execute(insert(models.Order), batch)
+        db.commit()
+        log(f"[seed] {offset + len(batch)}/{orders} orders")
+
+    months = rollups.rebuild(db)
+    if search.setup(db):
+        search.rebuild(db)
+    log(f"[seed] {months} rollup rows, search index rebuilt; {time.perf_counter() - start:.1f}s")
+    return {"stores": [s["id"] for s in store_rows], "owners": [o["username"] for o in owners]}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed a synthetic dataset into DATABASE_URL.")
+    parser.add_argument("--stores", type=int, default=200)
+    parser.add_argument("--services", type=int, default=25, help="menu items per store")
+    parser.add_argument("--customers", type=int, default=500)
+    parser.add_argument("--orders", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    import migrations
+    from database import SessionLocal
+    with SessionLocal() as db:
+        migrations.migrate(db, log=lambda msg: None)
+        seed(db, args.stores, args.services, args.customers, args.orders, args.seed)
@@ -0,0 +1,125 @@
+"""
+Check that peak memory per image upload stays bounded.
+
+    python benchmarks/upload_memory.py
+
+Each case runs in a fresh process so its peak RSS is its own:
+
+* read-all  – the old handler: `await file.read()` of a 9 MiB upload;
+* streamed  – `images.save_upload()` of the same upload;
+* photo     – `images.process()` on a 24-megapixel JPEG (decoded at reduced scale);
+* photo-png – the same photo as PNG (no reduced-scale decode for PNG);
+* bomb      – a 20000×20000 PNG of a few hundred KiB, refused from its header.
+
+The API check then sends an over-limit body through the app and expects 413
+before the handler ever runs.  Exits non-zero if any case goes over its limit.
+"""
+import json, os, resource, subprocess, sys, tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+# case -> peak RSS growth allowed, MiB (None = just report)
+LIMITS = {"read-all": None, "streamed": 8, "photo": 64, "photo-png": 400, "bomb": 2}
+
+
+def rss_mib():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def make_inputs(directory):
+    from PIL import Image
+    photo = Image.effect_noise((1500, 1000), 40).convert("RGB").resize((6000, 4000))
+    photo.save(os.path.join(directory, "photo.jpg"), quality=90)
+    photo.save(os.path.join(directory, "photo.png"), compress_level=1)
+    Image.new("L", (20000, 20000)).save(os.path.join(directory, "bomb.png"))
+    with open(os.path.join(directory, "upload.bin"), "wb") as f:
+        f.write(os.urandom(9 * 1024 * 1024))
+
+
+def case(name, directory):
+    """Runs inside the child process; prints the peak RSS growth in MiB."""
+    import asyncio
+    from starlette.datastructures import UploadFile
+    import images
+    from PIL import Image
+    Image.open(os.path.join(directory, "photo.jpg")).close()     # load the codecs before the baseline
+    baseline = rss_mib()
+
+    def upload():
+        spool = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)   # what Starlette hands the handler
+        with open(os.path.join(directory, "upload.bin"), "rb") as f:
+            while chunk := f.read(1024 * 1024):
+                spool.write(chunk)
+        spool.seek(0)
+        return UploadFile(spool)
+
+    if name == "read-all":
+        data = asyncio.run(upload().read())
+        assert len(data) == 9 * 1024 * 1024
+    elif name == "streamed":
+        os.unlink(asyncio.run(images.save_upload(upload(), directory))[0])
+    elif name in ("photo", "photo-png"):
+        src = os.path.join(directory, "photo.jpg" if name == "photo" else "photo.png")
+        images.process(src, "product", directory, "", name)
+    elif name == "bomb":
+        try:
+            images.process(os.path.join(directory, "bomb.png"), "product", directory, "", name)
+            raise SystemExit("bomb was accepted")
+        except images.UploadTooLarge:
+            pass
+    print(json.dumps(rss_mib() - baseline))
+
+
+def check_api():
+    os.chdir(tempfile.mkdtemp())
+    os.makedirs("static")
+    os.environ["DATABASE_URL"] = "sqlite:///./bench.db"
+    os.environ["MAIL_DISPATCHER"] = "0"
+    from fastapi.testclient import TestClient
+    import migrations
+    from database import SessionLocal
+    with SessionLocal() as db:
+        migrations.migrate(db, log=lambda msg: None)
+    import main, images
+    body = b"x" * (images.MAX_UPLOAD_BYTES + 1024 * 1024)
+    with TestClient(main.app) as client:
+        declared = client.post("/upload-image", files={"file": ("big.jpg", body, "image/jpeg")})
+
+        def chunked():                      # no Content-Length: counted as it arrives
+            yield b"--b\r\nContent-Disposition: form-data; name=\"file\"; filename=\"big.jpg\"\r\n"
+            yield b"Content-Type: image/jpeg\r\n\r\n"
+            for i in range(0, len(body), 1024 * 1024):
+                yield body[i:i + 1024 * 1024]
+            yield b"\r\n--b--\r\n"
+        streamed = client.post("/upload-image", content=chunked(),
+                               headers={"Content-Type": "multipart/form-data; boundary=b"})
+    return declared.status_code, streamed.status_code
+
+
+def run():
+    directory = tempfile.mkdtemp()
+    # Children inherit the parent's peak RSS, so build the big inputs in a child too
+    subprocess.run([sys.executable, __file__, "--make", directory], check=True)
+    failed = False
+    print(f"{'case':>10} {'peak RSS growth MiB':>20} {'limit':>6}")
+    for name, limit in LIMITS.items():
+        out = subprocess.run([sys.executable, __file__, "--case", name, directory],
+                             capture_output=True, text=True, check=True).stdout
+        growth = json.loads(out.strip().splitlines()[-1])
+        bad = limit is not None and growth > limit
+        failed |= bad
+        print(f"{name:>10} {growth:>20.1f} {limit if limit is not None else '-':>6}{'  FAIL' if bad else ''}")
+    declared, streamed = check_api()
+    print(f"over-limit upload: {declared} with Content-Length, {streamed} chunked")
+    failed |= (declared, streamed) != (413, 413)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--make"]:
+        make_inputs(sys.argv[2])
+    elif sys.argv[1:2] == ["--case"]:
+        case(sys.argv[2], sys.argv[3])
+    else:
+        run()
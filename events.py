@@ -0,0 +1,129 @@
+"""
+In-process order event feed for store dashboards.
+
+Order handlers call `feed.publish(store_id, kind, data)`; owners subscribe to
+a store over Server-Sent Events and receive only the new events instead of
+re-downloading the whole order list.  Every event gets an increasing id so a
+reconnecting browser (which sends `Last-Event-ID`) can resume from a short
+per-store history.  GET /store-orders returns the current id as X-Feed-Id,
+read before the list itself; opening the feed with ?last_id= set to it
+replays whatever happened while the list was being fetched.
+
+Memory is bounded on both sides: each store keeps at most HISTORY_SIZE
+recent events, and each subscriber buffers at most QUEUE_SIZE undelivered
+ones.  A subscriber that falls further behind, or resumes from an id that is
+no longer in history, is sent a single `reset` event and should reload the
+full list once.
+
+The feed lives in this process only; when running several workers, each
+worker only sees the orders it handled itself.
+"""
+import asyncio
+import itertools
+import json
+import threading
+from collections import defaultdict, deque
+
+HISTORY_SIZE = 200
+QUEUE_SIZE = 100
+HEARTBEAT_SECONDS = 15
+
+RESET = "reset"
+
+
+class _Subscriber:
+    __slots__ = ("loop", "queue")
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    def offer(self, event):
+        """Runs on the subscriber's event loop."""
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = (None, RESET, {})
+        self.queue.put_nowait(event)
+
+
+class OrderFeed:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._last_id = 0
+        self._history = defaultdict(lambda: deque(maxlen=HISTORY_SIZE))
+        self._evicted = defaultdict(int)      # store_id -> newest id dropped from history
+        self._subscribers = defaultdict(set)
+
+    def publish(self, store_id, kind, data):
+        """Record an event for a store and hand it to its subscribers. Thread-safe."""
+        with self._lock:
+            event_id = self._last_id = next(self._ids)
+            history = self._history[store_id]
+            if len(history) == history.maxlen:
+                self._evicted[store_id] = history[0][0]
+            event = (event_id, kind, data)
+            history.append(event)
+            subscribers = list(self._subscribers.get(store_id, ()))
+        for sub in subscribers:
+            try:
+                sub.loop.call_soon_threadsafe(sub.offer, event)
+            except RuntimeError:
+                pass    # subscriber's loop already closed
+
+    @property
+    def last_id(self):
+        """Id of the newest event published so far (0 before the first)."""
+        return self._last_id
+
+    def subscribe(self, store_id, last_event_id=None):
+        """Register a subscriber on the running loop; returns it with any backlog to replay."""
+        sub = _Subscriber(asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers[store_id].add(sub)
+            if last_event_id is None:
+                backlog = []
+            elif last_event_id < self._evicted.get(store_id, 0) or last_event_id > self._last_id:
+                backlog = [(None, RESET, {})]
+            else:
+                backlog = [e for e in self._history.get(store_id, ()) if e[0] > last_event_id]
+        return sub, backlog
+
+    def unsubscribe(self, store_id, sub):
+        with self._lock:
+            subs = self._subscribers.get(store_id)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[store_id]
+
+    async def stream(self, store_id, last_event_id=None):
+        """Yield SSE-formatted text for one subscriber until the client goes away."""
+        sub, backlog = self.subscribe(store_id, last_event_id)
+        try:
+            yield "retry: 3000\n\n"
+            for event in backlog:
+                yield _format(event)
+            while True:
+                try:
+                    event = await asyncio.wait_for(sub.queue.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield _format(event)
+        finally:
+            self.unsubscribe(store_id, sub)
+
+
+def _format(event):
+    event_id, kind, data = event
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {kind}\ndata: {json.dumps(data, default=_json_default)}\n\n"
+
+
+def _json_default(value):
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+
+feed = OrderFeed()
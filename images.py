@@ -0,0 +1,347 @@
+"""
+Upload pipeline for store banners, logos and menu photos.
+
+Owners can upload any image.  `process()` turns it into the files the
+front-ends actually serve:
+
+* the image is rotated upright (EXIF orientation) and centre-cropped to the
+  slot's aspect ratio – 4:3 for products, 4:1 for banners, 1:1 for logos;
+* it is resized to each of the slot's widths that the source is large enough
+  for (never upscaled), and each width is written once per format in
+  IMAGE_FORMATS (default "webp,jpeg"; add "avif" if the server is fast enough);
+* EXIF, ICC profiles, comments and other metadata are dropped.
+
+The result is a manifest with a `srcset` string per MIME type, ready for a
+<picture> element, plus `url`/`width`/`height` of the largest JPEG (or
+whatever the last format is) for plain <img> tags.
+
+Pillow is CPU-bound and holds the GIL, so uploads are processed in a small
+process pool (IMAGE_WORKERS, default 2) – see `pool()` – instead of on the
+API's event loop or threads.
+
+Memory per upload is bounded end to end:
+
+* `BodyLimit` refuses request bodies over UPLOAD_MAX_BYTES (default 10 MiB)
+  with 413 while they are still arriving;
+* `save_upload()` copies the upload to a temp file in CHUNK_BYTES pieces
+  instead of reading it into memory, and the worker gets only the path;
+* `process()` reads the dimensions from the file header and refuses images
+  over UPLOAD_MAX_PIXELS (default 40 megapixels) before decoding anything,
+  and lets JPEGs decode at reduced scale when that still covers the output;
+* variants are written under temporary names and renamed into place only
+  once all of them have been written.
+
+Files are content-addressed: their names start with `content_key()`, a hash
+of the upload's bytes, the slot and the encoder settings.  Uploading the
+same image again returns the stored manifest (`<key>.json`) without
+re-processing, and a URL never changes content, so `UploadFiles` serves them
+with a one-year immutable Cache-Control.  Files that no store or menu item
+references any more are removed by
+
+    python images.py --gc [--dry-run]
+"""
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from fastapi.staticfiles import StaticFiles
+
+WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+MAX_UPLOAD_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(10 * 1024 * 1024)))
+MAX_PIXELS = int(os.getenv("UPLOAD_MAX_PIXELS", "40000000"))
+CHUNK_BYTES = 64 * 1024
+GC_GRACE_SECONDS = int(os.getenv("UPLOAD_GC_GRACE_SECONDS", str(24 * 3600)))
+FORMATS = [f.strip().lower() for f in os.getenv("IMAGE_FORMATS", "webp,jpeg").split(",") if f.strip()]
+
+# kind -> (aspect width, aspect height, output widths)
+SLOTS = {
+    "product": (4, 3, (400, 800)),
+    "banner":  (4, 1, (640, 1200, 1920)),
+    "logo":    (1, 1, (100, 200, 400)),
+}
+
+# format -> (extension, MIME type, Pillow save options)
+ENCODERS = {
+    "webp": ("webp", "image/webp", {"quality": 80, "method": 4}),
+    "avif": ("avif", "image/avif", {"quality": 60}),
+    "jpeg": ("jpg", "image/jpeg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+_pool = None
+
+# <key>-<width>.<ext> and <key>.json; older uploads are <uuid>.<ext>
+_KEYED = re.compile(r"^([0-9a-f]{32})(?:-\d+)?\.[a-z0-9]+$")
+
+
+class UploadTooLarge(ValueError):
+    """The upload exceeds UPLOAD_MAX_BYTES or UPLOAD_MAX_PIXELS."""
+
+
+class BodyLimit:
+    """ASGI middleware: answer 413 once a request body to `paths` passes `max_bytes`.
+
+    Checks Content-Length up front and counts the bytes actually received,
+    so chunked bodies are stopped as well.  Multipart overhead gets 64 KiB of
+    slack on top of the file limit.
+    """
+    def __init__(self, app, paths=("/upload-image",), max_bytes=MAX_UPLOAD_BYTES + 64 * 1024):
+        self.app = app
+        self.paths = set(paths)
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            return await self.app(scope, receive, send)
+        length = dict(scope["headers"]).get(b"content-length")
+        if length is not None and length.isdigit() and int(length) > self.max_bytes:
+            return await self._reject(send)
+
+        received, over, started = 0, False, False
+
+        async def limited_receive():
+            nonlocal received, over
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    over = True
+                    raise UploadTooLarge("request body too large")
+            return message
+
+        async def guarded_send(message):
+            nonlocal started
+            if over:        # the app's own error response for the aborted body is dropped
+                return
+            started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except UploadTooLarge:
+            over = True
+        if over and not started:
+            await self._reject(send)
+
+    async def _reject(self, send):
+        body = f'{{"detail":"Upload too large (limit {MAX_UPLOAD_BYTES // (1024 * 1024)} MiB)"}}'.encode()
+        await send({"type": "http.response.start", "status": 413,
+                    "headers": [(b"content-type", b"application/json"),
+                                (b"content-length", str(len(body)).encode()),
+                                (b"connection", b"close")]})
+        await send({"type": "http.response.body", "body": body})
+
+
+async def save_upload(file, directory):
+    """Copy an UploadFile to a temp file in `directory` chunk by chunk.
+
+    Returns (path, sha256 hex digest of the bytes).  Raises UploadTooLarge
+    past MAX_UPLOAD_BYTES.  The caller removes the file.
+    """
+    fd, path = tempfile.mkstemp(dir=directory, suffix=".upload")
+    size, digest = 0, hashlib.sha256()
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := await file.read(CHUNK_BYTES):
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    raise UploadTooLarge(f"upload is over {MAX_UPLOAD_BYTES} bytes")
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path, digest.hexdigest()
+
+
+def content_key(digest, kind):
+    """File name stem for an upload: changes with its bytes, its slot or the encoder settings."""
+    settings = repr((kind, SLOTS[kind], [(fmt, ENCODERS[fmt]) for fmt in FORMATS]))
+    return hashlib.sha256(f"{digest}|{settings}".encode()).hexdigest()[:32]
+
+
+def existing(key, out_dir):
+    """The stored manifest for `key` if every variant is still on disk, else None."""
+    try:
+        with open(os.path.join(out_dir, f"{key}.json")) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    paths = [os.path.join(out_dir, f"{key}.json")]
+    paths += [os.path.join(out_dir, v["url"].rsplit("/", 1)[-1]) for v in manifest["variants"]]
+    try:
+        for path in paths:
+            os.utime(path)          # re-uploaded: restart the garbage collector's grace period
+    except FileNotFoundError:
+        return None
+    return manifest
+
+
+class UploadFiles(StaticFiles):
+    """StaticFiles for the upload directory: names are content hashes, so cache forever."""
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
+
+def pool():
+    """The shared worker pool, started on first use."""
+    global _pool
+    if _pool is None:
+        # spawn, not fork: forking a process that runs threads (mailer, SQLite) is unsafe
+        _pool = ProcessPoolExecutor(WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def shutdown():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+
+def _widths(kind, src_w, src_h):
+    """Output widths for a source of src_w×src_h, largest never above the source."""
+    aw, ah, widths = SLOTS[kind]
+    max_w = min(src_w, src_h * aw // ah)
+    fit = [w for w in widths if w <= max_w]
+    return fit or [max_w]
+
+
+def _draft(src, kind):
+    """Let JPEGs decode at 1/2, 1/4 or 1/8 scale if that still covers the largest output."""
+    aw, ah, widths = SLOTS[kind]
+    need, (w, h) = max(widths), src.size
+    # Either side may end up horizontal once the EXIF orientation is applied
+    scale = max(need / min(w, h * aw / ah), need / min(h, w * aw / ah))
+    if scale < 1:
+        src.draft("RGB", (math.ceil(w * scale), math.ceil(h * scale)))
+
+
+def process(path, kind, out_dir, url_prefix, key):
+    """Decode the image at `path`, write every variant to `out_dir`, return the manifest.
+
+    Files are named after `key` (see `content_key()`); the manifest is saved
+    next to them as `<key>.json`.
+
+    Runs in a pool worker.  Raises UploadTooLarge past MAX_PIXELS and
+    OSError / ValueError for files it cannot decode.
+    """
+    from PIL import Image, ImageOps
+    Image.MAX_IMAGE_PIXELS = MAX_PIXELS
+
+    aw, ah, _ = SLOTS[kind]
+    try:
+        src = Image.open(path)          # reads the header only
+    except Image.DecompressionBombError as exc:
+        raise UploadTooLarge(str(exc))
+    with src:
+        w, h = src.size
+        if w * h > MAX_PIXELS:
+            raise UploadTooLarge(f"{w}×{h} is over {MAX_PIXELS} pixels")
+        _draft(src, kind)
+        src.load()
+        img = ImageOps.exif_transpose(src)
+    has_alpha = img.mode in ("RGBA", "LA", "PA") or (img.mode == "P" and "transparency" in img.info)
+    img = img.convert("RGBA" if has_alpha else "RGB")
+
+    widths = sorted(_widths(kind, *img.size), reverse=True)
+    frames, frame = {}, None
+    for w in widths:
+        h = max(1, round(w * ah / aw))
+        # Crop once at the largest width, then scale that frame down
+        frame = (ImageOps.fit(img, (w, h), Image.Resampling.LANCZOS) if frame is None
+                 else frame.resize((w, h), Image.Resampling.LANCZOS))
+        frame.info = {}
+        frames[w] = frame
+
+    variants, srcset, written = [], {}, []
+    try:
+        for fmt in FORMATS:
+            ext, mime, options = ENCODERS[fmt]
+            for w in reversed(widths):
+                out = frames[w]
+                if fmt == "jpeg" and has_alpha:
+                    flat = Image.new("RGB", out.size, (255, 255, 255))
+                    flat.paste(out, mask=out.getchannel("A"))
+                    out = flat
+                name = f"{key}-{w}.{ext}"
+                final = os.path.join(out_dir, name)
+                out.save(final + ".part", fmt.upper(), **options)
+                written.append(final)
+                variants.append({"url": f"{url_prefix}/{name}", "width": w, "height": out.height,
+                                 "format": mime, "bytes": os.path.getsize(final + ".part")})
+            srcset[mime] = ", ".join(f"{v['url']} {v['width']}w" for v in variants if v["format"] == mime)
+        best = variants[-1]
+        manifest = {"kind": kind, "url": best["url"], "width": best["width"], "height": best["height"],
+                    "srcset": srcset, "variants": variants}
+        final = os.path.join(out_dir, f"{key}.json")
+        with open(final + ".part", "w") as f:
+            json.dump(manifest, f)
+        written.append(final)
+    except BaseException:
+        for final in written:
+            os.unlink(final + ".part")
+        raise
+    # Publish only complete sets, manifest last: `existing()` never sees a partial one
+    for final in written:
+        os.replace(final + ".part", final)
+    return manifest
+
+
+def collect_garbage(db, out_dir, grace_seconds=GC_GRACE_SECONDS, dry_run=False, log=print):
+    """Delete uploads that no store banner/logo or menu item references any more.
+
+    Variants of one upload are kept or removed together.  Anything modified
+    within `grace_seconds` is kept, so an image uploaded but not yet saved
+    to its store or menu item survives.  Returns (files removed, bytes freed).
+    """
+    import models
+    St, S = models.Store, models.Service
+    urls = [u for (u,) in db.query(St.banner_image_url).union(
+                db.query(St.logo_url), db.query(S.image_url)) if u]
+    group = lambda name: (m.group(1) if (m := _KEYED.match(name)) else name)
+    referenced = {group(u.split("?", 1)[0].rsplit("/", 1)[-1]) for u in urls}
+
+    groups = {}
+    if not os.path.isdir(out_dir):
+        return 0, 0
+    for entry in os.scandir(out_dir):
+        if entry.is_file():
+            groups.setdefault(group(entry.name), []).append(entry)
+    cutoff = time.time() - grace_seconds
+    removed = freed = 0
+    for name, entries in groups.items():
+        if name in referenced or any(e.stat().st_mtime > cutoff for e in entries):
+            continue
+        for entry in entries:
+            size = entry.stat().st_size
+            if not dry_run:
+                os.unlink(entry.path)
+            removed += 1
+            freed += size
+            log(f"[images] {'Would remove' if dry_run else 'Removed'} {entry.name}")
+    return removed, freed
+
+
+if __name__ == "__main__":
+    import sys
+    if sys.argv[1:2] == ["--gc"]:
+        from database import SessionLocal
+        with SessionLocal() as db:
+            removed, freed = collect_garbage(db, "static/uploads", dry_run="--dry-run" in sys.argv)
+        print(f"[images] {removed} unreferenced files, {freed / 1024 / 1024:.1f} MiB")
+        sys.exit(0)
+    if len(sys.argv) < 3 or sys.argv[2] not in SLOTS:
+        sys.exit(f"usage: python images.py IMAGE {{{'|'.join(SLOTS)}}} [OUT_DIR]\n"
+                 f"       python images.py --gc [--dry-run]")
+    out_dir = sys.argv[3] if len(sys.argv) > 3 else "."
+    with open(sys.argv[1], "rb") as f:
+        key = content_key(hashlib.sha256(f.read()).hexdigest(), sys.argv[2])
+    print(json.dumps(process(sys.argv[1], sys.argv[2], out_dir, out_dir.rstrip("/"), key), indent=2))
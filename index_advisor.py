@@ -0,0 +1,103 @@
+"""
+Index advisor: EXPLAIN QUERY PLAN for the hot endpoint queries.
+
+Each entry in QUERIES builds the same query an endpoint runs (with sample
+parameters).  `check()` asks SQLite for its plan and flags any step that
+scans a whole table instead of searching an index.
+
+    python index_advisor.py            # print every plan, exit 1 on a SCAN
+
+Set INDEX_ADVISOR=1 to have main.py print the report at startup.
+"""
+from datetime import datetime
+
+import models
+import loading
+import analytics
+
+O, S, St, U = models.Order, models.Service, models.Store, models.User
+_SAMPLE = "00000000-0000-0000-0000-000000000000"
+
+
+def _newest(query, *key):
+    return query.order_by(*[c.desc() for c in key]).limit(100)
+
+
+QUERIES = {
+    "GET /stores":
+        lambda db: _newest(loading.stores(db), *loading.STORE_KEY),
+    "GET /stores?category=":
+        lambda db: _newest(loading.stores(db).filter(St.category == "food"), *loading.STORE_KEY),
+    "GET /stores/{id}":
+        lambda db: loading.columns(loading.stores(db), loading.STORE_FIELDS).filter(St.id == _SAMPLE),
+    "GET /my-stores":
+        lambda db: loading.columns(loading.stores(db), loading.MY_STORE_FIELDS).filter(St.owner_id == _SAMPLE),
+    "GET /stores/{id}/services":
+        lambda db: loading.columns(loading.menu_items(db), loading.MENU_FIELDS).filter(S.store_id == _SAMPLE),
+    "GET /orders":
+        lambda db: _newest(loading.orders(db).filter(O.user_id == _SAMPLE), *loading.ORDER_KEY),
+    "GET /store-orders/{id}":
+        lambda db: _newest(loading.orders(db).filter(O.store_id == _SAMPLE), *loading.ORDER_KEY),
+    "GET /admin/orders":
+        lambda db: _newest(loading.orders(db), *loading.ORDER_KEY),
+    "PUT /orders/{id}":
+        lambda db: loading.order_for_update(db).filter(O.id == _SAMPLE),
+    "GET /my-stores/analytics?start=":
+        lambda db: analytics.grouped_orders_query(db, [_SAMPLE], datetime(2024, 1, 1), datetime(2024, 2, 1)),
+    "GET /verify-email":
+        lambda db: db.query(U).filter(U.verification_token == _SAMPLE),
+    "POST /login":
+        lambda db: db.query(U).filter(U.username == _SAMPLE),
+    "GET /my-stores/analytics":
+        lambda db: db.query(models.OrderRollup).filter(models.OrderRollup.store_id.in_([_SAMPLE])),
+}
+
+
+def _explain(db, query):
+    compiled = query.statement.compile(dialect=db.get_bind().dialect,
+                                       compile_kwargs={"render_postcompile": True})
+    params = [_raw(compiled.params[name]) for name in compiled.positiontup]
+    rows = db.connection().exec_driver_sql("EXPLAIN QUERY PLAN " + str(compiled), tuple(params))
+    return [row[-1] for row in rows]
+
+
+def _raw(value):
+    return value.isoformat(" ") if isinstance(value, datetime) else value
+
+
+def _is_full_scan(step):
+    return step.startswith("SCAN ") and " INDEX " not in step and "CONSTANT ROW" not in step
+
+
+def check(db):
+    """Return {endpoint: (plan_steps, flagged_steps)} for every registered query."""
+    if db.get_bind().dialect.name != "sqlite":
+        return {}
+    report = {}
+    for name, build in QUERIES.items():
+        plan = _explain(db, build(db))
+        report[name] = (plan, [s for s in plan if _is_full_scan(s)])
+    return report
+
+
+def print_report(db, verbose=False):
+    """Print the advisor report; returns True when no query does a full scan."""
+    ok = True
+    for name, (plan, flagged) in check(db).items():
+        ok &= not flagged
+        if flagged or verbose:
+            print(f"[index-advisor] {'SCAN ' if flagged else 'ok   '} {name}")
+            for step in plan:
+                print(f"                      {'!!' if step in flagged else '  '} {step}")
+    return ok
+
+
+if __name__ == "__main__":
+    import sys
+    from database import SessionLocal, engine
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        sys.exit(0 if print_report(db, verbose=True) else 1)
+    finally:
+        db.close()
@@ -0,0 +1,178 @@
+"""
+Query shapes for the API endpoints.
+
+Every endpoint that reads related rows gets its query from here, so the
+loading strategy is declared in one place instead of being left to
+per-row lazy loads:
+
+* read endpoints are column-only: the *_FIELDS maps name the SQL columns
+  each response field comes from (see pagination.page and `columns`), and
+  the joins that feed them are set up once per query.  Rows go from SQL
+  tuples to dicts to JSON without ORM objects; schemas.py declares the
+  matching response models;
+* endpoints that still work with ORM objects eager-load exactly the
+  relationships they read and use raiseload("*") for everything else, so
+  a stray `obj.relationship` access fails loudly instead of adding a
+  SELECT per row.
+
+database.count_queries() can be used to check that each endpoint issues
+a constant number of statements (see benchmarks/query_counts.py).
+"""
+from sqlalchemy import func, select
+from sqlalchemy.orm import raiseload
+from sqlalchemy.sql.visitors import replacement_traverse
+
+import models
+
+O, S, St, U = models.Order, models.Service, models.Store, models.User
+A = models.ArchivedOrder
+
+# What the customer was charged per unit; the menu price for orders that predate it
+ORDER_PRICE = func.coalesce(O.price, S.price)
+
+
+# ── Column-only read endpoints ──────────────────────────────────────────────
+
+STORE_FIELDS = {
+    "id": St.id, "name": St.name, "description": St.description,
+    "owner_id": St.owner_id, "owner_name": U.username,
+    "category":        func.coalesce(St.category,        "services"),
+    "menu_style":      func.coalesce(St.menu_style,      "grid"),
+    "primary_color":   func.coalesce(St.primary_color,   "#667eea"),
+    "secondary_color": func.coalesce(St.secondary_color, "#764ba2"),
+    "accent_color":    func.coalesce(St.accent_color,    "#28a745"),
+    "theme":           func.coalesce(St.theme,           "modern"),
+    "banner_image_url": St.banner_image_url,
+    "logo_url":         St.logo_url,
+    "tagline":          St.tagline,
+    "welcome_message":  St.welcome_message,
+    "footer_text":      St.footer_text,
+}
+STORE_KEY = (St.created_at, St.id)
+
+SERVICE_FIELDS = {
+    "id": S.id, "name": S.name, "description": S.description, "price": S.price,
+    "store_id": S.store_id, "image_url": S.image_url, "store_name": St.name,
+}
+SERVICE_KEY = (S.id,)
+
+MENU_FIELDS = {
+    "id": S.id, "name": S.name, "description": S.description, "price": S.price,
+    "store_id": S.store_id, "image_url": S.image_url,
+}
+
+MY_STORE_FIELDS = {
+    **STORE_FIELDS,
+    # correlated COUNT subquery: one statement however many stores
+    "services_count": (select(func.count(S.id)).where(S.store_id == St.id)
+                       .correlate(St).scalar_subquery()),
+}
+
+MY_ORDER_FIELDS = {
+    "id": O.id, "status": O.status, "service_name": S.name,
+    "store_name": St.name, "price": ORDER_PRICE, "created_at": O.created_at,
+}
+
+STORE_ORDER_FIELDS = {
+    "id": O.id, "status": O.status,
+    "customer_name": func.coalesce(O.customer_name, U.username, "Guest"),
+    "customer_phone": O.customer_phone, "service_name": S.name,
+    "price": ORDER_PRICE, "quantity": O.quantity, "order_type": O.order_type,
+    "table_number": O.table_number, "delivery_address": O.delivery_address,
+    "notes": O.notes, "created_at": O.created_at,
+}
+
+ADMIN_ORDER_FIELDS = {
+    "id": O.id, "status": O.status,
+    "customer_name": func.coalesce(O.customer_name, U.username, "Guest"),
+    "store_name": St.name, "service_name": S.name,
+    "price": ORDER_PRICE, "quantity": O.quantity,
+    "order_type": O.order_type, "created_at": O.created_at,
+}
+ORDER_KEY = (O.created_at, O.id)
+
+EXPORT_ORDER_FIELDS = {
+    "id": O.id, "created_at": O.created_at, "status": O.status,
+    "store_id": O.store_id, "store_name": St.name, "service_name": S.name,
+    "price": ORDER_PRICE, "quantity": O.quantity,
+    "customer_name": func.coalesce(O.customer_name, U.username, "Guest"),
+    "customer_phone": O.customer_phone, "order_type": O.order_type,
+    "table_number": O.table_number, "delivery_address": O.delivery_address,
+    "notes": O.notes,
+}
+
+
+def stores(db):
+    return db.query(St).outerjoin(U, U.id == St.owner_id)
+
+
+def services(db):
+    return db.query(S).outerjoin(St, St.id == S.store_id)
+
+
+def orders(db):
+    return (db.query(O)
+            .outerjoin(S, S.id == O.service_id)
+            .outerjoin(St, St.id == O.store_id)
+            .outerjoin(U, U.id == O.user_id))
+
+
+def menu_items(db):
+    return db.query(S)
+
+
+def columns(query, fields):
+    """`query` selecting just the labelled columns of a *_FIELDS map."""
+    return query.with_entities(*[col.label(name) for name, col in fields.items()])
+
+
+def dicts(query):
+    """Every row of a `columns` query as a plain dict."""
+    return [row._asdict() for row in query]
+
+
+# ── Archived orders (see archive.py) ────────────────────────────────────────
+
+ARCHIVED_ORDER_KEY = (A.created_at, A.id)
+_archived_fields = {}
+
+
+def archived(expr):
+    """`expr` with every `orders` column swapped for its `orders_archive` twin."""
+    def swap(el):
+        if getattr(el, "table", None) is O.__table__:
+            return A.__table__.c[el.key]
+    return replacement_traverse(expr, {}, swap)
+
+
+def archived_fields(fields):
+    """The archive version of a module-level *_FIELDS map (built once per map)."""
+    if id(fields) not in _archived_fields:
+        _archived_fields[id(fields)] = {name: archived(col) for name, col in fields.items()}
+    return _archived_fields[id(fields)]
+
+
+def archived_orders(db):
+    """`orders(db)` over orders_archive: same joins, same output columns."""
+    return (db.query(A)
+            .outerjoin(S, S.id == A.service_id)
+            .outerjoin(St, St.id == A.store_id)
+            .outerjoin(U, U.id == A.user_id))
+
+
+# ── ORM endpoints ───────────────────────────────────────────────────────────
+
+def order_for_update(db):
+    """(Order, store owner_id, unit price) in a single joined SELECT."""
+    return (db.query(O, St.owner_id, ORDER_PRICE)
+            .outerjoin(St, St.id == O.store_id)
+            .outerjoin(S, S.id == O.service_id)
+            .options(raiseload("*")))
+
+
+def order_statuses(db):
+    """Bulk status changes: each order's old status, rollup inputs and store owner in one SELECT."""
+    return (db.query(O.id, O.store_id, O.status, O.created_at, O.quantity, St.owner_id,
+                     ORDER_PRICE.label("price"))
+            .outerjoin(St, St.id == O.store_id)
+            .outerjoin(S, S.id == O.service_id))
@@ -0,0 +1,236 @@
+"""
+Durable email outbox.
+
+Request handlers never talk to SMTP.  They call `enqueue()`, which adds a
+row to `email_outbox` in the handler's own transaction, so the mail is sent
+if and only if the request's other changes commit.  A background
+dispatcher thread then drains the outbox:
+
+* due messages are claimed in batches of up to BATCH_SIZE and sent over one
+  SMTP session, which is kept open and reused while mail keeps coming and
+  closed after IDLE_SECONDS without any;
+* a failed message is retried with exponential backoff (RETRY_BASE_SECONDS
+  doubling up to RETRY_MAX_SECONDS) and marked `failed` after MAX_ATTEMPTS;
+* claims are leases: a row is taken by setting `claim` and pushing
+  `next_attempt_at` LEASE_SECONDS ahead, so several workers can run a
+  dispatcher against one database without sending the same row twice, and
+  a crashed worker's rows become due again when the lease runs out.
+
+SMTP settings come from the environment:
+    SMTP_HOST     – e.g. smtp.gmail.com        (default: localhost)
+    SMTP_PORT     – e.g. 587                   (default: 587)
+    SMTP_USER     – sender account / username
+    SMTP_PASSWORD – sender password / app-password
+    SMTP_FROM     – From address               (falls back to SMTP_USER)
+    SMTP_USE_TLS  – "true" (STARTTLS), "false" (implicit TLS / SMTPS) or
+                    "none" (plain SMTP, for a local relay or test server)
+
+Set MAIL_DISPATCHER=0 to keep the web workers from sending, and run the
+dispatcher as its own process instead:
+
+    python mailer.py
+"""
+import os
+import random
+import smtplib
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from sqlalchemy import event
+
+import models
+from database import SessionLocal
+
+BATCH_SIZE = 50
+POLL_SECONDS = 5
+IDLE_SECONDS = 30
+LEASE_SECONDS = 300
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 3600
+MAX_ATTEMPTS = 8
+
+M = models.EmailOutbox
+
+
+def enqueue(db, to_email, subject, text_body, html_body=None):
+    """Queue a message. It is sent once the caller commits; does not commit."""
+    db.add(M(to_email=to_email, subject=subject, text_body=text_body, html_body=html_body,
+             status="pending", attempts=0, next_attempt_at=datetime.utcnow()))
+    # Wake the dispatcher once the row is committed and visible to it
+    event.listen(db, "after_commit", lambda session: dispatcher.wake(), once=True)
+
+
+def _settings():
+    user = os.getenv("SMTP_USER", "")
+    return {
+        "host": os.getenv("SMTP_HOST", "localhost"),
+        "port": int(os.getenv("SMTP_PORT", "587")),
+        "user": user,
+        "password": os.getenv("SMTP_PASSWORD", ""),
+        "from": os.getenv("SMTP_FROM", user),
+        "tls": os.getenv("SMTP_USE_TLS", "true").lower(),
+    }
+
+
+def _message(row, sender):
+    msg = MIMEMultipart("alternative")
+    msg["Subject"] = row.subject
+    msg["From"]    = sender
+    msg["To"]      = row.to_email
+    msg.attach(MIMEText(row.text_body, "plain"))
+    if row.html_body:
+        msg.attach(MIMEText(row.html_body, "html"))
+    return msg.as_string()
+
+
+def backoff(attempts):
+    """Seconds to wait before the next try after `attempts` failures (with 10% jitter)."""
+    delay = min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+    return delay * random.uniform(1.0, 1.1)
+
+
+class Dispatcher:
+    def __init__(self):
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._smtp = None
+        self._last_used = 0.0
+        self.connections = 0        # SMTP sessions opened, for the benchmark / logs
+
+    # ── lifecycle ────────────────────────────────────────────────────────────
+    def start(self):
+        if self._thread is None and os.getenv("MAIL_DISPATCHER", "1") != "0":
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run, name="mail-dispatcher", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=10):
+        if self._thread is not None:
+            self._stop.set(); self._wake.set()
+            self._thread.join(timeout)
+            self._thread = None
+
+    def wake(self):
+        self._wake.set()
+
+    def run(self):
+        while not self._stop.is_set():
+            try:
+                sent = self.drain()
+            except Exception as exc:        # keep the thread alive through DB hiccups
+                print(f"[mailer] Dispatcher error: {exc}")
+                sent = 0
+            if sent:
+                continue                    # more may be due; go straight back
+            if self._smtp is not None and time.monotonic() - self._last_used > IDLE_SECONDS:
+                self._close()
+            self._wake.wait(POLL_SECONDS)
+            self._wake.clear()
+        self._close()
+
+    # ── SMTP session ─────────────────────────────────────────────────────────
+    def _connect(self, cfg):
+        if self._smtp is not None:
+            try:
+                self._smtp.noop()
+                return self._smtp
+            except (OSError, smtplib.SMTPException):
+                self._close()
+        if cfg["tls"] == "false":
+            smtp = smtplib.SMTP_SSL(cfg["host"], cfg["port"], timeout=30)
+        else:
+            smtp = smtplib.SMTP(cfg["host"], cfg["port"], timeout=30)
+            if cfg["tls"] == "true":
+                smtp.ehlo(); smtp.starttls()
+        if cfg["user"] and cfg["password"]:
+            smtp.login(cfg["user"], cfg["password"])
+        self._smtp = smtp
+        self.connections += 1
+        return smtp
+
+    def _close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (OSError, smtplib.SMTPException):
+                pass
+            self._smtp = None
+
+    # ── outbox ───────────────────────────────────────────────────────────────
+    def _claim(self, db):
+        now = datetime.utcnow()
+        token = uuid.uuid4().hex
+        due = (db.query(M.id)
+               .filter(M.status == "pending", M.next_attempt_at <= now)
+               .order_by(M.next_attempt_at, M.id)
+               .limit(BATCH_SIZE)
+               .scalar_subquery())
+        db.query(M).filter(M.id.in_(due), M.status == "pending", M.next_attempt_at <= now) \
+          .update({M.claim: token, M.next_attempt_at: now + timedelta(seconds=LEASE_SECONDS)},
+                  synchronize_session=False)
+        db.commit()
+        return db.query(M).filter(M.claim == token).order_by(M.id).all()
+
+    def _failed(self, row, exc, permanent=False):
+        row.attempts = (row.attempts or 0) + 1
+        row.last_error = str(exc)[:500]
+        row.claim = None
+        if permanent or row.attempts >= MAX_ATTEMPTS:
+            row.status = "failed"
+            print(f"[mailer] Giving up on mail to {row.to_email}: {exc}")
+        else:
+            row.next_attempt_at = datetime.utcnow() + timedelta(seconds=backoff(row.attempts))
+
+    def drain(self):
+        """Send one batch of due messages. Returns how many were sent."""
+        db = SessionLocal()
+        try:
+            rows = self._claim(db)
+            if not rows:
+                return 0
+            cfg = _settings()
+            try:
+                smtp = self._connect(cfg)
+            except (OSError, smtplib.SMTPException) as exc:
+                for row in rows:
+                    self._failed(row, exc)
+                db.commit()
+                return 0
+            sent = 0
+            for i, row in enumerate(rows):
+                try:
+                    smtp.sendmail(cfg["from"], row.to_email, _message(row, cfg["from"]))
+                except smtplib.SMTPRecipientsRefused as exc:
+                    self._failed(row, exc, permanent=True)
+                except (OSError, smtplib.SMTPException) as exc:
+                    # The session is gone: reschedule this one, release the rest
+                    self._failed(row, exc)
+                    for rest in rows[i + 1:]:
+                        rest.claim, rest.next_attempt_at = None, datetime.utcnow()
+                    self._close()
+                    db.commit()
+                    break
+                else:
+                    row.status, row.sent_at, row.claim = "sent", datetime.utcnow(), None
+                    sent += 1
+                db.commit()
+            self._last_used = time.monotonic()
+            return sent
+        finally:
+            db.close()
+
+
+dispatcher = Dispatcher()
+
+
+if __name__ == "__main__":
+    print("[mailer] Dispatching queued mail (Ctrl+C to stop)")
+    try:
+        dispatcher.run()
+    except KeyboardInterrupt:
+        dispatcher._close()
@@ -1,85 +1,129 @@
 from dotenv import load_dotenv
 load_dotenv()
 
-from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, Request
+from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, Query, Request, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordBearer
-from fastapi.responses import HTMLResponse
-from sqlalchemy.orm import Session, joinedload
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 from jose import jwt
-import os, uuid
+from contextlib import asynccontextmanager
+from datetime import datetime
+import asyncio, os, uuid
 
 import models
-from database import engine, SessionLocal
+import rollups
+import analytics
+import pagination
+import loading
+import search
+import migrations
+import mailer
+import principals
+import images
+import menus
+import qr
+import metrics
+import schemas
+import exports
+import archive
+import statuses
+from events import feed
+from database import SessionLocal, AsyncSessionLocal, async_engine
 from auth import (
-    hash_password, verify_password, create_access_token,
-    generate_verification_token, send_verification_email,
+    hash_password, verify_password, needs_rehash, create_access_token,
+    generate_verification_token, verification_email, HashingBusy,
     SECRET_KEY, ALGORITHM,
 )
 
-models.Base.metadata.create_all(bind=engine)
-
-# ── Auto-migrate new columns onto existing databases ─────────────────────────
-from sqlalchemy import text, inspect as sa_inspect
-def _migrate(db):
-    insp = sa_inspect(engine)
-    def has(table, col):
-        return col in [c["name"] for c in insp.get_columns(table)]
-    pairs = [
-        ("stores",   "category",          "VARCHAR DEFAULT 'services'"),
-        ("stores",   "menu_style",         "VARCHAR DEFAULT 'grid'"),
-        ("stores",   "primary_color",      "VARCHAR DEFAULT '#667eea'"),
-        ("stores",   "secondary_color",    "VARCHAR DEFAULT '#764ba2'"),
-        ("stores",   "accent_color",       "VARCHAR DEFAULT '#28a745'"),
-        ("stores",   "theme",              "VARCHAR DEFAULT 'modern'"),
-        ("stores",   "banner_image_url",   "VARCHAR"),
-        ("stores",   "logo_url",           "VARCHAR"),
-        ("stores",   "tagline",            "VARCHAR"),
-        ("stores",   "welcome_message",    "TEXT"),
-        ("stores",   "footer_text",        "VARCHAR"),
-        ("services", "image_url",          "VARCHAR"),
-        ("users",    "is_verified",        "BOOLEAN DEFAULT 1"),
-        ("users",    "verification_token", "VARCHAR"),
-    ]
-    for table, col, typedef in pairs:
-        if not has(table, col):
-            db.execute(text(f"ALTER TABLE {table} ADD COLUMN {col} {typedef}"))
-    db.commit()
-
+# ── Startup: schema version check (run `python migrations.py` to upgrade) ────
 _db = SessionLocal()
-try:   _migrate(_db)
+try:
+    migrations.check(_db)
+    search.setup(_db)
+    if os.getenv("INDEX_ADVISOR") == "1":
+        import index_advisor
+        index_advisor.print_report(_db)
 finally: _db.close()
 # ─────────────────────────────────────────────────────────────────────────────
 
 UPLOAD_DIR = "static/uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
-PRODUCT_SIZES = {(400, 400), (800, 600)}
-BANNER_SIZES  = {(1200, 400), (1920, 480)}
-LOGO_SIZES    = {(200, 200), (400, 400)}
-ALL_SIZES     = PRODUCT_SIZES | BANNER_SIZES | LOGO_SIZES
+@asynccontextmanager
+async def lifespan(app):
+    mailer.dispatcher.start()
+    archive.compactor.start()
+    yield
+    archive.compactor.stop()
+    mailer.dispatcher.stop()
+    images.shutdown()
+    if async_engine is not None:
+        await async_engine.dispose()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan, default_response_class=schemas.JSONBytes)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"], allow_credentials=True,
     allow_methods=["*"], allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Feed-Id"],
 )
+app.add_middleware(images.BodyLimit)
+app.add_middleware(metrics.Middleware)          # outermost: times everything, 413s included
+app.mount("/static/uploads", images.UploadFiles(directory=UPLOAD_DIR), name="uploads")
 app.mount("/static", StaticFiles(directory="static"), name="static")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
 
+@app.exception_handler(HashingBusy)
+def hashing_busy(request: Request, exc: HashingBusy):
+    return JSONResponse(status_code=429, headers={"Retry-After": "1"},
+                        content={"detail": "Too many sign-ins right now, please try again"})
+
+
 def get_db():
     db = SessionLocal()
     try:     yield db
     finally: db.close()
 
 
+class _ThreadedSession:
+    """AsyncSession stand-in without an async driver: run_sync() uses the thread pool."""
+
+    def __init__(self):
+        self.session = SessionLocal(expire_on_commit=False)
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await run_in_threadpool(fn, self.session, *args, **kwargs)
+
+    async def close(self):
+        await run_in_threadpool(self.session.close)
+
+
+async def get_async_db():
+    """Session for `async def` routes.
+
+    Database work goes in `await db.run_sync(fn, ...)`, which calls
+    fn(session, ...) with an ordinary Session, so the query helpers in
+    loading, pagination, rollups and analytics are shared with the sync
+    routes.  Over aiosqlite/asyncpg it waits for the database on the event
+    loop; with DB_ASYNC=0 it runs in the thread pool like a `def` route.
+    """
+    db = AsyncSessionLocal() if AsyncSessionLocal else _ThreadedSession()
+    try:     yield db
+    finally: await db.close()
+
+
 def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    """The caller's Principal (id, role, is_verified); cached, so usually no query."""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user = db.query(models.User).filter(models.User.id == payload.get("sub")).first()
+        user = principals.cache.get(payload.get("sub"), lambda user_id: principals.load(db, user_id))
         if not user:
             raise HTTPException(status_code=401, detail="Invalid token")
         return user
@@ -93,6 +137,44 @@ def get_admin(user=Depends(get_current_user)):
     return user
 
 
+async def get_async_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    """get_current_user for `async def` routes."""
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        user = await principals.cache.aget(payload.get("sub"),
+                                           lambda user_id: db.run_sync(principals.load, user_id))
+        if not user:
+            raise HTTPException(status_code=401, detail="Invalid token")
+        return user
+    except Exception:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+
+async def get_async_admin(user=Depends(get_async_user)):
+    if user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    return user
+
+
+def _page(query, columns, key, fields, cursor, limit, cold=None):
+    """One keyset page of a list endpoint, encoded; the next page's cursor goes in X-Next-Cursor."""
+    try:
+        rows, next_cursor = pagination.page(query, columns, key, fields, cursor, limit, cold)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return schemas.JSONBytes(rows, headers={"X-Next-Cursor": next_cursor} if next_cursor else None)
+
+
+def _order_page(db, where, columns, fields, cursor, limit):
+    """`_page` over orders matching `where`, reaching into orders_archive once the page gets that old."""
+    hot, cold = loading.orders(db), loading.archived_orders(db)
+    if where is not None:
+        hot, cold = hot.filter(where), cold.filter(loading.archived(where))
+    return _page(hot, columns, loading.ORDER_KEY, fields, cursor, limit,
+                 cold=(cold, loading.archived_fields(columns), loading.ARCHIVED_ORDER_KEY,
+                       lambda: archive.horizon(db)))
+
+
 # ============= AUTH =============
 
 @app.post("/register")
@@ -112,14 +194,13 @@ def register(data: dict, request: Request, db: Session = Depends(get_db)):
         verification_token=token,
     )
     db.add(user)
-    db.commit()
-
     base_url = str(request.base_url).rstrip("/")
-    email_sent = send_verification_email(data["email"], token, base_url)
+    mailer.enqueue(db, data["email"], *verification_email(token, base_url))
+    db.commit()
 
     return {
         "message": "Registration successful. Please check your email to verify your account.",
-        "email_sent": email_sent,
+        "email_queued": True,
         **({"dev_verify_token": token} if os.getenv("APP_ENV", "development") == "development" else {}),
     }
 
@@ -134,6 +215,12 @@ def login(data: dict, db: Session = Depends(get_db)):
             status_code=403,
             detail="Please verify your email address before logging in. Check your inbox for the verification link."
         )
+    if needs_rehash(user.hashed_password):
+        try:
+            user.hashed_password = hash_password(data["password"])
+            db.commit()
+        except HashingBusy:
+            db.rollback()           # upgrade on a later login instead
     token = create_access_token(user.id)
     return {"access_token": token, "role": user.role, "user_id": user.id}
 
@@ -157,6 +244,7 @@ def verify_email(token: str, db: Session = Depends(get_db)):
     user.is_verified = True
     user.verification_token = None
     db.commit()
+    principals.cache.invalidate(user.id)
 
     return HTMLResponse(content=_verification_page(
         success=True,
@@ -173,9 +261,9 @@ def resend_verification(data: dict, request: Request, db: Session = Depends(get_
         return {"message": "This account is already verified."}
     new_token = generate_verification_token()
     user.verification_token = new_token
-    db.commit()
     base_url = str(request.base_url).rstrip("/")
-    send_verification_email(user.email, new_token, base_url)
+    mailer.enqueue(db, user.email, *verification_email(new_token, base_url))
+    db.commit()
     return {"message": "Verification email resent. Please check your inbox."}
 
 
@@ -204,50 +292,33 @@ def _verification_page(success: bool, message: str) -> str:
 # ============= IMAGE UPLOAD =============
 
 @app.post("/upload-image")
-async def upload_image(file: UploadFile = File(...), user=Depends(get_current_user)):
+async def upload_image(kind: str = "product", file: UploadFile = File(...), user=Depends(get_current_user)):
+    """Crop and re-encode an upload for a slot (product, banner or logo); returns a srcset manifest."""
+    if kind not in images.SLOTS:
+        raise HTTPException(status_code=400, detail=f"kind must be one of: {', '.join(images.SLOTS)}")
     if not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="Only image files are allowed")
+    path = None
     try:
-        from PIL import Image
-        import io
-        contents = await file.read()
-        img = Image.open(io.BytesIO(contents))
-        w, h = img.size
-    except Exception:
+        path, digest = await images.save_upload(file, UPLOAD_DIR)
+        key = images.content_key(digest, kind)
+        manifest = images.existing(key, UPLOAD_DIR)
+        if manifest is None:
+            loop = asyncio.get_running_loop()
+            manifest = await loop.run_in_executor(images.pool(), images.process,
+                                                  path, kind, UPLOAD_DIR, "/static/uploads", key)
+        return manifest
+    except images.UploadTooLarge as exc:
+        raise HTTPException(status_code=413, detail=f"Image too large: {exc}")
+    except (OSError, ValueError):
         raise HTTPException(status_code=400, detail="Could not read image")
-
-    if (w, h) not in ALL_SIZES:
-        allowed = ", ".join(f"{a}×{b}" for a, b in sorted(ALL_SIZES))
-        raise HTTPException(status_code=400,
-            detail=f"Image size {w}×{h} not allowed. Accepted: {allowed}")
-
-    ext = file.filename.rsplit(".", 1)[-1].lower() if "." in file.filename else "png"
-    filename = f"{uuid.uuid4()}.{ext}"
-    with open(os.path.join(UPLOAD_DIR, filename), "wb") as f:
-        f.write(contents)
-    return {"url": f"/static/uploads/{filename}", "width": w, "height": h}
+    finally:
+        if path:
+            os.unlink(path)
 
 
 # ============= STORES =============
 
-def _store_dict(s):
-    return {
-        "id": s.id, "name": s.name, "description": s.description,
-        "owner_id": s.owner_id, "owner_name": s.owner.username,
-        "category":        s.category        or "services",
-        "menu_style":      s.menu_style       or "grid",
-        "primary_color":   s.primary_color    or "#667eea",
-        "secondary_color": s.secondary_color  or "#764ba2",
-        "accent_color":    s.accent_color     or "#28a745",
-        "theme":           s.theme            or "modern",
-        "banner_image_url": s.banner_image_url,
-        "logo_url":         s.logo_url,
-        "tagline":          s.tagline,
-        "welcome_message":  s.welcome_message,
-        "footer_text":      s.footer_text,
-    }
-
-
 @app.post("/stores")
 def create_store(data: dict, db: Session = Depends(get_db), user=Depends(get_current_user)):
     category = data.get("category", "services")
@@ -257,35 +328,46 @@ def create_store(data: dict, db: Session = Depends(get_db), user=Depends(get_cur
         name=data["name"], description=data["description"],
         owner_id=user.id, category=category
     )
-    db.add(store); db.commit(); db.refresh(store)
+    db.add(store); db.flush()
+    search.index_store(db, store)
+    db.commit(); db.refresh(store)
     return {"message": "Store created", "store_id": store.id}
 
 
-@app.get("/stores")
-def get_all_stores(category: str = None, q: str = None, db: Session = Depends(get_db)):
-    query = db.query(models.Store)
+def _store_row(db, store_id):
+    row = loading.columns(loading.stores(db), loading.STORE_FIELDS).filter(models.Store.id == store_id).first()
+    return row._asdict() if row else None
+
+
+@app.get("/stores", response_model=list[schemas.Store])
+def get_all_stores(category: str = None, q: str = None,
+                   fields: str = None, cursor: str = None, limit: int = None,
+                   db: Session = Depends(get_db)):
+    query = loading.stores(db)
     if category and category != "all":
         query = query.filter(models.Store.category == category)
-    if q:
+    if q and search.enabled:
+        query = query.filter(models.Store.id.in_(search.store_ids(q)))
+    elif q:
         query = query.filter(
             models.Store.name.ilike(f"%{q}%") |
             models.Store.description.ilike(f"%{q}%")
         )
-    return [_store_dict(s) for s in query.all()]
+    return _page(query, loading.STORE_FIELDS, loading.STORE_KEY, fields, cursor, limit)
 
 
-@app.get("/stores/{store_id}")
+@app.get("/stores/{store_id}", response_model=schemas.Store)
 def get_store(store_id: str, db: Session = Depends(get_db)):
-    s = db.query(models.Store).filter(models.Store.id == store_id).first()
-    if not s:
+    store = _store_row(db, store_id)
+    if not store:
         raise HTTPException(status_code=404, detail="Store not found")
-    return _store_dict(s)
+    return schemas.JSONBytes(store)
 
 
-@app.get("/my-stores")
+@app.get("/my-stores", response_model=list[schemas.MyStore])
 def get_my_stores(db: Session = Depends(get_db), user=Depends(get_current_user)):
-    stores = db.query(models.Store).filter(models.Store.owner_id == user.id).all()
-    return [{**_store_dict(s), "services_count": len(s.services)} for s in stores]
+    query = loading.columns(loading.stores(db), loading.MY_STORE_FIELDS).filter(models.Store.owner_id == user.id)
+    return schemas.JSONBytes(loading.dicts(query))
 
 
 @app.put("/stores/{store_id}/theme")
@@ -300,7 +382,10 @@ def update_store_theme(store_id: str, data: dict, db: Session = Depends(get_db),
               "banner_image_url","logo_url","category","menu_style"]:
         if f in data:
             setattr(store, f, data[f])
+    if "name" in data or "description" in data:
+        search.index_store(db, store)
     db.commit()
+    menus.cache.invalidate(store_id)
     return {"message": "Store updated"}
 
 
@@ -312,19 +397,18 @@ def delete_store(store_id: str, db: Session = Depends(get_db), user=Depends(get_
     if store.owner_id != user.id and user.role != "admin":
         raise HTTPException(status_code=403, detail="Not authorized")
     db.query(models.Order).filter(models.Order.store_id == store_id).delete()
+    archive.forget_store(db, store_id)
+    rollups.forget_store(db, store_id)
+    search.remove_store(db, store_id)
     db.query(models.Service).filter(models.Service.store_id == store_id).delete()
     db.delete(store)
     db.commit()
+    menus.cache.invalidate(store_id)
     return {"message": "Store deleted"}
 
 
 # ============= SERVICES =============
 
-def _svc(s):
-    return {"id": s.id, "name": s.name, "description": s.description,
-            "price": s.price, "store_id": s.store_id, "image_url": s.image_url}
-
-
 @app.post("/stores/{store_id}/services")
 def create_service(store_id: str, data: dict, db: Session = Depends(get_db), user=Depends(get_current_user)):
     store = db.query(models.Store).filter(models.Store.id == store_id).first()
@@ -336,7 +420,10 @@ def create_service(store_id: str, data: dict, db: Session = Depends(get_db), use
         name=data["name"], description=data["description"],
         price=data["price"], store_id=store_id, image_url=data.get("image_url")
     )
-    db.add(service); db.commit()
+    db.add(service); db.flush()
+    search.index_service(db, service)
+    db.commit()
+    menus.cache.invalidate(store_id)
     return {"message": "Service created"}
 
 
@@ -349,201 +436,440 @@ def delete_service(store_id: str, service_id: str, db: Session = Depends(get_db)
         raise HTTPException(status_code=403, detail="Not authorized")
     svc = db.query(models.Service).filter(models.Service.id == service_id).first()
     if svc:
+        search.remove(db, "service", svc.id)
         db.delete(svc); db.commit()
+        menus.cache.invalidate(store_id)
     return {"message": "Deleted"}
 
 
-@app.get("/stores/{store_id}/services")
-def get_store_services(store_id: str, db: Session = Depends(get_db)):
-    services = db.query(models.Service).filter(models.Service.store_id == store_id).all()
-    return [_svc(s) for s in services]
+def _menu_items(db, store_id):
+    query = loading.columns(loading.menu_items(db), loading.MENU_FIELDS)
+    return loading.dicts(query.filter(models.Service.store_id == store_id))
 
 
-@app.get("/services")
-def get_all_services(db: Session = Depends(get_db)):
-    return [{**_svc(s), "store_name": s.store.name} for s in db.query(models.Service).all()]
+@app.get("/stores/{store_id}/services", response_model=list[schemas.Service])
+async def get_store_services(store_id: str, db: AsyncSession = Depends(get_async_db)):
+    return schemas.JSONBytes(await db.run_sync(_menu_items, store_id))
+
+
+def _menu_snapshot(db, store_id):
+    store = _store_row(db, store_id)
+    if not store:
+        return None
+    return menus.encode({"store": store, "services": _menu_items(db, store_id)})
+
+
+@app.get("/stores/{store_id}/menu", response_model=schemas.Menu)
+async def get_store_menu(store_id: str, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Store theme and every menu item in one cached response, with ETag / 304."""
+    snap = await menus.cache.aget(store_id, lambda sid: db.run_sync(_menu_snapshot, sid))
+    if snap is None:
+        raise HTTPException(status_code=404, detail="Store not found")
+    headers = {"ETag": snap.etag, "Cache-Control": "no-cache"}
+    if menus.not_modified(request.headers.get("if-none-match"), snap.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(snap.body, media_type="application/json", headers=headers)
+
+
+@app.get("/services", response_model=list[schemas.CatalogService])
+def get_all_services(fields: str = None, cursor: str = None, limit: int = None,
+                     db: Session = Depends(get_db)):
+    return _page(loading.services(db), loading.SERVICE_FIELDS, loading.SERVICE_KEY,
+                 fields, cursor, limit)
+
+
+# ============= QR CODES =============
+
+def _public_base(request):
+    return os.getenv("PUBLIC_BASE_URL", "").rstrip("/") or str(request.base_url).rstrip("/")
+
+
+@app.get("/qr")
+def qr_code(request: Request, store: str = None, table: str = Query(None, max_length=20),
+            size: int = 400, fmt: str = Query("png", alias="format"), db: Session = Depends(get_db)):
+    """QR code (PNG or SVG) for the store list, or a store's menu / one of its tables."""
+    if fmt not in qr.MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(qr.MEDIA_TYPES)}")
+    size = min(max(size, qr.MIN_SIZE), qr.MAX_SIZE)
+    url = qr.target_url(_public_base(request), store, table)
+
+    def render(key):
+        if store and not db.query(models.Store.id).filter(models.Store.id == store).first():
+            return None
+        return qr.render(url, fmt, size)
+
+    image = qr.cache.get((url, fmt, size), render)
+    if image is None:
+        raise HTTPException(status_code=404, detail="Store not found")
+    return Response(image, media_type=qr.MEDIA_TYPES[fmt], headers={"Cache-Control": "public, max-age=86400"})
+
+
+# one sheet renders at a time, so sheets never take every image worker from uploads
+_sheet_slot = asyncio.Semaphore(1)
+
+
+@app.get("/stores/{store_id}/qr-sheet")
+async def qr_sheet(store_id: str, request: Request, tables: str = Query("10", max_length=200),
+                   size: int = 800, fmt: str = Query("pdf", alias="format"),
+                   db: AsyncSession = Depends(get_async_db), user=Depends(get_async_user)):
+    """Printable PDF (or ZIP of PNGs) with one QR code per table, e.g. ?tables=1-20. Owner or admin only."""
+    def run(db):
+        _check_store_owner(db, store_id, user)
+        return db.query(models.Store.name).filter(models.Store.id == store_id).scalar()
+    name = await db.run_sync(run)
+    await db.close()    # don't hold a connection while the sheet renders
+    if fmt not in qr.SHEET_TYPES:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(qr.SHEET_TYPES)}")
+    try:
+        numbers = qr.parse_tables(tables)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=f"tables: {exc}")
+    size = min(max(size, qr.MIN_SIZE), qr.MAX_SIZE)
+    base_url = _public_base(request)
+
+    async def render(key):
+        async with _sheet_slot:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(images.pool(), qr.sheet, base_url, store_id, name,
+                                              numbers, fmt, size)
+
+    body = await qr.sheets.aget((base_url, store_id, name, tuple(numbers), fmt, size), render)
+    return Response(body, media_type=qr.SHEET_TYPES[fmt],
+                    headers={"Content-Disposition": f'attachment; filename="table-qr-codes.{fmt}"'})
+
+
+# ============= SEARCH =============
+
+@app.get("/search")
+def search_catalog(q: str = "", limit: int = 20, db: Session = Depends(get_db)):
+    """Ranked store and menu-item matches; every word is matched as a prefix."""
+    limit = min(max(limit, 1), 50)
+    if search.enabled:
+        return search.search(db, q, limit)
+    like = f"%{q}%"
+    St, S = models.Store, models.Service
+    stores = db.query(St.id, St.name, St.description, St.category, St.banner_image_url, St.logo_url) \
+               .filter(St.name.ilike(like) | St.description.ilike(like)).limit(limit)
+    services = db.query(S.id, S.name, S.description, S.price, S.image_url, S.store_id,
+                        St.name.label("store_name")) \
+                 .outerjoin(St, St.id == S.store_id) \
+                 .filter(S.name.ilike(like) | S.description.ilike(like)).limit(limit)
+    return {"stores": [dict(r._mapping) for r in stores],
+            "services": [dict(r._mapping) for r in services]}
 
 
 # ============= ORDERS =============
 
-@app.post("/orders")
-def create_order(data: dict, db: Session = Depends(get_db)):
-    service = db.query(models.Service).filter(models.Service.id == data["service_id"]).first()
-    if not service:
-        raise HTTPException(status_code=404, detail="Service not found")
-    order = models.Order(
+def _store_order(o, service):
+    return {"id": o.id, "status": o.status or "Pending",
+            "customer_name": o.customer_name or (o.user.username if o.user else "Guest"),
+            "customer_phone": o.customer_phone, "service_name": service.name,
+            "price": service.price, "quantity": o.quantity, "order_type": o.order_type,
+            "table_number": o.table_number, "delivery_address": o.delivery_address,
+            "notes": o.notes, "created_at": o.created_at}
+
+
+def _quantity(value):
+    """A requested quantity as a positive int ("3" is fine); 400 otherwise."""
+    if isinstance(value, str) and value.strip().isdigit():
+        value = int(value)
+    if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+        raise HTTPException(status_code=400, detail="quantity must be a positive whole number")
+    return value
+
+
+def _new_order(data, service, quantity):
+    return models.Order(
+        id=str(uuid.uuid4()), created_at=datetime.utcnow(),
         user_id=data.get("user_id"), service_id=service.id, store_id=service.store_id,
         order_type=data.get("order_type", "dine-in"),
         table_number=data.get("table_number"), delivery_address=data.get("delivery_address"),
         customer_name=data.get("customer_name"), customer_phone=data.get("customer_phone"),
-        notes=data.get("notes"), quantity=data.get("quantity", 1)
+        notes=data.get("notes"), quantity=_quantity(quantity), price=service.price
     )
-    db.add(order); db.commit()
-    return {"message": "Order created", "order_id": order.id}
 
 
-@app.get("/orders")
-def get_my_orders(db: Session = Depends(get_db), user=Depends(get_current_user)):
-    orders = db.query(models.Order).filter(models.Order.user_id == user.id).all()
-    return [{"id": o.id, "status": o.status, "service_name": o.service.name,
-             "store_name": o.store.name, "price": o.service.price, "created_at": o.created_at}
-            for o in orders]
-
-
-@app.get("/store-orders/{store_id}")
-def get_store_orders(store_id: str, db: Session = Depends(get_db), user=Depends(get_current_user)):
-    store = db.query(models.Store).filter(models.Store.id == store_id).first()
+@app.post("/orders")
+async def create_order(data: dict, db: AsyncSession = Depends(get_async_db)):
+    def run(db):
+        service = db.query(models.Service).filter(models.Service.id == data["service_id"]).first()
+        if not service:
+            raise HTTPException(status_code=404, detail="Service not found")
+        order = _new_order(data, service, data.get("quantity", 1))
+        db.add(order)
+        rollups.record_orders(db, [order])
+        event = _store_order(order, service)
+        db.commit()
+        return order.id, service.store_id, event
+    order_id, store_id, event = await db.run_sync(run)
+    feed.publish(store_id, "created", event)
+    return {"message": "Order created", "order_id": order_id}
+
+
+@app.post("/orders/checkout")
+async def checkout(data: dict, db: AsyncSession = Depends(get_async_db)):
+    """Place a whole cart at once: one lookup, one commit, all lines or none."""
+    items = data.get("items") or []
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="items must be a list")
+    if not items:
+        raise HTTPException(status_code=400, detail="Cart is empty")
+    if not all(isinstance(i, dict) and isinstance(i.get("service_id"), str) for i in items):
+        raise HTTPException(status_code=400, detail="Each item needs a service_id")
+    lines = [(i["service_id"], _quantity(i.get("quantity", 1))) for i in items]
+
+    def run(db):
+        ids = {service_id for service_id, _ in lines}
+        services = {s.id: s for s in
+                    db.query(models.Service).filter(models.Service.id.in_(ids)).all()}
+        if len(services) != len(ids):
+            raise HTTPException(status_code=404, detail="Service not found")
+        orders = [_new_order(data, services[service_id], quantity) for service_id, quantity in lines]
+        db.add_all(orders)
+        rollups.record_orders(db, orders)
+        events = [(o.store_id, _store_order(o, services[o.service_id])) for o in orders]
+        db.commit()
+        return [o.id for o in orders], events
+    order_ids, events = await db.run_sync(run)
+    for store_id, event in events:
+        feed.publish(store_id, "created", event)
+    return {"message": "Orders created", "order_ids": order_ids}
+
+
+@app.get("/orders", response_model=list[schemas.MyOrder])
+async def get_my_orders(fields: str = None, cursor: str = None, limit: int = None,
+                        db: AsyncSession = Depends(get_async_db), user=Depends(get_async_user)):
+    def run(db):
+        return _order_page(db, models.Order.user_id == user.id, loading.MY_ORDER_FIELDS,
+                           fields, cursor, limit)
+    return await db.run_sync(run)
+
+
+def _check_store_owner(db, store_id, user):
+    store = db.query(models.Store.owner_id).filter(models.Store.id == store_id).first()
     if not store:
         raise HTTPException(status_code=404, detail="Store not found")
     if store.owner_id != user.id and user.role != "admin":
         raise HTTPException(status_code=403, detail="Not authorized")
-    return [{"id": o.id, "status": o.status,
-             "customer_name": o.customer_name or (o.user.username if o.user else "Guest"),
-             "customer_phone": o.customer_phone, "service_name": o.service.name,
-             "price": o.service.price, "quantity": o.quantity, "order_type": o.order_type,
-             "table_number": o.table_number, "delivery_address": o.delivery_address,
-             "notes": o.notes, "created_at": o.created_at}
-            for o in db.query(models.Order).filter(models.Order.store_id == store_id).all()]
 
 
-@app.put("/orders/{order_id}")
-def update_order(order_id: str, data: dict, db: Session = Depends(get_db), user=Depends(get_current_user)):
-    order = db.query(models.Order).filter(models.Order.id == order_id).first()
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
-    store = db.query(models.Store).filter(models.Store.id == order.store_id).first()
-    if store.owner_id != user.id and user.role != "admin":
-        raise HTTPException(status_code=403, detail="Not authorized")
-    order.status = data["status"]; db.commit()
-    return {"message": "Order updated"}
+@app.get("/store-orders/{store_id}", response_model=list[schemas.StoreOrder])
+async def get_store_orders(store_id: str, fields: str = None, cursor: str = None, limit: int = None,
+                           db: AsyncSession = Depends(get_async_db), user=Depends(get_async_user)):
+    def run(db):
+        _check_store_owner(db, store_id, user)
+        return _order_page(db, models.Order.store_id == store_id, loading.STORE_ORDER_FIELDS,
+                           fields, cursor, limit)
+    feed_id = feed.last_id          # before the read: the feed replays anything after it
+    response = await db.run_sync(run)
+    response.headers["X-Feed-Id"] = str(feed_id)
+    return response
+
+
+@app.get("/store-orders/{store_id}/events")
+async def store_order_events(store_id: str, request: Request, token: str, last_id: int = None,
+                             db: AsyncSession = Depends(get_async_db)):
+    """Live feed of new and updated orders (Server-Sent Events).
+
+    EventSource cannot send headers, so the access token comes as ?token=, and
+    the first connection resumes from ?last_id= (the list's X-Feed-Id).
+    """
+    user = await get_async_user(token, db)
+    await db.run_sync(_check_store_owner, store_id, user)
+    await db.close()        # don't hold a connection for the life of the stream
+    header = request.headers.get("last-event-id")       # set by the browser on reconnect
+    if header and header.isdigit():
+        last_id = int(header)
+    return StreamingResponse(
+        feed.stream(store_id, last_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
-@app.get("/admin/orders")
-def admin_orders(db: Session = Depends(get_db), admin=Depends(get_admin)):
-    orders = db.query(models.Order).all()
-    return [{"id": o.id, "status": o.status,
-             "customer_name": o.customer_name or (o.user.username if o.user else "Guest"),
-             "store_name": o.store.name, "service_name": o.service.name,
-             "price": o.service.price, "quantity": o.quantity,
-             "order_type": o.order_type, "created_at": o.created_at}
-            for o in orders]
+def _export(fmt, scope, store_id, start, end, status, gzip):
+    if fmt not in exports.MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(exports.MEDIA_TYPES)}")
+    try:
+        start, end = analytics.parse_range(start, end)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be YYYY-MM-DD")
+    body = exports.stream(fmt, store_id, start, end, exports.parse_statuses(status), gzip)
+    return StreamingResponse(
+        body, media_type="application/gzip" if gzip else exports.MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{exports.filename(scope, fmt, gzip)}"'},
+    )
 
 
-# ============= ADMIN ANALYTICS =============
+@app.get("/store-orders/{store_id}/export")
+async def export_store_orders(store_id: str, fmt: str = Query("csv", alias="format"),
+                              start: str = None, end: str = None, status: str = None, gzip: bool = False,
+                              db: AsyncSession = Depends(get_async_db), user=Depends(get_async_user)):
+    """A store's orders, oldest first, streamed as CSV or NDJSON, e.g. ?start=2025-01-01&status=Completed."""
+    await db.run_sync(_check_store_owner, store_id, user)
+    await db.close()        # the export reads through its own session
+    return _export(fmt, store_id, store_id, start, end, status, gzip)
 
-from datetime import datetime, timedelta
-from collections import defaultdict
-
-@app.get("/admin/analytics")
-def admin_analytics(db: Session = Depends(get_db), admin=Depends(get_admin)):
-    orders = db.query(models.Order).options(
-        joinedload(models.Order.service),
-        joinedload(models.Order.store),
-    ).all()
-    now = datetime.utcnow()
-    this_month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    if this_month_start.month == 1:
-        last_month_start = this_month_start.replace(year=now.year - 1, month=12)
-    else:
-        last_month_start = this_month_start.replace(month=this_month_start.month - 1)
-
-    total_revenue = 0
-    revenue_this_month = 0
-    revenue_last_month = 0
-    orders_this_month = 0
-    orders_last_month = 0
-    by_month = defaultdict(lambda: {"revenue": 0, "order_count": 0})
-    by_store = defaultdict(lambda: {"store_name": "", "revenue": 0, "order_count": 0})
-
-    for o in orders:
-        rev = (o.service.price or 0) * (o.quantity or 1)
-        total_revenue += rev
-        created = o.created_at or now
-        month_key = created.strftime("%Y-%m")
-        by_month[month_key]["revenue"] += rev
-        by_month[month_key]["order_count"] += 1
-        if created >= this_month_start:
-            revenue_this_month += rev
-            orders_this_month += 1
-        elif last_month_start <= created < this_month_start:
-            revenue_last_month += rev
-            orders_last_month += 1
-        by_store[o.store_id]["store_name"] = o.store.name
-        by_store[o.store_id]["revenue"] += rev
-        by_store[o.store_id]["order_count"] += 1
-
-    month_list = sorted(by_month.keys(), reverse=True)[:12]
-    by_month_list = [{"month": m, "revenue": round(by_month[m]["revenue"], 2), "order_count": by_month[m]["order_count"]} for m in month_list]
-    by_store_list = [{"store_id": sid, "store_name": s["store_name"], "revenue": round(s["revenue"], 2), "order_count": s["order_count"]} for sid, s in by_store.items()]
 
+@app.put("/orders/{order_id}")
+async def update_order(order_id: str, data: dict,
+                       db: AsyncSession = Depends(get_async_db), user=Depends(get_async_user)):
+    new_status = data.get("status")
+    if new_status not in statuses.STATUSES:
+        raise HTTPException(status_code=400, detail=f"status must be one of {', '.join(statuses.STATUSES)}")
+
+    def run(db):
+        row = loading.order_for_update(db).filter(models.Order.id == order_id).first()
+        if not row:
+            raise HTTPException(status_code=404, detail="Order not found")
+        order, owner_id, price = row
+        if owner_id != user.id and user.role != "admin":
+            raise HTTPException(status_code=403, detail="Not authorized")
+        if not statuses.can_move(order.status, new_status):
+            raise HTTPException(status_code=409, detail=f"Cannot move order {order_id} to {new_status}")
+        store_id = order.store_id
+        rollups.record_status_change(db, order, price, order.status, new_status)
+        order.status = new_status; db.commit()
+        return store_id
+    store_id = await db.run_sync(run)
+    feed.publish(store_id, "updated", {"id": order_id, "status": new_status})
+    return {"message": "Order updated"}
+
+
+BULK_STATUS_MAX = 500
+
+
+def _bulk_status_selector(data):
+    """The WHERE clause picking the orders of a bulk status change; 400 on a malformed body."""
+    O = models.Order
+    if "order_ids" in data:
+        ids = data["order_ids"]
+        if (not isinstance(ids, list) or not ids or len(ids) > BULK_STATUS_MAX
+                or not all(isinstance(i, str) for i in ids)):
+            raise HTTPException(status_code=400,
+                                detail=f"order_ids must be a list of 1 to {BULK_STATUS_MAX} order ids")
+        return O.id.in_(set(ids)), set(ids)
+    if data.get("store_id") and data.get("table_number") is not None:
+        from_status = data.get("from_status", "Pending")
+        from_status = [from_status] if isinstance(from_status, str) else from_status
+        if (not isinstance(from_status, list) or not from_status
+                or any(not isinstance(s, str) or s not in statuses.STATUSES for s in from_status)):
+            raise HTTPException(status_code=400, detail=f"from_status must be among {', '.join(statuses.STATUSES)}")
+        status = O.status.in_(from_status)
+        if "Pending" in from_status:
+            status = status | O.status.is_(None)
+        return (O.store_id == data["store_id"]) & (O.table_number == str(data["table_number"])) & status, None
+    raise HTTPException(status_code=400, detail="Give order_ids, or store_id and table_number")
+
+
+@app.post("/orders/bulk-status")
+async def update_order_statuses(data: dict,
+                                db: AsyncSession = Depends(get_async_db), user=Depends(get_async_user)):
+    """Move many orders to one status with a single UPDATE, all or nothing.
+
+    {"status": "Ready", "order_ids": [...]}, or every order of a table still in
+    `from_status` (default Pending): {"status": "Ready", "store_id": ..., "table_number": "4"}.
+    """
+    new_status = data.get("status")
+    if new_status not in statuses.STATUSES:
+        raise HTTPException(status_code=400, detail=f"status must be one of {', '.join(statuses.STATUSES)}")
+    where, ids = _bulk_status_selector(data)
+
+    def run(db):
+        if ids is None:         # a table of one store: 404/403 rather than an empty "updated"
+            _check_store_owner(db, data["store_id"], user)
+        rows = loading.order_statuses(db).filter(where).with_for_update(of=models.Order).all()
+        if ids is not None and len(rows) < len(ids):
+            missing = ids - {r.id for r in rows}
+            raise HTTPException(status_code=404, detail=f"Order(s) not found: {', '.join(sorted(missing))}")
+        if user.role != "admin" and any(r.owner_id != user.id for r in rows):
+            raise HTTPException(status_code=403, detail="Not authorized")
+        invalid = [r.id for r in rows if not statuses.can_move(r.status, new_status)]
+        if invalid:
+            raise HTTPException(status_code=409,
+                                detail=f"Cannot move order(s) {', '.join(invalid)} to {new_status}")
+        changed = [r for r in rows if statuses.current(r.status) != new_status]
+        if changed:
+            rollups.record_status_changes(db, changed, new_status)
+            db.query(models.Order).filter(models.Order.id.in_([r.id for r in changed])) \
+              .update({models.Order.status: new_status}, synchronize_session=False)
+            db.commit()
+        return [(r.store_id, r.id) for r in changed]
+    changed = await db.run_sync(run)
+    for store_id, order_id in changed:
+        feed.publish(store_id, "updated", {"id": order_id, "status": new_status})
+    return {"message": "Orders updated", "updated": [order_id for _, order_id in changed]}
+
+
+@app.get("/admin/orders", response_model=list[schemas.AdminOrder])
+async def admin_orders(fields: str = None, cursor: str = None, limit: int = None,
+                       db: AsyncSession = Depends(get_async_db), admin=Depends(get_async_admin)):
+    return await db.run_sync(lambda db: _order_page(db, None, loading.ADMIN_ORDER_FIELDS,
+                                                    fields, cursor, limit))
+
+
+@app.get("/admin/orders/export")
+def export_all_orders(fmt: str = Query("csv", alias="format"), store_id: str = None,
+                      start: str = None, end: str = None, status: str = None, gzip: bool = False,
+                      admin=Depends(get_admin)):
+    """Every order (or one store's), oldest first, streamed as CSV or NDJSON."""
+    return _export(fmt, store_id or "all", store_id, start, end, status, gzip)
+
+
+@app.get("/admin/stats", response_model=schemas.AdminStats)
+def admin_stats(db: Session = Depends(get_db), admin=Depends(get_admin)):
+    """Dashboard counters, one COUNT each; archived orders count toward total_orders."""
+    O, A = models.Order, models.ArchivedOrder
     return {
-        "total_revenue": round(total_revenue, 2),
-        "revenue_this_month": round(revenue_this_month, 2),
-        "revenue_last_month": round(revenue_last_month, 2),
-        "orders_this_month": orders_this_month,
-        "orders_last_month": orders_last_month,
-        "total_orders": sum(by_month[m]["order_count"] for m in by_month),
-        "by_month": by_month_list,
-        "by_store": by_store_list,
+        "total_stores": db.query(func.count(models.Store.id)).scalar(),
+        "total_services": db.query(func.count(models.Service.id)).scalar(),
+        "total_orders": db.query(func.count(O.id)).scalar() + db.query(func.count(A.id)).scalar(),
+        "pending_orders": db.query(func.count(O.id))
+                            .filter(O.status.is_(None) | (O.status == "Pending")).scalar(),
     }
 
 
-@app.get("/my-stores/analytics")
-def my_stores_analytics(db: Session = Depends(get_db), user=Depends(get_current_user)):
-    store_ids = [s.id for s in db.query(models.Store).filter(models.Store.owner_id == user.id).all()]
-    if not store_ids:
-        return {
-            "total_revenue": 0, "revenue_this_month": 0, "revenue_last_month": 0,
-            "orders_this_month": 0, "orders_last_month": 0, "total_orders": 0,
-            "by_month": [], "by_store": [],
-        }
-    orders = db.query(models.Order).filter(models.Order.store_id.in_(store_ids)).options(
-        joinedload(models.Order.service),
-        joinedload(models.Order.store),
-    ).all()
-    now = datetime.utcnow()
-    this_month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    if this_month_start.month == 1:
-        last_month_start = this_month_start.replace(year=now.year - 1, month=12)
-    else:
-        last_month_start = this_month_start.replace(month=this_month_start.month - 1)
-
-    total_revenue = 0
-    revenue_this_month = 0
-    revenue_last_month = 0
-    orders_this_month = 0
-    orders_last_month = 0
-    by_month = defaultdict(lambda: {"revenue": 0, "order_count": 0})
-    by_store = defaultdict(lambda: {"store_name": "", "revenue": 0, "order_count": 0})
-
-    for o in orders:
-        rev = (o.service.price or 0) * (o.quantity or 1)
-        total_revenue += rev
-        created = o.created_at or now
-        month_key = created.strftime("%Y-%m")
-        by_month[month_key]["revenue"] += rev
-        by_month[month_key]["order_count"] += 1
-        if created >= this_month_start:
-            revenue_this_month += rev
-            orders_this_month += 1
-        elif last_month_start <= created < this_month_start:
-            revenue_last_month += rev
-            orders_last_month += 1
-        by_store[o.store_id]["store_name"] = o.store.name
-        by_store[o.store_id]["revenue"] += rev
-        by_store[o.store_id]["order_count"] += 1
-
-    month_list = sorted(by_month.keys(), reverse=True)[:12]
-    by_month_list = [{"month": m, "revenue": round(by_month[m]["revenue"], 2), "order_count": by_month[m]["order_count"]} for m in month_list]
-    by_store_list = [{"store_id": sid, "store_name": s["store_name"], "revenue": round(s["revenue"], 2), "order_count": s["order_count"]} for sid, s in by_store.items()]
+@app.get("/admin/auth-cache")
+def admin_auth_cache(admin=Depends(get_admin)):
+    return principals.cache.stats()
 
-    return {
-        "total_revenue": round(total_revenue, 2),
-        "revenue_this_month": round(revenue_this_month, 2),
-        "revenue_last_month": round(revenue_last_month, 2),
-        "orders_this_month": orders_this_month,
-        "orders_last_month": orders_last_month,
-        "total_orders": sum(by_month[m]["order_count"] for m in by_month),
-        "by_month": by_month_list,
-        "by_store": by_store_list,
-    }
\ No newline at end of file
+
+@app.get("/admin/menu-cache")
+def admin_menu_cache(admin=Depends(get_admin)):
+    return menus.cache.stats()
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics(request: Request):
+    if metrics.TOKEN and request.headers.get("authorization") != f"Bearer {metrics.TOKEN}":
+        raise HTTPException(status_code=401, detail="Metrics token required")
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+# ============= ADMIN ANALYTICS =============
+
+def _analytics(db, store_ids, start, end):
+    try:
+        start, end = analytics.parse_range(start, end)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be YYYY-MM-DD")
+    return analytics.summarize(db, store_ids, start, end)
+
+
+@app.get("/admin/analytics", response_model=schemas.Analytics)
+async def admin_analytics(start: str = None, end: str = None, store_id: str = None,
+                          db: AsyncSession = Depends(get_async_db), admin=Depends(get_async_admin)):
+    return await db.run_sync(_analytics, [store_id] if store_id else None, start, end)
+
+
+@app.get("/my-stores/analytics", response_model=schemas.Analytics)
+async def my_stores_analytics(start: str = None, end: str = None, store_id: str = None,
+                              db: AsyncSession = Depends(get_async_db), user=Depends(get_async_user)):
+    def run(db):
+        store_ids = [sid for (sid,) in db.query(models.Store.id).filter(models.Store.owner_id == user.id)]
+        if store_id:
+            if store_id not in store_ids:
+                raise HTTPException(status_code=404, detail="Store not found")
+            return _analytics(db, [store_id], start, end)
+        return _analytics(db, store_ids, start, end)
+    return await db.run_sync(run)
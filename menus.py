@@ -0,0 +1,46 @@
+"""
+Precomputed public menus for GET /stores/{id}/menu.
+
+A customer scanning a table QR code needs the store's theme and its whole
+menu.  The snapshot endpoint returns both in one response, and `cache`
+keeps each store's snapshot already serialised to JSON:
+
+* the ETag is a hash of those bytes, so it is the same in every worker and a
+  browser revalidating with If-None-Match gets a bodiless 304;
+* handlers that change what a menu shows (store theme, adding or deleting
+  menu items, deleting the store) call `cache.invalidate(store_id)` after
+  committing;
+* entries also expire after MENU_CACHE_TTL seconds (default 30), which bounds
+  how long other worker processes can serve a menu changed through this one,
+  and only MENU_CACHE_SIZE stores (default 512) are kept.
+
+`cache.stats()` is reported at GET /admin/menu-cache.
+"""
+import hashlib
+import os
+from collections import namedtuple
+
+import schemas
+from ttlcache import TTLCache
+
+TTL_SECONDS = float(os.getenv("MENU_CACHE_TTL", "30"))
+MAX_ENTRIES = int(os.getenv("MENU_CACHE_SIZE", "512"))
+
+Snapshot = namedtuple("Snapshot", "etag body")
+
+
+def encode(payload):
+    """Serialise a menu payload once; the ETag is derived from the bytes."""
+    body = schemas.dumps(payload)
+    return Snapshot(f'"{hashlib.sha1(body).hexdigest()[:20]}"', body)
+
+
+def not_modified(if_none_match, etag):
+    """True if an If-None-Match header value matches `etag` (weak comparison)."""
+    if not if_none_match:
+        return False
+    tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+cache = TTLCache(ttl=TTL_SECONDS, max_entries=MAX_ENTRIES)
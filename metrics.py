@@ -0,0 +1,196 @@
+"""
+Request and database metrics in Prometheus text format (GET /metrics).
+
+`Middleware` times every request and, through SQLAlchemy events on the
+engine, counts the SQL statements it runs, the time spent in the database
+and the ORM rows it hydrated.  Per route template (e.g. /stores/{store_id},
+so ids don't explode the label set) it keeps:
+
+    http_requests_total{method,route,status}
+    http_request_duration_seconds        histogram
+    http_request_db_queries              histogram – statements per request;
+                                         a route creeping up the buckets is an N+1
+    http_request_db_seconds_total
+    http_request_orm_rows_total
+    db_queries_total / db_query_seconds_total   all statements, including
+                                                background work (mailer, startup)
+
+Set SLOW_REQUEST_MS to log every request slower than that, with the SQL it
+ran and how long each statement took.  Set METRICS_TOKEN to require
+`Authorization: Bearer <token>` on /metrics.
+
+Metrics live in each worker process; with several workers, scrape them
+separately or aggregate with the `instance` label.
+"""
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+from database import Base, engines
+
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))
+TOKEN = os.getenv("METRICS_TOKEN", "")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+_lock = threading.Lock()
+_current = ContextVar("request_stats", default=None)
+
+
+class _RequestStats:
+    __slots__ = ("queries", "db_seconds", "rows", "statements")
+
+    def __init__(self, keep_statements):
+        self.queries, self.db_seconds, self.rows = 0, 0.0, 0
+        self.statements = [] if keep_statements else None
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.series = {}                    # labels -> [bucket counts..., sum, count]
+
+    def observe(self, labels, value):
+        row = self.series.setdefault(labels, [0] * (len(self.buckets) + 2))
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                row[i] += 1
+        row[-2] += value
+        row[-1] += 1
+
+
+_requests = {}                              # (method, route, status) -> count
+_durations = Histogram(LATENCY_BUCKETS)
+_queries = Histogram(QUERY_BUCKETS)
+_db_seconds = {}                            # (method, route) -> seconds
+_rows = {}                                  # (method, route) -> ORM rows
+_totals = {"queries": 0, "seconds": 0.0}
+
+
+# ── SQLAlchemy hooks (sync engine and the async engine's sync core) ──────────
+def _before(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_start", []).append(time.perf_counter())
+
+
+def _after(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["metrics_start"].pop()
+    with _lock:
+        _totals["queries"] += 1
+        _totals["seconds"] += elapsed
+    stats = _current.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+        if stats.statements is not None:
+            stats.statements.append((elapsed, statement))
+
+
+def _failed(context):
+    if context.connection is not None and context.connection.info.get("metrics_start"):
+        context.connection.info["metrics_start"].pop()
+
+
+for _engine in engines():
+    event.listen(_engine, "before_cursor_execute", _before)
+    event.listen(_engine, "after_cursor_execute", _after)
+    event.listen(_engine, "handle_error", _failed)
+
+
+@event.listens_for(Base, "load", propagate=True)
+def _loaded(target, context):
+    stats = _current.get()
+    if stats is not None:
+        stats.rows += 1
+
+
+# ── ASGI middleware ──────────────────────────────────────────────────────────
+class Middleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        stats = _RequestStats(keep_statements=SLOW_REQUEST_MS > 0)
+        token = _current.set(stats)         # copied into the threadpool for sync handlers
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            self.record(scope["method"], getattr(route, "path", "<unmatched>"), status,
+                        time.perf_counter() - start, stats)
+
+    @staticmethod
+    def record(method, route, status, seconds, stats):
+        key = (method, route)
+        with _lock:
+            _requests[(method, route, str(status))] = _requests.get((method, route, str(status)), 0) + 1
+            _durations.observe(key, seconds)
+            _queries.observe(key, stats.queries)
+            _db_seconds[key] = _db_seconds.get(key, 0.0) + stats.db_seconds
+            _rows[key] = _rows.get(key, 0) + stats.rows
+        if SLOW_REQUEST_MS and seconds * 1000 >= SLOW_REQUEST_MS:
+            lines = [f"[slow] {method} {route} {status} {seconds * 1000:.0f} ms, "
+                     f"{stats.queries} queries ({stats.db_seconds * 1000:.0f} ms in DB), {stats.rows} rows"]
+            lines += [f"    {elapsed * 1000:7.1f} ms  {' '.join(sql.split())[:300]}"
+                      for elapsed, sql in stats.statements]
+            print("\n".join(lines))
+
+
+# ── exposition ───────────────────────────────────────────────────────────────
+def _labels(names, values, extra=""):
+    def esc(v):
+        return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    pairs = [f'{n}="{esc(v)}"' for n, v in zip(names, values)]
+    return "{" + ",".join(pairs + ([extra] if extra else [])) + "}"
+
+
+def _histogram(out, name, help_text, hist, names):
+    out += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for labels, row in sorted(hist.series.items()):
+        for bound, count in zip(hist.buckets + ("+Inf",), row[:-2] + [row[-1]]):
+            le = 'le="%s"' % bound
+            out.append(f"{name}_bucket{_labels(names, labels, le)} {count}")
+        out.append(f"{name}_sum{_labels(names, labels)} {row[-2]}")
+        out.append(f"{name}_count{_labels(names, labels)} {row[-1]}")
+
+
+def render():
+    """All metrics in Prometheus text exposition format (version 0.0.4)."""
+    out = []
+    with _lock:
+        out += ["# HELP http_requests_total Requests by route template and status.",
+                "# TYPE http_requests_total counter"]
+        out += [f"http_requests_total{_labels(('method', 'route', 'status'), k)} {v}"
+                for k, v in sorted(_requests.items())]
+        _histogram(out, "http_request_duration_seconds", "Request latency.", _durations, ("method", "route"))
+        _histogram(out, "http_request_db_queries", "SQL statements per request.", _queries, ("method", "route"))
+        out += ["# HELP http_request_db_seconds_total Time spent in SQL statements, by route.",
+                "# TYPE http_request_db_seconds_total counter"]
+        out += [f"http_request_db_seconds_total{_labels(('method', 'route'), k)} {v}"
+                for k, v in sorted(_db_seconds.items())]
+        out += ["# HELP http_request_orm_rows_total ORM objects loaded from query results, by route.",
+                "# TYPE http_request_orm_rows_total counter"]
+        out += [f"http_request_orm_rows_total{_labels(('method', 'route'), k)} {v}"
+                for k, v in sorted(_rows.items())]
+        out += ["# HELP db_queries_total SQL statements, including background work.",
+                "# TYPE db_queries_total counter",
+                f"db_queries_total {_totals['queries']}",
+                "# HELP db_query_seconds_total Time spent in SQL statements, including background work.",
+                "# TYPE db_query_seconds_total counter",
+                f"db_query_seconds_total {_totals['seconds']}"]
+    return "\n".join(out) + "\n"
@@ -0,0 +1,163 @@
+"""
+Versioned schema migrations.
+
+The database records how far it has been migrated in a one-row
+`schema_version` table.  Migrations are an explicit deploy step:
+
+    python migrations.py            # bring the database up to date
+    python migrations.py --status   # print the current and latest version
+
+At startup main.py only calls `check()`, a single SELECT, and refuses to
+start against a database that is behind, so many workers booting at once
+never introspect or ALTER the same database concurrently.
+
+Tables that don't exist yet are created from the models first, so a new
+database already has the latest columns.  Every migration must therefore be
+idempotent: a no-op when its change is already present.  To change the
+schema, update models.py and append a step to MIGRATIONS; never edit or
+reorder a step that has shipped.
+"""
+from sqlalchemy import inspect as sa_inspect, text
+from sqlalchemy.exc import DBAPIError
+
+import models
+import rollups
+import search
+
+
+def _legacy_columns(db):
+    """Columns added to stores/services/users before migrations were versioned."""
+    wanted = {
+        "stores": [
+            ("category",        "VARCHAR DEFAULT 'services'"),
+            ("menu_style",      "VARCHAR DEFAULT 'grid'"),
+            ("primary_color",   "VARCHAR DEFAULT '#667eea'"),
+            ("secondary_color", "VARCHAR DEFAULT '#764ba2'"),
+            ("accent_color",    "VARCHAR DEFAULT '#28a745'"),
+            ("theme",           "VARCHAR DEFAULT 'modern'"),
+            ("banner_image_url", "VARCHAR"),
+            ("logo_url",         "VARCHAR"),
+            ("tagline",          "VARCHAR"),
+            ("welcome_message",  "TEXT"),
+            ("footer_text",      "VARCHAR"),
+        ],
+        "services": [("image_url", "VARCHAR")],
+        "users": [
+            ("is_verified",        "BOOLEAN DEFAULT TRUE"),
+            ("verification_token", "VARCHAR"),
+        ],
+    }
+    insp = sa_inspect(db.connection())
+    for table, columns in wanted.items():
+        existing = {c["name"] for c in insp.get_columns(table)}
+        for col, typedef in columns:
+            if col not in existing:
+                db.execute(text(f"ALTER TABLE {table} ADD COLUMN {col} {typedef}"))
+
+
+def _order_rollups(db):
+    """Fill order_rollups for databases that already had orders.
+
+    The rollups read orders.price, which step 7 added later, so that column is
+    added (and backfilled) here first; step 7 is then a no-op.
+    """
+    _order_prices(db)
+    rollups.backfill_if_empty(db)
+
+
+def _secondary_indexes(db):
+    for name, table, cols in [
+        ("ix_users_verification_token",    "users",    "verification_token"),
+        ("ix_stores_created_at",           "stores",   "created_at, id"),
+        ("ix_stores_category_created_at",  "stores",   "category, created_at, id"),
+        ("ix_stores_owner_id",             "stores",   "owner_id"),
+        ("ix_services_store_id",           "services", "store_id"),
+        ("ix_orders_store_id_created_at",  "orders",   "store_id, created_at, id"),
+        ("ix_orders_user_id_created_at",   "orders",   "user_id, created_at, id"),
+        ("ix_orders_created_at",           "orders",   "created_at, id"),
+    ]:
+        db.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({cols})"))
+
+
+def _search_tables(db):
+    search.create(db)
+
+
+def _email_outbox(db):
+    models.EmailOutbox.__table__.create(db.connection(), checkfirst=True)
+
+
+def _orders_archive(db):
+    models.ArchivedOrder.__table__.create(db.connection(), checkfirst=True)
+
+
+def _order_prices(db):
+    """Unit price on each order; existing orders get their menu item's current price."""
+    insp = sa_inspect(db.connection())
+    for table in ("orders", "orders_archive"):
+        if "price" not in {c["name"] for c in insp.get_columns(table)}:
+            db.execute(text(f"ALTER TABLE {table} ADD COLUMN price INTEGER"))
+        db.execute(text(f"UPDATE {table} SET price = (SELECT price FROM services "
+                        f"WHERE services.id = {table}.service_id) WHERE price IS NULL"))
+
+
+MIGRATIONS = [
+    (1, "store theme, service image and user verification columns", _legacy_columns),
+    (2, "order_rollups backfill", _order_rollups),
+    (3, "secondary indexes for list endpoints", _secondary_indexes),
+    (4, "full-text search tables", _search_tables),
+    (5, "email outbox", _email_outbox),
+    (6, "orders archive table", _orders_archive),
+    (7, "unit price captured on orders", _order_prices),
+]
+HEAD = MIGRATIONS[-1][0]
+
+
+def current_version(db):
+    """The database's schema version; 0 for a database that predates versioning."""
+    try:
+        return db.execute(text("SELECT version FROM schema_version")).scalar() or 0
+    except DBAPIError:
+        db.rollback()
+        return 0
+
+
+def check(db):
+    """Fail fast if the database needs migrating. One SELECT when up to date."""
+    version = current_version(db)
+    if version < HEAD:
+        raise RuntimeError(
+            f"Database schema is at version {version}, this code needs {HEAD}. "
+            f"Run `python migrations.py` first.")
+    return version
+
+
+def migrate(db, log=print):
+    """Create missing tables, then apply every pending migration, one transaction each."""
+    models.Base.metadata.create_all(bind=db.get_bind())
+    db.execute(text("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)"))
+    db.commit()
+    version = current_version(db)
+    for number, description, step in MIGRATIONS:
+        if number <= version:
+            continue
+        log(f"[migrate] {number}: {description}")
+        step(db)
+        db.execute(text("DELETE FROM schema_version"))
+        db.execute(text("INSERT INTO schema_version (version) VALUES (:v)"), {"v": number})
+        db.commit()
+        version = number
+    return version
+
+
+if __name__ == "__main__":
+    import sys
+    from database import SessionLocal
+    db = SessionLocal()
+    try:
+        if "--status" in sys.argv[1:]:
+            print(f"Schema version {current_version(db)} (latest {HEAD})")
+        else:
+            print(f"Schema is at version {migrate(db)}")
+    finally:
+        db.close()
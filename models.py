@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, String, Integer, ForeignKey, DateTime, Text, Boolean
+from sqlalchemy import Column, String, Integer, Float, ForeignKey, DateTime, Text, Boolean, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
@@ -36,6 +36,10 @@ class User(Base):
     orders = relationship("Order", back_populates="user", foreign_keys="Order.user_id")
     stores = relationship("Store", back_populates="owner")
 
+    __table_args__ = (
+        Index("ix_users_verification_token", "verification_token"),
+    )
+
 
 class Store(Base):
     __tablename__ = "stores"
@@ -65,6 +69,12 @@ class Store(Base):
     owner    = relationship("User", back_populates="stores")
     services = relationship("Service", back_populates="store")
 
+    __table_args__ = (
+        Index("ix_stores_created_at", "created_at", "id"),
+        Index("ix_stores_category_created_at", "category", "created_at", "id"),
+        Index("ix_stores_owner_id", "owner_id"),
+    )
+
 
 class Service(Base):
     __tablename__ = "services"
@@ -77,6 +87,10 @@ class Service(Base):
     store   = relationship("Store", back_populates="services")
     orders  = relationship("Order", back_populates="service")
 
+    __table_args__ = (
+        Index("ix_services_store_id", "store_id"),
+    )
+
 
 class Order(Base):
     __tablename__ = "orders"
@@ -92,7 +106,70 @@ class Order(Base):
     customer_phone   = Column(String, nullable=True)
     notes            = Column(Text, nullable=True)
     quantity         = Column(Integer, default=1)
+    price            = Column(Integer, nullable=True)     # unit price when ordered
     created_at       = Column(DateTime, default=datetime.utcnow)
     user    = relationship("User", back_populates="orders", foreign_keys=[user_id])
     service = relationship("Service", back_populates="orders")
-    store   = relationship("Store")
\ No newline at end of file
+    store   = relationship("Store")
+
+    # Every order listing filters by store or user and pages on (created_at, id)
+    __table_args__ = (
+        Index("ix_orders_store_id_created_at", "store_id", "created_at", "id"),
+        Index("ix_orders_user_id_created_at", "user_id", "created_at", "id"),
+        Index("ix_orders_created_at", "created_at", "id"),
+    )
+
+
+class ArchivedOrder(Base):
+    """Finished orders moved out of `orders` by archive.py; same columns, read-only."""
+    __tablename__ = "orders_archive"
+    id               = Column(String, primary_key=True)
+    user_id          = Column(String, ForeignKey("users.id"))
+    service_id       = Column(String, ForeignKey("services.id"))
+    store_id         = Column(String, ForeignKey("stores.id"))
+    status           = Column(String)
+    order_type       = Column(String)
+    table_number     = Column(String, nullable=True)
+    delivery_address = Column(Text, nullable=True)
+    customer_name    = Column(String, nullable=True)
+    customer_phone   = Column(String, nullable=True)
+    notes            = Column(Text, nullable=True)
+    quantity         = Column(Integer)
+    price            = Column(Integer, nullable=True)
+    created_at       = Column(DateTime)
+
+    __table_args__ = (
+        Index("ix_orders_archive_store_id_created_at", "store_id", "created_at", "id"),
+        Index("ix_orders_archive_user_id_created_at", "user_id", "created_at", "id"),
+        Index("ix_orders_archive_created_at", "created_at", "id"),
+    )
+
+
+class OrderRollup(Base):
+    """Per-store, per-month order totals kept in step with `orders` (see rollups.py)."""
+    __tablename__ = "order_rollups"
+    store_id    = Column(String, ForeignKey("stores.id"), primary_key=True)
+    month       = Column(String, primary_key=True)   # "YYYY-MM"
+    revenue     = Column(Float, default=0)
+    order_count = Column(Integer, default=0)
+
+
+class EmailOutbox(Base):
+    """Outgoing mail waiting for mailer.py's dispatcher (see mailer.enqueue)."""
+    __tablename__ = "email_outbox"
+    id              = Column(Integer, primary_key=True, autoincrement=True)
+    to_email        = Column(String, nullable=False)
+    subject         = Column(String, nullable=False)
+    text_body       = Column(Text, nullable=False)
+    html_body       = Column(Text, nullable=True)
+    status          = Column(String, default="pending")   # pending | sent | failed
+    attempts        = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow)
+    claim           = Column(String, nullable=True)       # set by the dispatcher sending it
+    last_error      = Column(Text, nullable=True)
+    created_at      = Column(DateTime, default=datetime.utcnow)
+    sent_at         = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_email_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
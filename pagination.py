@@ -0,0 +1,114 @@
+"""
+Keyset (cursor) pagination and column projection for list endpoints.
+
+A list endpoint describes its output as a mapping of field name -> SQL column
+expression.  `page()` selects only the requested fields, orders by the
+endpoint's sort key (newest first) and fetches one page after the cursor, so
+the work done is proportional to the page size rather than the table size.
+
+The cursor is an opaque, URL-safe token encoding the sort key of the last row
+returned; pass it back as `cursor=` to get the next page.
+"""
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 500
+
+
+def encode_cursor(values):
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, key):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except ValueError:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(key):
+        raise ValueError("Invalid cursor")
+    try:
+        return [_key_value(col, v) for col, v in zip(key, values)]
+    except (TypeError, ValueError):
+        raise ValueError("Invalid cursor")
+
+
+def _key_value(col, value):
+    python_type = col.type.python_type
+    if value is None:
+        return None
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if not isinstance(value, python_type):
+        raise TypeError(f"{col.key} must be {python_type.__name__}")
+    return value
+
+
+def parse_fields(fields, columns):
+    """Validate a comma-separated `fields=` value against the endpoint's columns."""
+    if not fields:
+        return list(columns)
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [n for n in names if n not in columns]
+    if unknown or not names:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}. Available: {', '.join(columns)}")
+    return names
+
+
+def _after(key, values):
+    """WHERE clause for rows strictly after `values` in descending `key` order."""
+    clauses = []
+    for i, col in enumerate(key):
+        equal = [key[j] == values[j] for j in range(i)]
+        clauses.append(and_(*equal, col < values[i]))
+    return or_(*clauses)
+
+
+def _fetch(query, columns, key, names, values, limit):
+    query = query.with_entities(*[columns[n].label(n) for n in names],
+                                *[col.label(f"_k{i}") for i, col in enumerate(key)])
+    if values:
+        query = query.filter(_after(key, values))
+    return query.order_by(*[col.desc() for col in key]).limit(limit + 1).all()
+
+
+def page(query, columns, key, fields=None, cursor=None, limit=None, cold=None):
+    """
+    Run one page of `query`.
+
+    `columns` maps output names to column expressions, `key` is the tuple of
+    unique sort columns (e.g. created_at, id).  Returns (rows, next_cursor)
+    where rows are plain dicts and next_cursor is None on the last page.
+
+    `cold` is an optional (query, columns, key, horizon) for older rows of the
+    same shape kept in another table (orders_archive, see archive.py).
+    `horizon()` returns the newest key[0] in that table, or None if it is
+    empty; the cold table is only read once the page reaches back that far,
+    and then both sides are merged in key order, so one cursor walks both.
+    """
+    names = parse_fields(fields, columns)
+    limit = min(max(int(limit or DEFAULT_LIMIT), 1), MAX_LIMIT)
+    values = decode_cursor(cursor, key) if cursor else None
+    n = len(names)
+    rows = _fetch(query, columns, key, names, values, limit)
+
+    if cold is not None:
+        cold_query, cold_columns, cold_key, horizon = cold
+        newest = horizon()
+        reached = rows[limit - 1][n] if len(rows) > limit else None
+        if newest is not None and (reached is None or reached <= newest):
+            rows += _fetch(cold_query, cold_columns, cold_key, names, values, limit)
+            # descending, a NULL key last as in SQL
+            rows.sort(key=lambda r: (r[n] is not None, tuple(r[n:])), reverse=True)
+            rows = rows[:limit + 1]
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(list(rows[-1][n:]))
+    return [dict(zip(names, r)) for r in rows], next_cursor      # key columns come last
@@ -0,0 +1,36 @@
+"""
+Cache of authenticated users for get_current_user.
+
+Every authenticated request used to load the full User row.  Handlers only
+need the id and role (and is_verified), so `cache` keeps those as a small
+immutable Principal per user id:
+
+* entries expire PRINCIPAL_CACHE_TTL seconds after they were loaded, and the
+  least recently used ones are evicted beyond PRINCIPAL_CACHE_SIZE;
+* code that changes a user's role or verification status calls
+  `cache.invalidate(user_id)` after committing;
+* `cache.stats()` reports hits, misses and evictions (GET /admin/auth-cache).
+
+The cache is per process, so with several workers a change made through one
+worker reaches the others within the TTL.
+"""
+import os
+from collections import namedtuple
+
+import models
+from ttlcache import TTLCache
+
+TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL", "60"))
+MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_SIZE", "1024"))
+
+Principal = namedtuple("Principal", "id role is_verified")
+
+
+def load(db, user_id):
+    """The Principal for `user_id` straight from the database, or None."""
+    U = models.User
+    row = db.query(U.id, U.role, U.is_verified).filter(U.id == user_id).first()
+    return Principal(*row) if row else None
+
+
+cache = TTLCache(ttl=TTL_SECONDS, max_entries=MAX_ENTRIES)
@@ -0,0 +1,126 @@
+"""
+QR codes for the customer ordering pages, rendered locally with segno.
+
+    pip install segno
+
+`GET /qr` returns one code (PNG or SVG) for the store list, a store's menu
+or one table of a store.  Rendering takes a few milliseconds, but a table
+card page asks for dozens at once, so codes are kept in `cache` by
+(target URL, format, size) and sent with a one-day Cache-Control.
+
+`GET /stores/{id}/qr-sheet` renders every table at once as a printable A4
+PDF (TABLES_PER_PAGE per page, labelled "Table N") or as a ZIP of PNGs.
+That is the slow part, so `sheet()` runs in the image worker pool, one
+sheet at a time, and finished sheets are kept in `sheets` by (base URL,
+store, store name, tables, format, size).  Only the store's owner or an
+admin may download them.
+
+URLs point at PUBLIC_BASE_URL if it is set (e.g. https://menu.example.com),
+otherwise at the host the request came in on.
+"""
+import io
+import os
+import re
+import zipfile
+from urllib.parse import urlencode
+
+from ttlcache import TTLCache
+
+MEDIA_TYPES = {"png": "image/png", "svg": "image/svg+xml"}
+SHEET_TYPES = {"pdf": "application/pdf", "zip": "application/zip"}
+MIN_SIZE, MAX_SIZE = 64, 2048
+MAX_TABLES = 200
+TABLES_PER_PAGE = (3, 4)            # columns, rows on an A4 page
+PAGE_SIZE, PAGE_DPI = (1240, 1754), 150
+
+# (target URL, format, size) -> bytes
+cache = TTLCache(ttl=float(os.getenv("QR_CACHE_TTL", "3600")),
+                 max_entries=int(os.getenv("QR_CACHE_SIZE", "512")))
+
+# (base URL, store id, store name, tables, format, size) -> bytes; sheets run to megabytes
+sheets = TTLCache(ttl=float(os.getenv("QR_CACHE_TTL", "3600")),
+                  max_entries=int(os.getenv("QR_SHEET_CACHE_SIZE", "16")))
+
+
+def target_url(base_url, store_id=None, table=None):
+    """The page a code opens: the store list, a store's menu, or its menu for one table."""
+    if not store_id:
+        return f"{base_url}/static/customer.html"
+    params = {"store": store_id, **({"table": table} if table else {})}
+    return f"{base_url}/static/menu.html?{urlencode(params)}"
+
+
+def parse_tables(spec):
+    """'12' -> tables 1..12; '1-10,14,20-22' -> those tables. Raises ValueError."""
+    spec = spec.strip()
+    if spec.isdigit():
+        ranges = [(1, int(spec))]
+    else:
+        ranges = []
+        for part in spec.split(","):
+            m = re.fullmatch(r"\s*(\d+)\s*(?:-\s*(\d+)\s*)?", part)
+            if not m:
+                raise ValueError(f"bad table range: {part!r}")
+            ranges.append((int(m.group(1)), int(m.group(2) or m.group(1))))
+    # count before building anything, so tables=1-50000000 costs nothing
+    total = 0
+    for first, last in ranges:
+        total += max(0, last - first + 1)
+        if total > MAX_TABLES:
+            break
+    if not total or total > MAX_TABLES:
+        raise ValueError(f"between 1 and {MAX_TABLES} tables")
+    return list(dict.fromkeys(n for first, last in ranges for n in range(first, last + 1)))
+
+
+def render(data, fmt="png", size=400):
+    """One QR code for `data` as PNG or SVG bytes, about `size` pixels across."""
+    import segno
+    code = segno.make(data, error="m", micro=False)
+    scale = max(1, size // code.symbol_size(border=4)[0])       # whole pixels per module: crisp edges
+    out = io.BytesIO()
+    code.save(out, kind=fmt, scale=scale, border=4)
+    return out.getvalue()
+
+
+def _font(size):
+    from PIL import ImageFont
+    try:
+        return ImageFont.truetype("DejaVuSans.ttf", size)      # fonts-dejavu, on most Linux/Pi installs
+    except OSError:
+        return ImageFont.load_default(size=size)                # ASCII only
+
+
+def sheet(base_url, store_id, store_name, tables, fmt="pdf", size=600):
+    """Every table's code as a printable A4 PDF, or a ZIP of `size`-pixel PNGs.
+
+    Runs in a pool worker.
+    """
+    if fmt == "zip":
+        out = io.BytesIO()
+        with zipfile.ZipFile(out, "w", zipfile.ZIP_STORED) as z:   # PNGs don't compress further
+            for table in tables:
+                z.writestr(f"table-{table}.png", render(target_url(base_url, store_id, table), "png", size))
+        return out.getvalue()
+
+    from PIL import Image, ImageDraw
+    cols, rows = TABLES_PER_PAGE
+    cell_w, cell_h = PAGE_SIZE[0] // cols, PAGE_SIZE[1] // rows
+    title, caption = _font(34), _font(20)
+    pages = []
+    for i, table in enumerate(tables):
+        if i % (cols * rows) == 0:
+            pages.append(Image.new("L", PAGE_SIZE, 255))
+            draw = ImageDraw.Draw(pages[-1])
+        col, row = i % cols, (i // cols) % rows
+        x, y = col * cell_w, row * cell_h
+        code = Image.open(io.BytesIO(render(target_url(base_url, store_id, table), "png", cell_w - 90)))
+        pages[-1].paste(code, (x + (cell_w - code.width) // 2, y + 50))
+        draw.text((x + cell_w // 2, y + 30), f"Table {table}", fill=0, font=title, anchor="mm")
+        draw.text((x + cell_w // 2, y + 50 + code.height + 8), f"{store_name} · Scan to order",
+                  fill=90, font=caption, anchor="mt")
+    out = io.BytesIO()
+    # 1-bit pages: stored losslessly (JPEG would blur the modules) and tiny
+    pages = [page.convert("1", dither=Image.Dither.NONE) for page in pages]
+    pages[0].save(out, "PDF", resolution=PAGE_DPI, save_all=True, append_images=pages[1:])
+    return out.getvalue()
@@ -0,0 +1,141 @@
+"""
+Incremental analytics rollups.
+
+Every order, hot or archived (see archive.py), contributes `price *
+quantity` revenue and one order to the `order_rollups` row for its (store,
+month).  The order endpoints in main.py keep those rows current, so the
+analytics dashboards only ever read a few rows per store instead of the
+whole `orders` table.
+
+Run this file directly to rebuild the rollups from existing orders:
+
+    python rollups.py
+"""
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import func, literal_column
+from sqlalchemy.exc import IntegrityError
+
+import models
+
+# Orders in these statuses are left out of revenue and order counts.
+EXCLUDED_STATUSES = {"Cancelled"}
+
+
+def month_key(created_at) -> str:
+    return (created_at or datetime.utcnow()).strftime("%Y-%m")
+
+
+def month_expr(db, column):
+    """SQL expression formatting a datetime column as "YYYY-MM"."""
+    if db.get_bind().dialect.name == "sqlite":
+        return func.strftime("%Y-%m", column)
+    # Inline the format so SELECT and GROUP BY render the identical expression
+    # (PostgreSQL won't match two separately bound parameters).
+    return func.to_char(column, literal_column("'YYYY-MM'"))
+
+
+def counts(status) -> bool:
+    return status not in EXCLUDED_STATUSES
+
+
+def apply(db, store_id, month, revenue, order_count=1):
+    """Add a delta to one rollup row, creating the row if needed. Does not commit."""
+    R = models.OrderRollup
+    key = (R.store_id == store_id) & (R.month == month)
+    delta = {R.revenue: R.revenue + revenue, R.order_count: R.order_count + order_count}
+    if db.query(R).filter(key).update(delta, synchronize_session=False):
+        return
+    try:
+        with db.begin_nested():
+            db.add(R(store_id=store_id, month=month, revenue=revenue, order_count=order_count))
+    except IntegrityError:
+        # Another writer created the row between our UPDATE and INSERT.
+        db.query(R).filter(key).update(delta, synchronize_session=False)
+
+
+def record_orders(db, orders):
+    """Add newly created orders to the rollups, at the unit price stored on each order."""
+    deltas = defaultdict(lambda: [0, 0])
+    for o in orders:
+        if not counts(o.status):
+            continue
+        d = deltas[(o.store_id, month_key(o.created_at))]
+        d[0] += (o.price or 0) * (o.quantity or 1)
+        d[1] += 1
+    for (store_id, month), (revenue, n) in deltas.items():
+        apply(db, store_id, month, revenue, n)
+
+
+def record_status_change(db, order, price, old_status, new_status):
+    """Move an order in or out of the rollups when its status crosses EXCLUDED_STATUSES."""
+    was, now = counts(old_status), counts(new_status)
+    if was == now:
+        return
+    sign = 1 if now else -1
+    apply(db, order.store_id, month_key(order.created_at),
+          sign * (price or 0) * (order.quantity or 1), sign)
+
+
+def record_status_changes(db, orders, new_status):
+    """record_status_change for many orders moving to `new_status`; one apply() per (store, month).
+
+    `orders` are rows with store_id, created_at, quantity, status (the old one) and price.
+    """
+    deltas = defaultdict(lambda: [0, 0])
+    now = counts(new_status)
+    for o in orders:
+        if counts(o.status) == now:
+            continue
+        sign = 1 if now else -1
+        d = deltas[(o.store_id, month_key(o.created_at))]
+        d[0] += sign * (o.price or 0) * (o.quantity or 1)
+        d[1] += sign
+    for (store_id, month), (revenue, n) in deltas.items():
+        apply(db, store_id, month, revenue, n)
+
+
+def forget_store(db, store_id):
+    db.query(models.OrderRollup).filter(models.OrderRollup.store_id == store_id).delete()
+
+
+def rebuild(db):
+    """Recompute every rollup row from `orders` and `orders_archive`, one GROUP BY each."""
+    S = models.Service
+    totals = defaultdict(lambda: [0, 0])
+    for O in (models.Order, models.ArchivedOrder):
+        month = month_expr(db, O.created_at)
+        rows = (
+            db.query(O.store_id, month,
+                     func.sum(func.coalesce(O.price, S.price, 0) * func.coalesce(O.quantity, 1)),
+                     func.count(O.id))
+            .outerjoin(S, S.id == O.service_id)
+            .filter(O.store_id.isnot(None), O.created_at.isnot(None))
+            .filter(O.status.is_(None) | ~O.status.in_(EXCLUDED_STATUSES))
+            .group_by(O.store_id, month)
+        )
+        for sid, m, rev, n in rows:
+            totals[(sid, m)][0] += rev or 0
+            totals[(sid, m)][1] += n
+    db.query(models.OrderRollup).delete()
+    db.add_all(models.OrderRollup(store_id=sid, month=m, revenue=rev, order_count=n)
+               for (sid, m), (rev, n) in totals.items())
+    db.commit()
+    return len(totals)
+
+
+def backfill_if_empty(db):
+    """Build the rollups once for databases that predate them."""
+    if db.query(models.OrderRollup).first() is None and db.query(models.Order).first() is not None:
+        rebuild(db)
+
+
+if __name__ == "__main__":
+    from database import SessionLocal, engine
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        print(f"Rebuilt {rebuild(db)} rollup rows")
+    finally:
+        db.close()
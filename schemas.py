@@ -0,0 +1,163 @@
+"""
+Response schemas and the JSON encoder behind every response.
+
+    pip install orjson        # optional; stdlib json is the fallback
+
+The models below declare what the read endpoints return (they show up in
+/docs).  `JSONBytes` is the app's default response class: it encodes with
+orjson, which handles datetimes natively and is several times faster than
+FastAPI's jsonable_encoder + json.dumps.
+
+Store, menu and order endpoints build their rows straight from SQL column
+tuples (see loading.py and pagination.page) and return a `JSONBytes`, so
+those rows are encoded once and not re-validated against the model; the
+model is the contract, the SQL column map is the implementation.  Keep the
+*_FIELDS maps in loading.py and these models in step.
+
+Every field is optional because `fields=` can ask for a subset of them.
+`python benchmarks/json_bench.py` compares the encoding paths.
+"""
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import List, Optional
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# ── encoding ─────────────────────────────────────────────────────────────────
+def _default(value):
+    if isinstance(value, Decimal):          # SUM() on PostgreSQL
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(content):
+    """`content` (dicts, lists, datetimes, Decimals…) as compact JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+class JSONBytes(JSONResponse):
+    def render(self, content):
+        return dumps(content)
+
+
+# ── stores and menus ─────────────────────────────────────────────────────────
+class Store(BaseModel):
+    id: Optional[str] = None
+    name: Optional[str] = None
+    description: Optional[str] = None
+    owner_id: Optional[str] = None
+    owner_name: Optional[str] = None
+    category: Optional[str] = None
+    menu_style: Optional[str] = None
+    primary_color: Optional[str] = None
+    secondary_color: Optional[str] = None
+    accent_color: Optional[str] = None
+    theme: Optional[str] = None
+    banner_image_url: Optional[str] = None
+    logo_url: Optional[str] = None
+    tagline: Optional[str] = None
+    welcome_message: Optional[str] = None
+    footer_text: Optional[str] = None
+
+
+class MyStore(Store):
+    services_count: int = 0
+
+
+class Service(BaseModel):
+    id: Optional[str] = None
+    name: Optional[str] = None
+    description: Optional[str] = None
+    price: Optional[int] = None
+    store_id: Optional[str] = None
+    image_url: Optional[str] = None
+
+
+class CatalogService(Service):
+    store_name: Optional[str] = None
+
+
+class Menu(BaseModel):
+    store: Store
+    services: List[Service]
+
+
+# ── orders ───────────────────────────────────────────────────────────────────
+class MyOrder(BaseModel):
+    id: Optional[str] = None
+    status: Optional[str] = None
+    service_name: Optional[str] = None
+    store_name: Optional[str] = None
+    price: Optional[int] = None
+    created_at: Optional[datetime] = None
+
+
+class StoreOrder(BaseModel):
+    id: Optional[str] = None
+    status: Optional[str] = None
+    customer_name: Optional[str] = None
+    customer_phone: Optional[str] = None
+    service_name: Optional[str] = None
+    price: Optional[int] = None
+    quantity: Optional[int] = None
+    order_type: Optional[str] = None
+    table_number: Optional[str] = None
+    delivery_address: Optional[str] = None
+    notes: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+
+class AdminOrder(BaseModel):
+    id: Optional[str] = None
+    status: Optional[str] = None
+    customer_name: Optional[str] = None
+    store_name: Optional[str] = None
+    service_name: Optional[str] = None
+    price: Optional[int] = None
+    quantity: Optional[int] = None
+    order_type: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+
+class AdminStats(BaseModel):
+    total_stores: int
+    total_services: int
+    total_orders: int
+    pending_orders: int
+
+
+# ── analytics ────────────────────────────────────────────────────────────────
+class MonthTotal(BaseModel):
+    month: str
+    revenue: float
+    order_count: int
+
+
+class StoreTotal(BaseModel):
+    store_id: str
+    store_name: Optional[str] = None
+    revenue: float
+    order_count: int
+
+
+class Analytics(BaseModel):
+    total_revenue: float
+    revenue_this_month: float
+    revenue_last_month: float
+    orders_this_month: int
+    orders_last_month: int
+    total_orders: int
+    by_month: List[MonthTotal]
+    by_store: List[StoreTotal]
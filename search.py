@@ -0,0 +1,170 @@
+"""
+Full-text search over stores and menu items, backed by SQLite FTS5.
+
+Stores and menu items each get an FTS5 table (`store_search`,
+`service_search`) over name + description.  Their rowids point at
+`search_docs`, an ordinary table mapping each document back to its store or
+service id, so re-indexing or deleting one row is an indexed lookup rather
+than a scan.  The store and service endpoints in main.py keep the index in
+sync, and `search()` returns bm25-ranked hits with prefix matching on every
+word, so "piz marg" finds "Margherita Pizza" while the user types.
+
+When FTS5 isn't available (another database backend, or an SQLite build
+without it) `enabled` stays False and callers fall back to LIKE filters.
+
+Run this file directly to rebuild the index from the stores/services tables:
+
+    python search.py
+"""
+import re
+
+from sqlalchemy import String, text
+from sqlalchemy.exc import OperationalError
+
+import models
+
+enabled = False
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+_TABLES = {"store": "store_search", "service": "service_search"}
+
+_FTS_OPTIONS = "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3 4'"
+
+
+def create(db):
+    """Create and fill the search tables (a migration step). Returns False without FTS5."""
+    if db.get_bind().dialect.name != "sqlite":
+        return False
+    try:
+        for table in _TABLES.values():
+            db.execute(text(f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} "
+                            f"USING fts5(name, description, {_FTS_OPTIONS})"))
+    except OperationalError as exc:
+        print(f"[search] FTS5 unavailable, falling back to LIKE search: {exc}")
+        db.rollback()
+        return False
+    db.execute(text(
+        "CREATE TABLE IF NOT EXISTS search_docs (id INTEGER PRIMARY KEY, kind TEXT NOT NULL, "
+        "ref_id TEXT NOT NULL, store_id TEXT NOT NULL)"))
+    db.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ix_search_docs_kind_ref_id "
+                    "ON search_docs (kind, ref_id)"))
+    db.execute(text("CREATE INDEX IF NOT EXISTS ix_search_docs_store_id ON search_docs (store_id)"))
+    rebuild(db)
+    return True
+
+
+def setup(db):
+    """Set `enabled` if the search tables exist (see migrations.py)."""
+    global enabled
+    enabled = db.get_bind().dialect.name == "sqlite" and db.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_docs'")).first() is not None
+    return enabled
+
+
+def match_expression(q):
+    """Turn free text into an FTS5 query: every word must match, as a prefix."""
+    words = _WORD.findall(q or "")
+    return " ".join(f'"{w}"*' for w in words)
+
+
+def _insert(db, kind, ref_id, store_id, name, description):
+    doc_id = db.execute(text(
+        "INSERT INTO search_docs (kind, ref_id, store_id) VALUES (:kind, :ref_id, :store_id)"),
+        {"kind": kind, "ref_id": ref_id, "store_id": store_id}).lastrowid
+    db.execute(text(f"INSERT INTO {_TABLES[kind]} (rowid, name, description) "
+                    "VALUES (:id, :name, :description)"),
+               {"id": doc_id, "name": name or "", "description": description or ""})
+
+
+def _delete(db, kind, column, value):
+    where = f"FROM search_docs WHERE kind = :kind AND {column} = :value"
+    params = {"kind": kind, "value": value}
+    db.execute(text(f"DELETE FROM {_TABLES[kind]} WHERE rowid IN (SELECT id {where})"), params)
+    db.execute(text(f"DELETE {where}"), params)
+
+
+def remove(db, kind, ref_id):
+    if enabled:
+        _delete(db, kind, "ref_id", ref_id)
+
+
+def index_store(db, store):
+    """(Re)index a store. Does not commit."""
+    if enabled:
+        remove(db, "store", store.id)
+        _insert(db, "store", store.id, store.id, store.name, store.description)
+
+
+def index_service(db, service):
+    """(Re)index a menu item. Does not commit."""
+    if enabled:
+        remove(db, "service", service.id)
+        _insert(db, "service", service.id, service.store_id, service.name, service.description)
+
+
+def remove_store(db, store_id):
+    """Drop a store and all of its menu items from the index."""
+    if enabled:
+        for kind in _TABLES:
+            _delete(db, kind, "store_id", store_id)
+
+
+def rebuild(db):
+    for table in ("search_docs", *_TABLES.values()):
+        db.execute(text(f"DELETE FROM {table}"))
+    for s in db.query(models.Store.id, models.Store.name, models.Store.description):
+        _insert(db, "store", s.id, s.id, s.name, s.description)
+    for s in db.query(models.Service.id, models.Service.store_id,
+                      models.Service.name, models.Service.description):
+        _insert(db, "service", s.id, s.store_id, s.name, s.description)
+    db.commit()
+
+
+def store_ids(q):
+    """Subquery of store ids whose own name/description match `q`; empty if `q` has no words."""
+    expr = match_expression(q)
+    if not expr:        # an empty MATCH is an FTS5 syntax error
+        return text("SELECT ref_id FROM search_docs WHERE 1 = 0").columns(ref_id=String)
+    return text("SELECT d.ref_id FROM store_search JOIN search_docs d ON d.id = store_search.rowid "
+                "WHERE store_search MATCH :q").bindparams(q=expr).columns(ref_id=String)
+
+
+def search(db, q, limit=20):
+    """
+    Ranked matches for `q`: {"stores": [...], "services": [...]}.
+
+    Store hits come from the store's own text; service hits carry their
+    store's id and name so a menu match can link to the store page.
+    """
+    expr = match_expression(q)
+    if not expr:
+        return {"stores": [], "services": []}
+    store_order, service_order = (db.execute(text(
+        f"SELECT d.ref_id FROM {table} JOIN search_docs d ON d.id = {table}.rowid "
+        f"WHERE {table} MATCH :q ORDER BY bm25({table}, 10.0, 1.0) LIMIT :limit"),
+        {"q": expr, "limit": limit}).scalars().all() for table in _TABLES.values())
+
+    St, S = models.Store, models.Service
+    stores = {r.id: dict(r._mapping) for r in db.query(
+        St.id, St.name, St.description, St.category, St.banner_image_url, St.logo_url
+    ).filter(St.id.in_(store_order))} if store_order else {}
+    services = {r.id: dict(r._mapping) for r in db.query(
+        S.id, S.name, S.description, S.price, S.image_url, S.store_id, St.name.label("store_name")
+    ).outerjoin(St, St.id == S.store_id).filter(S.id.in_(service_order))} if service_order else {}
+    return {
+        "stores": [stores[i] for i in store_order if i in stores],
+        "services": [services[i] for i in service_order if i in services],
+    }
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+    db = SessionLocal()
+    try:
+        if create(db):
+            print("Search index rebuilt")
+        else:
+            print("FTS5 is not available on this database")
+    finally:
+        db.close()
@@ -77,43 +77,43 @@ async function loadAnalytics() {
 
 async function loadStats() {
     try {
-        // Load stores count
-        const storesRes = await fetch(`${API}/stores`)
-        const stores = await storesRes.json()
-        document.getElementById("totalStores").innerText = stores.length
-
-        // Load services count
-        const servicesRes = await fetch(`${API}/services`)
-        const services = await servicesRes.json()
-        document.getElementById("totalServices").innerText = services.length
-
-        // Load orders and calculate stats
-        const ordersRes = await fetch(`${API}/admin/orders`, {
+        // One request; the server counts with SQL COUNTs instead of shipping rows
+        const res = await fetch(`${API}/admin/stats`, {
             headers: {
                 "Authorization": "Bearer " + getToken()
             }
         })
-        const orders = await ordersRes.json()
-        
-        const pendingCount = orders.filter(o => o.status === "Pending").length
-        
-        document.getElementById("totalOrders").innerText = orders.length
-        document.getElementById("pendingOrders").innerText = pendingCount
+        if (!res.ok) throw new Error(`HTTP ${res.status}`)
+        const stats = await res.json()
+
+        document.getElementById("totalStores").innerText = stats.total_stores
+        document.getElementById("totalServices").innerText = stats.total_services
+        document.getElementById("totalOrders").innerText = stats.total_orders
+        document.getElementById("pendingOrders").innerText = stats.pending_orders
 
     } catch (err) {
         console.error("Error loading stats:", err)
     }
 }
 
-async function loadAllOrdersAdmin() {
+// Orders are loaded a page at a time (newest first); "Load more" fetches the next page
+let adminOrderList = []
+let adminOrdersCursor = null
+
+async function loadAllOrdersAdmin(more = false) {
     try {
-        const res = await fetch(`${API}/admin/orders`, {
+        if (!more) { adminOrderList = []; adminOrdersCursor = null }
+        const cursor = adminOrdersCursor ? `&cursor=${encodeURIComponent(adminOrdersCursor)}` : ""
+        const res = await fetch(`${API}/admin/orders?limit=100${cursor}`, {
             headers: {
                 "Authorization": "Bearer " + getToken()
             }
         })
 
-        const orders = await res.json()
+        adminOrderList = adminOrderList.concat(await res.json())
+        adminOrdersCursor = res.headers.get("X-Next-Cursor")
+        document.getElementById("loadMoreOrders").style.display = adminOrdersCursor ? "" : "none"
+        const orders = adminOrderList
 
         // Separate orders by status
         const allOrders = orders
@@ -177,15 +177,24 @@ function showToast(msg) {
 // ─────────────────────────────────────────────────────────────
 // MY ORDERS
 // ─────────────────────────────────────────────────────────────
-async function showMyOrders() {
+// Orders come a page at a time (newest first); "Load more" follows X-Next-Cursor
+let myOrders = [], myOrdersCursor = null;
+
+async function showMyOrders(more = false) {
   if (!getToken()) { openModal("loginModal"); return; }
   const content = document.getElementById("ordersContent");
-  content.innerHTML = `<p style="text-align:center;padding:24px;color:var(--muted)">Loading…</p>`;
-  openModal("ordersModal");
+  if (!more) {
+    myOrders = []; myOrdersCursor = null;
+    content.innerHTML = `<p style="text-align:center;padding:24px;color:var(--muted)">Loading…</p>`;
+    openModal("ordersModal");
+  }
   try {
-    const res = await fetch(`${API}/orders`, { headers: { "Authorization": "Bearer " + getToken() } });
+    const cursor = more && myOrdersCursor ? `&cursor=${encodeURIComponent(myOrdersCursor)}` : "";
+    const res = await fetch(`${API}/orders?limit=100${cursor}`, { headers: { "Authorization": "Bearer " + getToken() } });
     if (!res.ok) { content.innerHTML = `<p style="color:#e53e3e;padding:12px">Could not load orders.</p>`; return; }
-    const orders = await res.json();
+    myOrders = myOrders.concat(await res.json());
+    myOrdersCursor = res.headers.get("X-Next-Cursor");
+    const orders = myOrders;
     if (!orders.length) {
       content.innerHTML = `<div style="text-align:center;padding:40px;color:var(--muted)">
         <div style="font-size:3rem;margin-bottom:12px">📦</div>
@@ -201,7 +210,10 @@ async function showMyOrders() {
           <div style="font-size:.76rem;color:var(--muted)">${new Date(o.created_at).toLocaleDateString()}</div>
         </div>
         <span class="order-badge ${o.status === 'Completed' ? 'badge-completed' : 'badge-pending'}">${o.status}</span>
-      </div>`).join("");
+      </div>`).join("") + (myOrdersCursor ? `
+      <div style="text-align:center;padding:12px">
+        <button class="di" onclick="showMyOrders(true)">Load more</button>
+      </div>` : "");
   } catch { content.innerHTML = `<p style="color:#e53e3e;padding:12px">⚠️ Connection error.</p>`; }
 }
 
@@ -225,9 +237,15 @@ function showSkeletons() {
 async function fetchAllStores() {
   showSkeletons();
   try {
-    const res = await fetch(`${API}/stores`);   // fetch ALL, no params
-    if (!res.ok) throw new Error(`HTTP ${res.status}`);
-    ALL_STORES = await res.json();
+    // fetch ALL, no params — the endpoint is paginated, so follow X-Next-Cursor
+    ALL_STORES = [];
+    let cursor = null;
+    do {
+      const res = await fetch(`${API}/stores?limit=500` + (cursor ? `&cursor=${encodeURIComponent(cursor)}` : ""));
+      if (!res.ok) throw new Error(`HTTP ${res.status}`);
+      ALL_STORES = ALL_STORES.concat(await res.json());
+      cursor = res.headers.get("X-Next-Cursor");
+    } while (cursor);
     console.log(`✅ Loaded ${ALL_STORES.length} stores from server`);
   } catch (err) {
     console.error("Failed to load stores:", err);
@@ -38,10 +38,10 @@ async function loadStoreMenu() {
     menuContainer.innerHTML = '<div class="menu-loading"><div class="spinner"></div><div>Loading menu…</div></div>'
 
     try {
-        // Load store info
-        const storesRes = await fetch(`${API}/stores`)
-        const stores = await storesRes.json()
-        store = stores.find(s => s.id === storeId)
+        // Store info and menu items in one request
+        const menuRes = await fetch(`${API}/stores/${storeId}/menu`)
+        const menu = menuRes.ok ? await menuRes.json() : null
+        store = menu ? menu.store : null
         
         if (store) {
             document.getElementById('storeName').innerText = store.name
@@ -53,9 +53,7 @@ async function loadStoreMenu() {
             document.getElementById('deliverySection').style.display = dineIn ? 'none' : 'block'
         }
 
-        // Load menu items
-        const menuRes = await fetch(`${API}/stores/${storeId}/services`)
-        const menuItems = await menuRes.json()
+        const menuItems = menu ? menu.services : []
 
         const menuContainer = document.getElementById('menuItems')
         menuContainer.innerHTML = ""
@@ -246,26 +244,26 @@ async function placeOrder() {
         return
     }
 
-    // Place orders for each item in cart
+    // Place the whole cart in one request
     try {
-        const orderPromises = cart.map(item => {
-            return fetch(`${API}/orders`, {
-                method: "POST",
-                headers: {"Content-Type": "application/json"},
-                body: JSON.stringify({
-                    service_id: item.id,
-                    order_type: isDineIn ? 'dine-in' : 'delivery',
-                    table_number: tableNumber,
-                    delivery_address: deliveryAddress,
-                    customer_name: customerName,
-                    customer_phone: customerPhone,
-                    notes: document.getElementById('orderNotes').value,
-                    quantity: item.quantity
-                })
+        const res = await fetch(`${API}/orders/checkout`, {
+            method: "POST",
+            headers: {"Content-Type": "application/json"},
+            body: JSON.stringify({
+                items: cart.map(item => ({service_id: item.id, quantity: item.quantity})),
+                order_type: isDineIn ? 'dine-in' : 'delivery',
+                table_number: tableNumber,
+                delivery_address: deliveryAddress,
+                customer_name: customerName,
+                customer_phone: customerPhone,
+                notes: document.getElementById('orderNotes').value
             })
         })
 
-        await Promise.all(orderPromises)
+        if (!res.ok) {
+            const err = await res.json()
+            throw new Error(err.detail || "Checkout failed")
+        }
 
         // Show success
         const totalPrice = cart.reduce((sum, item) => sum + (item.price * item.quantity), 0)
@@ -73,11 +73,24 @@ async function login() {
     } catch (err) { alert("Error: " + err.message) }
 }
 
+// List endpoints return one page at a time; X-Next-Cursor points at the next one
+async function fetchAllPages(url, options = {}) {
+    let items = []
+    let cursor = null
+    do {
+        const sep = url.includes("?") ? "&" : "?"
+        const res = await fetch(cursor ? `${url}${sep}cursor=${encodeURIComponent(cursor)}` : url, options)
+        if (!res.ok) throw new Error(`HTTP ${res.status}`)
+        items = items.concat(await res.json())
+        cursor = res.headers.get("X-Next-Cursor")
+    } while (cursor)
+    return items
+}
+
 // ============= STORES =============
 
 async function loadStores() {
-    const res = await fetch(`${API}/stores`)
-    const data = await res.json()
+    const data = await fetchAllPages(`${API}/stores?limit=500`)
 
     stores.innerHTML = ""
 
@@ -152,8 +165,7 @@ async function createStore() {
 // ============= SERVICES =============
 
 async function loadAllServices() {
-    const res = await fetch(`${API}/services`)
-    const data = await res.json()
+    const data = await fetchAllPages(`${API}/services?limit=500`)
 
     services.innerHTML = ""
 
@@ -261,14 +273,22 @@ async function createOrder(serviceId) {
     loadMyOrders()
 }
 
-async function loadMyOrders() {
-    const res = await fetch(`${API}/orders`, {
+// Orders are loaded a page at a time (newest first); "Load more" fetches the next page
+let myOrdersCursor = null
+
+async function loadMyOrders(more = false) {
+    const cursor = more && myOrdersCursor ? `&cursor=${encodeURIComponent(myOrdersCursor)}` : ""
+    const res = await fetch(`${API}/orders?limit=100${cursor}`, {
         headers: { "Authorization": "Bearer " + getToken() }
     })
+    if (!res.ok) return
     const data = await res.json()
-    orders.innerHTML = ""
+    myOrdersCursor = res.headers.get("X-Next-Cursor")
+    const button = document.getElementById("loadMoreMyOrders")
+    if (button) button.style.display = myOrdersCursor ? "" : "none"
+    if (!more) orders.innerHTML = ""
 
-    if (data.length === 0) {
+    if (data.length === 0 && !more) {
         orders.innerHTML = "<tr><td colspan='6' class='text-center text-muted'>No orders yet</td></tr>"
         return
     }
@@ -287,11 +307,59 @@ async function loadMyOrders() {
     })
 }
 
-async function loadStoreOrders() {
-    const res = await fetch(`${API}/store-orders/${currentStoreId}`, {
+// Live order feed: after the first full load only new/changed orders are sent.
+// The feed resumes from the list's X-Feed-Id, so orders placed while the list
+// was loading are replayed instead of lost.
+let orderFeed = null
+
+function watchStoreOrders(storeId, handlers, sinceId) {
+    if (orderFeed) orderFeed.close()
+    const since = sinceId ? `&last_id=${encodeURIComponent(sinceId)}` : ""
+    orderFeed = new EventSource(
+        `${API}/store-orders/${storeId}/events?token=${encodeURIComponent(getToken())}${since}`)
+    orderFeed.addEventListener("created", e => handlers.created(JSON.parse(e.data)))
+    orderFeed.addEventListener("updated", e => handlers.updated(JSON.parse(e.data)))
+    orderFeed.addEventListener("reset", () => handlers.reset())
+}
+
+// Orders are loaded a page at a time (newest first); "Load more" fetches the next page
+let storeOrderList = []
+let storeOrdersCursor = null
+
+async function loadStoreOrders(more = false) {
+    const cursor = more && storeOrdersCursor ? `&cursor=${encodeURIComponent(storeOrdersCursor)}` : ""
+    const res = await fetch(`${API}/store-orders/${currentStoreId}?limit=100${cursor}`, {
         headers: { "Authorization": "Bearer " + getToken() }
     })
-    const data = await res.json()
+    if (!res.ok) return
+    const page = await res.json()
+    storeOrdersCursor = res.headers.get("X-Next-Cursor")
+    const button = document.getElementById("loadMoreStoreOrders")
+    if (button) button.style.display = storeOrdersCursor ? "" : "none"
+
+    if (more) {
+        storeOrderList = storeOrderList.concat(page.filter(o => !storeOrderList.some(x => x.id === o.id)))
+        renderStoreOrders()
+        return
+    }
+    storeOrderList = page
+    renderStoreOrders()
+    watchStoreOrders(currentStoreId, {
+        created: o => {
+            if (storeOrderList.some(x => x.id === o.id)) return
+            storeOrderList.unshift(o)
+            renderStoreOrders()
+        },
+        updated: u => {
+            const o = storeOrderList.find(x => x.id === u.id)
+            if (o) { o.status = u.status; renderStoreOrders() }
+        },
+        reset: () => loadStoreOrders()
+    }, res.headers.get("X-Feed-Id"))
+}
+
+function renderStoreOrders() {
+    const data = storeOrderList
     storeOrders.innerHTML = ""
 
     if (data.length === 0) {
@@ -338,17 +406,23 @@ async function updateOrderStatus(orderId, status) {
         body: JSON.stringify({ status })
     })
     alert("Order updated!")
-    loadStoreOrders()
 }
 
 // ============= ADMIN =============
 
-async function loadAllOrders() {
-    const res = await fetch(`${API}/admin/orders`, {
+let allOrdersCursor = null
+
+async function loadAllOrders(more = false) {
+    const cursor = more && allOrdersCursor ? `&cursor=${encodeURIComponent(allOrdersCursor)}` : ""
+    const res = await fetch(`${API}/admin/orders?limit=100${cursor}`, {
         headers: { "Authorization": "Bearer " + getToken() }
     })
+    if (!res.ok) return
     const data = await res.json()
-    adminOrders.innerHTML = ""
+    allOrdersCursor = res.headers.get("X-Next-Cursor")
+    const button = document.getElementById("loadMoreAllOrders")
+    if (button) button.style.display = allOrdersCursor ? "" : "none"
+    if (!more) adminOrders.innerHTML = ""
 
     data.forEach(o => {
         adminOrders.innerHTML += `
@@ -0,0 +1,33 @@
+"""
+Order status lifecycle.
+
+    Pending -> Preparing -> Ready -> Completed
+       |           |          |
+       +-----------+----------+----> Cancelled
+
+An open order can move forward, skipping steps (a counter sale goes
+straight from Pending to Completed), or be cancelled.  Completed and
+Cancelled are final: archive.py moves final orders out of the hot table.
+Orders from before statuses were set have status NULL, which means Pending.
+"""
+STATUSES = ("Pending", "Preparing", "Ready", "Completed", "Cancelled")
+OPEN = ("Pending", "Preparing", "Ready")
+FINAL = ("Completed", "Cancelled")
+
+TRANSITIONS = {
+    "Pending":   {"Preparing", "Ready", "Completed", "Cancelled"},
+    "Preparing": {"Ready", "Completed", "Cancelled"},
+    "Ready":     {"Completed", "Cancelled"},
+    "Completed": set(),
+    "Cancelled": set(),
+}
+
+
+def current(status):
+    return status or "Pending"
+
+
+def can_move(old, new):
+    """Whether an order in status `old` may be changed to `new` (staying put is always allowed)."""
+    old = current(old)
+    return old == new or new in TRANSITIONS.get(old, STATUSES)
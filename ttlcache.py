@@ -0,0 +1,82 @@
+"""
+Thread-safe TTL + LRU cache shared by the principal, menu and QR caches.
+
+* an entry expires `ttl` seconds after it was stored, and the least recently
+  used ones are evicted beyond `max_entries`;
+* `get(key, loader)` calls `loader(key)` on a miss (`aget` awaits it); a
+  None result is not cached;
+* `invalidate(key)` and `clear()` bump a generation counter, so a value
+  loaded before an invalidation but stored after it is dropped instead of
+  cached stale;
+* `stats()` reports size, hits, misses and evictions.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()       # key -> (expires_at, value)
+        self._generation = 0                # bumped by every invalidation
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key, loader):
+        """Cached value for `key`, calling `loader(key)` on a miss."""
+        now = time.monotonic()
+        hit, value = self._lookup(key, now)
+        if hit:
+            return value
+        return self._store(key, now, value, loader(key))
+
+    async def aget(self, key, loader):
+        """`get` for async code: `loader(key)` is awaited on a miss."""
+        now = time.monotonic()
+        hit, value = self._lookup(key, now)
+        if hit:
+            return value
+        return self._store(key, now, value, await loader(key))
+
+    def _lookup(self, key, now):
+        """(True, value) on a hit, else (False, the generation to store under)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[1]
+            self.misses += 1
+            return False, self._generation
+
+    def _store(self, key, now, generation, value):
+        if value is not None:
+            with self._lock:
+                # Skip the store if an invalidation ran while we were loading
+                if generation == self._generation:
+                    self._entries[key] = (now + self.ttl, value)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+                        self.evictions += 1
+        return value
+
+    def invalidate(self, key):
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"size": len(self._entries), "max_entries": self.max_entries,
+                    "ttl_seconds": self.ttl, "hits": self.hits, "misses": self.misses,
+                    "evictions": self.evictions,
+                    "hit_rate": round(self.hits / lookups, 4) if lookups else None}